@@ -0,0 +1,220 @@
+"""
+Микробенчмарки хранилища на синтетических storage.json разного размера.
+
+    python -m benchmarks.bench_storage --scale 10k 100k
+    python -m benchmarks.bench_storage --scale 100k --save-baseline
+    python -m benchmarks.bench_storage --scale 100k          # сравнение с baseline.json
+
+При сравнении медленнее базовой линии больше чем на --tolerance (по p50)
+считается регрессией: список печатается, код выхода 1.
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+os.environ.setdefault("BOT_TOKEN", "bench")  # config требует токен, бенчмарку он не нужен
+
+from models.storage import Storage  # noqa: E402
+from models.task_catalog import get_catalog  # noqa: E402
+from models.task_picker import pick_task, plan_month  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# имя → (родителей, детей на родителя, заполненных дней декабря)
+SCALES = {
+    "10k": (200, 2, 25),
+    "100k": (2000, 2, 25),
+    "1m": (20000, 2, 25),
+}
+
+YEAR = 2025
+
+
+def build_dataset(path: str, parents: int, children_per_parent: int, days: int,
+                  done_ratio: float=0.6, seed: int=0) -> Dict[str, int]:
+    """Пишет storage.json напрямую, минуя Storage: так быстро даже для миллиона записей."""
+    rnd = random.Random(seed)
+    task_ids = [t["id"] for t in get_catalog().tasks]
+    children, tasks = [], []
+    for parent_id in range(1, parents + 1):
+        for _ in range(children_per_parent):
+            child_id = len(children) + 1
+            children.append({
+                "id": child_id,
+                "parent_id": parent_id,
+                "name": f"Ребёнок {child_id}",
+                "age": rnd.randint(3, 12),
+                "tz_label": "Москва",
+                "tz_offset": rnd.randint(-12, 14),
+            })
+            for day in range(1, days + 1):
+                tasks.append({
+                    "id": len(tasks) + 1,
+                    "child_id": child_id,
+                    "year": YEAR,
+                    "month": 12,
+                    "day": day,
+                    "task_id": rnd.choice(task_ids),
+                    "status": "done" if rnd.random() < done_ratio else "new",
+                })
+    data = {
+        "children": children,
+        "tasks": tasks,
+        "meta": {"next_child_id": len(children) + 1, "next_task_id": len(tasks) + 1},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    return {"parents": parents, "children": len(children), "records": len(tasks)}
+
+
+def measure(func: Callable[[], Any], iterations: int, budget: float) -> List[float]:
+    """Время вызовов в секундах: не больше iterations и не дольше budget (минимум 3 замера)."""
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < iterations:
+        t0 = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - t0)
+        if len(samples) >= 3 and time.perf_counter() - started > budget:
+            break
+    return samples
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    return {
+        "n": len(samples),
+        "ops": len(samples) / sum(samples) if sum(samples) else float("inf"),
+        "p50": statistics.median(ordered),
+        "p99": pct(0.99),
+    }
+
+
+def run_scale(name: str, workdir: str, iterations: int, budget: float) -> Dict[str, Dict[str, float]]:
+    parents, per_parent, days = SCALES[name]
+    path = os.path.join(workdir, f"storage_{name}.json")
+    info = build_dataset(path, parents, per_parent, days)
+    print(f"\n== {name}: {info['parents']} родителей, {info['children']} детей, "
+          f"{info['records']} записей, {os.path.getsize(path) / 1e6:.1f} МБ")
+
+    rnd = random.Random(1)
+    n_children = info["children"]
+    results: Dict[str, Dict[str, float]] = {}
+
+    def bench(op: str, func: Callable[[], Any], n: int=iterations):
+        results[op] = summarize(measure(func, n, budget))
+
+    # холодный старт: разбор файла и построение индексов
+    bench("load", lambda: Storage(path).get_child(1), n=5)
+
+    storage = Storage(path)
+    child = storage.get_child(1)
+    child_id = lambda: rnd.randint(1, n_children)  # noqa: E731
+    day = lambda: rnd.randint(1, days)  # noqa: E731
+
+    bench("get_child", lambda: storage.get_child(child_id()))
+    bench("get_children_by_parent", lambda: storage.get_children_by_parent(rnd.randint(1, parents)))
+    bench("get_children_by_tz_offset", lambda: storage.get_children_by_tz_offset(rnd.randint(-12, 14)))
+    bench("get_task_record", lambda: storage.get_task_record(child_id(), YEAR, 12, day()))
+    bench("get_task_records_for_child", lambda: storage.get_task_records_for_child(child_id(), YEAR, 12))
+    bench("get_child_month_records", lambda: storage.get_child_month_records(child_id(), YEAR, 12))
+    bench("get_month_stats", lambda: storage.get_month_stats(child_id(), YEAR, 12))
+    bench("get_family_month_stats", lambda: storage.get_family_month_stats(rnd.randint(1, parents), YEAR, 12))
+    bench("pick_task", lambda: pick_task(child, datetime.date(YEAR, 12, day()), storage, child["id"]))
+
+    # мутации: каждая переписывает файл целиком
+    bench("set_task_status", lambda: storage.set_task_status(
+        child_id(), YEAR, 12, day(), rnd.choice(("new", "done"))))
+    bench("update_task_id", lambda: storage.update_task_id(child_id(), YEAR, 12, day(), 1))
+
+    new_children = []
+    bench("add_child", lambda: new_children.append(
+        storage.add_child(rnd.randint(1, parents), "Новый", 7, "Москва", 3)))
+    fresh_years = iter(range(YEAR + 100, YEAR + 10 ** 6))
+    bench("add_task_record", lambda: storage.add_task_record(
+        new_children[0], next(fresh_years), 12, 1, 1))
+    bench("add_task_records", lambda: storage.add_task_records([
+        {"child_id": new_children[0], "year": YEAR + 2, "month": 12, "day": d, "task_id": 1}
+        for d in range(1, 32)
+    ]))
+    months = iter(range(10 ** 6))
+    bench("plan_month", lambda: plan_month(
+        storage.get_child(new_children[-1]), YEAR + 3 + next(months), storage))
+    bench("delete_child", lambda: new_children and storage.delete_child(new_children.pop()),
+          n=max(1, len(new_children) - 1))
+
+    print(f"{'операция':30} {'n':>5} {'ops/s':>10} {'p50, мс':>10} {'p99, мс':>10}")
+    for op, r in results.items():
+        print(f"{op:30} {r['n']:>5} {r['ops']:>10.0f} {r['p50'] * 1e3:>10.3f} {r['p99'] * 1e3:>10.3f}")
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Dict[str, float]]], baseline: Dict[str, Any],
+            tolerance: float) -> List[str]:
+    """Операции, чей p50 вырос больше чем на tolerance относительно базовой линии."""
+    regressions = []
+    for scale, ops in results.items():
+        for op, r in ops.items():
+            base = baseline.get(scale, {}).get(op)
+            if not base:
+                continue
+            ratio = r["p50"] / base["p50"] if base["p50"] else 1.0
+            if ratio > 1 + tolerance:
+                regressions.append(
+                    f"{scale}/{op}: p50 {base['p50'] * 1e3:.3f} → {r['p50'] * 1e3:.3f} мс (×{ratio:.2f})"
+                )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарки Storage на синтетических данных")
+    parser.add_argument("--scale", nargs="+", choices=SCALES, default=["10k", "100k"])
+    parser.add_argument("--iterations", type=int, default=300, help="максимум замеров на операцию")
+    parser.add_argument("--budget", type=float, default=3.0, help="секунд на операцию")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="записать результаты как базовую линию")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="допустимое замедление p50 (0.3 = 30%%)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = {name: run_scale(name, workdir, args.iterations, args.budget) for name in args.scale}
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nБазовая линия записана в {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nБазовой линии {args.baseline} нет — сравнивать не с чем (см. --save-baseline)")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    if regressions:
+        print("\nРЕГРЕССИИ:")
+        for line in regressions:
+            print("  " + line)
+        return 1
+    print("\nРегрессий относительно базовой линии нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
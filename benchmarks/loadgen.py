@@ -0,0 +1,377 @@
+"""
+Нагрузочный прогон «декабрьское утро» через настоящие Dispatcher и роутеры.
+
+Виртуальные родители параллельно проходят сценарий: /start → добавить детей →
+«📅 Задание на сегодня» → «✅ Выполнено» → магазин (reroll с оплатой). Исходящие
+запросы бота уходят на локальную заглушку Bot API, которая их записывает и по
+желанию отвечает 429.
+
+    python -m benchmarks.loadgen --parents 200 --children 2
+    python -m benchmarks.loadgen --parents 200 --flood-rate 0.05 --rate-limit
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+os.environ.setdefault("BOT_TOKEN", "123456:loadgen")  # config требует токен
+
+from aiogram import Bot, Dispatcher  # noqa: E402
+from aiogram.client.session.aiohttp import AiohttpSession  # noqa: E402
+from aiogram.client.telegram import TelegramAPIServer  # noqa: E402
+from aiogram.types import Update  # noqa: E402
+from aiohttp import web  # noqa: E402
+
+import models.storage as storage_module  # noqa: E402
+from models.storage import Storage  # noqa: E402
+
+BOT_ID = 123456
+TOKEN = f"{BOT_ID}:loadgen"
+
+# методы Bot API, которые возвращают Message, остальные — True
+MESSAGE_METHODS = {"sendmessage", "sendinvoice", "editmessagetext", "sendphoto", "senddocument"}
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class FakeBotAPI:
+    """
+    Заглушка Bot API на aiohttp: считает вызовы по методам и с вероятностью
+    flood_rate отвечает 429 с retry_after.
+    """
+
+    def __init__(self, flood_rate: float=0.0, retry_after: int=1, seed: int=0):
+        self.flood_rate = flood_rate
+        self.retry_after = retry_after
+        self.calls: Counter = Counter()
+        self.floods = 0
+        self._rnd = random.Random(seed)
+        self._message_ids = itertools.count(1000)
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    async def start(self, host: str="127.0.0.1", port: int=0):
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host=host, port=port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://{host}:{port}"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        params = await request.post()
+        self.calls[method] += 1
+
+        if self.flood_rate and self._rnd.random() < self.flood_rate:
+            self.floods += 1
+            return web.json_response({
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            })
+
+        if method in MESSAGE_METHODS:
+            chat_id = int(params.get("chat_id", 0))
+            result: Any = {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": BOT_ID, "is_bot": True, "first_name": "Advent"},
+                "text": params.get("text", ""),
+            }
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+
+class StorageTimer:
+    """
+    Оборачивает публичные методы хранилища и запись файла и суммирует время
+    в них (из любых потоков). Мутации StorageWriter применяет внутри batch(),
+    поэтому запись на диск идёт отдельным вызовом _write, а не внутри метода.
+    """
+
+    METHODS = (
+        "add_child", "get_child", "get_children_by_parent", "get_children_by_tz_offset",
+        "delete_child", "add_task_record", "add_task_records", "get_task_record",
+        "set_task_status", "update_task_id", "get_task_records_for_child",
+        "get_child_month_records", "get_month_stats", "get_family_month_stats",
+        "get_meta", "set_meta", "_write",
+    )
+
+    def __init__(self, storage):
+        self.total = 0.0
+        self.calls = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+        for name in self.METHODS:
+            setattr(storage, name, self._wrap(name, getattr(storage, name)))
+
+    def _wrap(self, name, func):
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - t0
+                with self._lock:
+                    self.total += elapsed
+                    if name == "_write":
+                        self.writes += 1
+                    else:
+                        self.calls += 1
+        return timed
+
+
+class LoopLagMonitor:
+    """Насколько позже положенного просыпается event loop — мера его загруженности."""
+
+    def __init__(self, interval: float=0.05):
+        self.interval = interval
+        self.lags: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, loop.time() - expected))
+
+
+class VirtualParent:
+    """Один родитель: шлёт апдейты в Dispatcher и замеряет время их обработки."""
+
+    def __init__(self, run: "LoadRun", user_id: int, children: int):
+        self.run = run
+        self.user_id = user_id
+        self.children = children
+
+    def _user(self) -> Dict[str, Any]:
+        return {"id": self.user_id, "is_bot": False, "first_name": f"Parent{self.user_id}"}
+
+    def _message(self, **fields) -> Dict[str, Any]:
+        return {
+            "message_id": next(self.run.ids),
+            "date": int(time.time()),
+            "chat": {"id": self.user_id, "type": "private"},
+            "from": self._user(),
+            **fields,
+        }
+
+    async def send_text(self, text: str, label: Optional[str]=None):
+        await self.run.feed(label or text, {"message": self._message(text=text)})
+
+    async def press(self, action: str, child_id: int):
+        from handlers.start import ChildAction
+        await self.run.feed(f"callback:{action}", {"callback_query": {
+            "id": str(next(self.run.ids)),
+            "from": self._user(),
+            "chat_instance": str(self.user_id),
+            "data": ChildAction(action=action, child_id=child_id).pack(),
+            "message": {
+                "message_id": next(self.run.ids),
+                "date": int(time.time()),
+                "chat": {"id": self.user_id, "type": "private"},
+                "from": {"id": BOT_ID, "is_bot": True, "first_name": "Advent"},
+                "text": "…",
+            },
+        }})
+
+    async def pay(self, payload: str, amount: int):
+        await self.run.feed("successful_payment", {"message": self._message(successful_payment={
+            "currency": "XTR",
+            "total_amount": amount,
+            "invoice_payload": payload,
+            "telegram_payment_charge_id": f"tg{next(self.run.ids)}",
+            "provider_payment_charge_id": f"pr{next(self.run.ids)}",
+        })})
+
+    async def choose(self, button: str, action: str, child_ids: List[int]):
+        """Кнопка меню; если детей несколько — ещё и нажатие на каждого в inline-клавиатуре."""
+        await self.send_text(button)
+        if len(child_ids) > 1:
+            for child_id in child_ids:
+                await self.press(action, child_id)
+
+    async def scenario(self):
+        from utils.timezones import get_timezone_labels
+        tz_label = get_timezone_labels()[0]
+
+        await self.send_text("/start")
+        await self.send_text("👨‍👩‍👧‍👦 Мои дети")
+        for n in range(self.children):
+            await self.send_text("➕ Добавить ребёнка")
+            await self.send_text(f"Ребёнок {self.user_id}-{n}", label="имя ребёнка")
+            await self.send_text(str(self.run.rnd.randint(3, 12)), label="возраст")
+            await self.send_text(tz_label, label="часовой пояс")
+
+        child_ids = [c["id"] for c in self.run.storage.get_children_by_parent(self.user_id)]
+        await self.choose("📅 Задание на сегодня", "today", child_ids)
+        await self.choose("✅ Выполнено", "done", child_ids)
+
+        await self.send_text("🎅 Новогодний магазин")
+        await self.choose("🔄 Обновить задание ⭐50", "reroll", child_ids)
+        day = self.run.today.strftime("%Y%m%d")
+        await self.pay(f"reload_task_{child_ids[0]}_{day}", 50)
+        await self.send_text("📊 Статистика")
+
+
+class LoadRun:
+
+    def __init__(self, dp: Dispatcher, bot: Bot, storage, today: datetime.date, seed: int=0):
+        self.dp = dp
+        self.bot = bot
+        self.storage = storage
+        self.today = today
+        self.rnd = random.Random(seed)
+        self.ids = itertools.count(1)
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors = 0
+
+    async def feed(self, label: str, payload: Dict[str, Any]):
+        update = Update.model_validate({"update_id": next(self.ids), **payload}, context={"bot": self.bot})
+        t0 = time.perf_counter()
+        try:
+            await self.dp.feed_update(self.bot, update)
+        except Exception:
+            self.errors += 1
+        self.latencies.setdefault(label, []).append(time.perf_counter() - t0)
+
+
+async def run_load(parents: int, children: int, concurrency: int, flood_rate: float,
+                   rate_limit: bool, today: datetime.date, workdir: str) -> Dict[str, Any]:
+    storage = Storage(path=os.path.join(workdir, "storage.json"))
+    storage_timer = StorageTimer(storage)
+    # все роутеры берут хранилище через get_storage() при импорте
+    storage_module._shared_storage = storage
+
+    from handlers import start, children as children_handlers, tasks, stats, payments
+    # задания выдаются только в декабре — «сегодня» у всех детей фиксированная дата
+    tasks.get_child_today = lambda child: today
+
+    api = FakeBotAPI(flood_rate=flood_rate)
+    await api.start()
+    session = AiohttpSession(api=TelegramAPIServer.from_base(api.url))
+    if rate_limit:
+        from config import OUTBOUND_GLOBAL_RATE, OUTBOUND_CHAT_RATE, OUTBOUND_CHAT_BURST
+        from utils.outbound import OutboundSender
+        session.middleware(OutboundSender(
+            global_rate=OUTBOUND_GLOBAL_RATE,
+            chat_rate=OUTBOUND_CHAT_RATE,
+            chat_burst=OUTBOUND_CHAT_BURST
+        ))
+    bot = Bot(token=TOKEN, session=session)
+
+    dp = Dispatcher()
+    for module in (start, children_handlers, tasks, stats, payments):
+        module.register_handlers(dp)
+
+    run = LoadRun(dp, bot, storage, today)
+    lag = LoopLagMonitor()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(user_id: int):
+        async with slots:
+            await VirtualParent(run, user_id, children).scenario()
+
+    lag.start()
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one(10_000 + n) for n in range(parents)))
+    finally:
+        elapsed = time.perf_counter() - started
+        await lag.stop()
+        await bot.session.close()
+        await api.stop()
+
+    all_latencies = [x for values in run.latencies.values() for x in values]
+    return {
+        "elapsed": elapsed,
+        "updates": len(all_latencies),
+        "updates_per_sec": len(all_latencies) / elapsed if elapsed else 0.0,
+        "errors": run.errors,
+        "latency": {
+            label: {"n": len(v), "p50": percentile(v, 0.5), "p99": percentile(v, 0.99)}
+            for label, v in sorted(run.latencies.items())
+        },
+        "latency_all": {"p50": percentile(all_latencies, 0.5), "p99": percentile(all_latencies, 0.99)},
+        "storage_calls": storage_timer.calls,
+        "storage_writes": storage_timer.writes,
+        "storage_share": storage_timer.total / sum(all_latencies) if all_latencies else 0.0,
+        "loop_lag": {
+            "p50": percentile(lag.lags, 0.5),
+            "p99": percentile(lag.lags, 0.99),
+            "max": max(lag.lags, default=0.0),
+        },
+        "api_calls": dict(api.calls),
+        "api_floods": api.floods,
+    }
+
+
+def print_report(r: Dict[str, Any]):
+    print(f"Апдейтов: {r['updates']} за {r['elapsed']:.2f} с — {r['updates_per_sec']:.0f} в секунду, "
+          f"ошибок: {r['errors']}")
+    print(f"Задержка обработки: p50 {r['latency_all']['p50'] * 1e3:.1f} мс, "
+          f"p99 {r['latency_all']['p99'] * 1e3:.1f} мс")
+    print(f"\n{'апдейт':34} {'n':>6} {'p50, мс':>10} {'p99, мс':>10}")
+    for label, row in r["latency"].items():
+        print(f"{label:34} {row['n']:>6} {row['p50'] * 1e3:>10.1f} {row['p99'] * 1e3:>10.1f}")
+    print(f"\nХранилище: {r['storage_calls']} вызовов, {r['storage_writes']} записей файла, "
+          f"{r['storage_share']:.1%} суммарного времени хендлеров")
+    lag = r["loop_lag"]
+    print(f"Лаг event loop: p50 {lag['p50'] * 1e3:.1f} мс, p99 {lag['p99'] * 1e3:.1f} мс, "
+          f"max {lag['max'] * 1e3:.1f} мс")
+    print(f"Bot API: {json.dumps(r['api_calls'], ensure_ascii=False)}, из них 429: {r['api_floods']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон бота против заглушки Bot API")
+    parser.add_argument("--parents", type=int, default=100)
+    parser.add_argument("--children", type=int, default=2, help="детей у каждого родителя")
+    parser.add_argument("--concurrency", type=int, default=100, help="родителей одновременно")
+    parser.add_argument("--flood-rate", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--rate-limit", action="store_true", help="включить OutboundSender, как в main.py")
+    parser.add_argument("--date", default="2025-12-10", help="«сегодня» для всех детей")
+    args = parser.parse_args(argv)
+
+    today = datetime.date.fromisoformat(args.date)
+    with tempfile.TemporaryDirectory() as workdir:
+        report = asyncio.run(run_load(
+            args.parents, args.children, args.concurrency, args.flood_rate,
+            args.rate_limit, today, workdir
+        ))
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,3 +12,82 @@ DATA_DIR.mkdir(exist_ok=True)
 
 DB_PATH = DATA_DIR / "storage.json"
 TASKS_FILE = DATA_DIR / "tasks_ru.json"
+# Как часто проверять, не поменялся ли файл заданий (секунды, 0 — без перезагрузки)
+TASKS_RELOAD_INTERVAL = float(os.getenv("TASKS_RELOAD_INTERVAL", "5"))
+
+# Бэкенд хранилища: "json" (storage.json), "journal" (storage.json + журнал)
+# или "sqlite" (storage.db)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+SQLITE_PATH = DATA_DIR / "storage.db"
+JOURNAL_PATH = DATA_DIR / "storage.journal"
+JOURNAL_COMPACT_EVERY = int(os.getenv("JOURNAL_COMPACT_EVERY", "1000"))
+
+# Размер пула потоков для дисковых операций хранилища
+STORAGE_WORKERS = int(os.getenv("STORAGE_WORKERS", "4"))
+
+# Отложенная запись storage.json: окно в секундах (0 — писать сразу)
+# и число мутаций, после которого сброс происходит не дожидаясь окна.
+# Хендлеры ждут сброса, так что окно добавляется к времени ответа
+STORAGE_FLUSH_INTERVAL = float(os.getenv("STORAGE_FLUSH_INTERVAL", "0"))
+STORAGE_FLUSH_EVERY = int(os.getenv("STORAGE_FLUSH_EVERY", "0"))
+
+# Режим получения апдейтов: "polling" или "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "")  # публичный https-адрес бота
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_MAX_IN_FLIGHT = int(os.getenv("WEBHOOK_MAX_IN_FLIGHT", "100"))
+
+# Утренняя рассылка задания дня по часовым поясам
+MORNING_PUSH_ENABLED = os.getenv("MORNING_PUSH_ENABLED", "0") == "1"
+MORNING_PUSH_HOUR = int(os.getenv("MORNING_PUSH_HOUR", "9"))
+
+# Лимиты исходящих сообщений: сообщений в секунду на весь бот,
+# в секунду на один чат и допустимый всплеск в чат
+OUTBOUND_GLOBAL_RATE = float(os.getenv("OUTBOUND_GLOBAL_RATE", "30"))
+OUTBOUND_CHAT_RATE = float(os.getenv("OUTBOUND_CHAT_RATE", "1"))
+OUTBOUND_CHAT_BURST = float(os.getenv("OUTBOUND_CHAT_BURST", "3"))
+
+# FSM-состояния диалогов: "sqlite" (data/fsm.db, переживают перезапуск) или "memory".
+# Брошенные диалоги забываются через FSM_TTL секунд, в памяти — не больше FSM_CACHE_SIZE ключей
+FSM_STORAGE = os.getenv("FSM_STORAGE", "sqlite")
+FSM_PATH = DATA_DIR / "fsm.db"
+FSM_TTL = int(os.getenv("FSM_TTL", str(2 * 24 * 3600)))
+FSM_CACHE_SIZE = int(os.getenv("FSM_CACHE_SIZE", "10000"))
+
+# Telegram id администраторов через запятую: им доступна команда /analytics.
+# Отчёт пересчитывается не чаще раза в ANALYTICS_REFRESH секунд
+ADMIN_IDS = {int(x) for x in os.getenv("ADMIN_IDS", "").split(",") if x.strip()}
+ANALYTICS_REFRESH = int(os.getenv("ANALYTICS_REFRESH", "300"))
+
+# Метрики: Prometheus-эндпоинт http://METRICS_HOST:METRICS_PORT/metrics (порт 0 — выключен)
+# и сводка в лог раз в METRICS_LOG_INTERVAL секунд (0 — без сводки)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_LOG_INTERVAL = float(os.getenv("METRICS_LOG_INTERVAL", "300"))
+
+# Профилирование по требованию (/profile или SIGUSR1): по умолчанию PROFILE_UPDATES апдейтов,
+# но не дольше PROFILE_SECONDS секунд; отчёты с PROFILE_TOP горячими функциями — в PROFILE_DIR
+PROFILE_DIR = DATA_DIR / "profiles"
+PROFILE_UPDATES = int(os.getenv("PROFILE_UPDATES", "200"))
+PROFILE_SECONDS = float(os.getenv("PROFILE_SECONDS", "60"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "30"))
+
+# Выбор заданий: сколько прошлых декабрей учитывать, чтобы не повторять задания,
+# и семейный режим — братьям и сёстрам в один день не выпадает одно и то же задание
+PICKER_SEASONS = int(os.getenv("PICKER_SEASONS", "2"))
+PICKER_FAMILY = os.getenv("PICKER_FAMILY", "0") == "1"
+
+# Режим выбора заданий: "stored" — задание сохраняется записью при первом показе,
+# "hashed" — вычисляется из (ребёнок, дата) ключевым хэшем без записи на диск;
+# на диск попадают только отметки «выполнено» и платные reroll.
+# Смена PICKER_KEY перемешивает все ещё не сохранённые задания, поэтому ключ
+# задаётся отдельно от BOT_TOKEN (токен могут перевыпустить) и обязателен в режиме "hashed"
+PICKER_MODE = os.getenv("PICKER_MODE", "stored")
+PICKER_KEY = os.getenv("PICKER_KEY", "")
+
+if PICKER_MODE == "hashed" and not PICKER_KEY:
+    raise ValueError("PICKER_KEY environment variable is required for PICKER_MODE=hashed!")
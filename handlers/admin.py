@@ -0,0 +1,89 @@
+import html
+from typing import Optional, Tuple
+
+from aiogram import Router, F
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from config import ADMIN_IDS, ANALYTICS_REFRESH, PROFILE_UPDATES, PROFILE_SECONDS
+from models.storage import get_storage
+from utils.analytics import AnalyticsCache, format_report
+from utils.profiling import Profiler
+
+router = Router()
+storage = get_storage()
+_analytics: Optional[AnalyticsCache] = None
+
+
+def get_analytics() -> AnalyticsCache:
+    global _analytics
+    if _analytics is None or _analytics.storage is not storage:
+        _analytics = AnalyticsCache(storage, refresh_interval=ANALYTICS_REFRESH)
+    return _analytics
+
+
+@router.message(Command("analytics"), F.from_user.id.in_(ADMIN_IDS))
+async def admin_analytics(message: Message, command: CommandObject):
+    # полный проход по хранилищу — в пуле потоков, event loop не ждёт;
+    # «/analytics fresh» пересчитывает, не дожидаясь окна кэша
+    force = command.args == "fresh"
+    report = await storage.aio.run(get_analytics().get, force)
+    await message.answer(format_report(report))
+
+
+def parse_profile_args(args: Optional[str]) -> Tuple[int, float]:
+    """«/profile» — по умолчанию, «/profile 500» — апдейтов, «/profile 30s» — секунд."""
+    if not args:
+        return PROFILE_UPDATES, PROFILE_SECONDS
+    args = args.strip().lower()
+    if args.endswith("s") and args[:-1].isdigit():
+        return 0, float(args[:-1])
+    if args.isdigit():
+        return int(args), PROFILE_SECONDS
+    raise ValueError(args)
+
+
+def report_preview(path: str, text: str, limit: int=3500) -> str:
+    """
+    Начало отчёта для сообщения: целые строки, экранированные для HTML
+    (в отчёте есть <module>, <listcomp> и т. п.), не длиннее limit.
+    """
+    lines, size = [], 0
+    for line in text.splitlines():
+        line = html.escape(line)
+        if size + len(line) + 1 > limit:
+            break
+        lines.append(line)
+        size += len(line) + 1
+    body = "\n".join(lines)
+    return f"Отчёт: <code>{html.escape(path)}</code>\n\n<pre>{body}</pre>"
+
+
+@router.message(Command("profile"), F.from_user.id.in_(ADMIN_IDS))
+async def admin_profile(message: Message, command: CommandObject, profiler: Profiler):
+    if command.args == "stop":
+        if not await profiler.finish():
+            await message.answer("Профилирование не запущено.")
+        return
+
+    try:
+        updates, seconds = parse_profile_args(command.args)
+    except ValueError:
+        await message.answer("Формат: /profile [N | Ts | stop], например /profile 500 или /profile 30s")
+        return
+
+    async def send_report(path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        # в сообщение — начало отчёта, полный отчёт остаётся в файле
+        await message.answer(report_preview(path, text))
+
+    if not profiler.start(updates=updates, seconds=seconds, on_done=send_report):
+        await message.answer("Профилирование уже идёт. Остановить: /profile stop")
+        return
+    limits = [f"{updates} апдейтов" if updates else "", f"{seconds:g} с" if seconds else ""]
+    await message.answer(f"Профилирование включено: {' или '.join(x for x in limits if x)}.")
+
+
+def register_handlers(dp):
+    dp.include_router(router)
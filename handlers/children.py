@@ -1,14 +1,14 @@
 from aiogram import Router, F
-from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton
+from aiogram.types import Message, CallbackQuery, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
-from models.storage import Storage
+from models.storage import get_storage
 from utils.timezones import get_timezone_labels, get_offset_by_label
-from .start import main_menu_keyboard
+from .start import ChildAction, children_inline_keyboard, main_menu_keyboard, resolve_child
 
 router = Router()
-storage = Storage()
+storage = get_storage()
 
 
 class AddChildStates(StatesGroup):
@@ -17,10 +17,6 @@ class AddChildStates(StatesGroup):
     waiting_tz = State()
 
 
-class DeleteChildStates(StatesGroup):
-    waiting_child_name = State()
-
-
 def children_menu_keyboard() -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(
         keyboard=[
@@ -32,18 +28,10 @@ def children_menu_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
-def children_delete_keyboard(children) -> ReplyKeyboardMarkup:
-    return ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text=c["name"])] for c in children] + 
-                 [[KeyboardButton(text="⬅ В меню")]],
-        resize_keyboard=True
-    )
-
-
 @router.message(F.text == "👨‍👩‍👧‍👦 Мои дети")
 async def show_children(message: Message, state: FSMContext):
     await state.clear()
-    children = storage.get_children_by_parent(message.from_user.id)
+    children = await storage.aio.get_children_by_parent(message.from_user.id)
     if not children:
         await message.answer(
             "У тебя пока нет детей. Нажми «➕ Добавить ребёнка», чтобы начать.",
@@ -115,7 +103,7 @@ async def process_tz(message: Message, state: FSMContext):
     tz_label = message.text
     tz_offset = get_offset_by_label(tz_label)
 
-    storage.add_child(
+    await storage.aio.add_child(
         parent_id=message.from_user.id,
         name=name,
         age=age,
@@ -134,8 +122,8 @@ async def process_tz(message: Message, state: FSMContext):
 
 
 @router.message(F.text == "🗑 Удалить")
-async def delete_child_start(message: Message, state: FSMContext):
-    children = storage.get_children_by_parent(message.from_user.id)
+async def delete_child_start(message: Message):
+    children = await storage.aio.get_children_by_parent(message.from_user.id)
     if not children:
         await message.answer(
             "Список пуст. Сначала добавь кого‑нибудь через «➕ Добавить ребёнка».",
@@ -143,36 +131,22 @@ async def delete_child_start(message: Message, state: FSMContext):
         )
         return
 
-    await state.set_state(DeleteChildStates.waiting_child_name)
-    await state.update_data(children_ids=[c["id"] for c in children])
     await message.answer(
         "Кого удалить из списка?",
-        reply_markup=children_delete_keyboard(children)
+        reply_markup=children_inline_keyboard(children, "delete")
     )
 
 
-@router.message(DeleteChildStates.waiting_child_name)
-async def process_delete_child(message: Message, state: FSMContext):
-    if message.text == "⬅ В меню":
-        await state.clear()
-        await message.answer("Главное меню:", reply_markup=main_menu_keyboard())
-        return
-
-    data = await state.get_data()
-    children_ids = data.get("children_ids", [])
-    children = storage.get_children_by_parent(message.from_user.id)
-    name_to_child = {c["name"]: c for c in children if c["id"] in children_ids}
-
-    child = name_to_child.get(message.text)
+@router.callback_query(ChildAction.filter(F.action == "delete"))
+async def process_delete_child(callback: CallbackQuery, callback_data: ChildAction):
+    child = await resolve_child(callback, callback_data, storage)
     if not child:
-        await message.answer("Пожалуйста, выбери имя из списка.")
         return
 
     # Удаляем ребёнка и связанные данные
-    storage.delete_child(child["id"])
+    await storage.aio.delete_child(child["id"])
 
-    await state.clear()
-    await message.answer(
+    await callback.message.answer(
         f"🗑 «{child['name']}» удалён из списка.",
         reply_markup=children_menu_keyboard()
     )
@@ -1,28 +1,30 @@
 import datetime
 from aiogram import Router, F
 from aiogram.types import (
-    Message, PreCheckoutQuery, LabeledPrice,
-    ReplyKeyboardMarkup, KeyboardButton
+    Message, CallbackQuery, PreCheckoutQuery, LabeledPrice,
+    ReplyKeyboardMarkup, KeyboardButton, BufferedInputFile
 )
-from aiogram.fsm.context import FSMContext
-from aiogram.fsm.state import State, StatesGroup
 
-from models.storage import Storage
-from models.task_picker import pick_task, load_tasks
-from .start import main_menu_keyboard, today_task_keyboard
+from config import MORNING_PUSH_HOUR, PICKER_MODE
+from models.storage import get_storage
+from models.task_catalog import TaskCatalog, get_catalog
+from models.task_picker import pick_task, plan_month_async, planned_task
+from utils.calendar_export import FileIdCache, build_document, iter_html, iter_ics
+from utils.calendar_render import CalendarCache
+from .start import (
+    ChildAction, children_inline_keyboard, main_menu_keyboard, resolve_child, today_task_keyboard
+)
 
 router = Router()
-storage = Storage()
+storage = get_storage()
 
 # Цены в Stars
 STAR_PRICE_REROLL = 50  # перезагрузка задания
 STAR_PRICE_FULL_CAL = 100  # календарь на месяц
 DONATION_PACKS = [200, 500, 1000]
 
-
-class ShopStates(StatesGroup):
-    waiting_child_for_reroll = State()
-    waiting_child_for_calendar = State()
+calendar_cache = CalendarCache()
+calendar_files = FileIdCache()
 
 # -------- ГЛАВНОЕ МЕНЮ МАГАЗИНА --------
 
@@ -47,19 +49,12 @@ async def santa_shop_menu(message: Message):
     )
 
 
-def children_keyboard(children):
-    return ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text=c["name"])] for c in children] + 
-                 [[KeyboardButton(text="⬅ В меню")]],
-        resize_keyboard=True
-    )
-
 # -------- REROLL ЗАДАНИЯ (50) --------
 
 
 @router.message(F.text == "🔄 Обновить задание ⭐50")
-async def reroll_start(message: Message, state: FSMContext):
-    children = storage.get_children_by_parent(message.from_user.id)
+async def reroll_start(message: Message):
+    children = await storage.aio.get_children_by_parent(message.from_user.id)
     if not children:
         await message.answer(
             "Сначала добавь ребёнка через «👨‍👩‍👧‍👦 Мои дети».",
@@ -72,34 +67,18 @@ async def reroll_start(message: Message, state: FSMContext):
         await send_reroll_invoice(message, children[0])
         return
 
-    # несколько детей — выбор имени через FSM
-    await state.set_state(ShopStates.waiting_child_for_reroll)
-    await state.update_data(children_ids=[c["id"] for c in children])
+    # несколько детей — кнопки с id ребёнка
     await message.answer(
         "Для какого ребёнка перезагрузить задание за 50 Stars?",
-        reply_markup=children_keyboard(children)
+        reply_markup=children_inline_keyboard(children, "reroll")
     )
 
 
-@router.message(ShopStates.waiting_child_for_reroll)
-async def reroll_choose_child(message: Message, state: FSMContext):
-    if message.text == "⬅ В меню":
-        await state.clear()
-        await message.answer("Главное меню:", reply_markup=main_menu_keyboard())
-        return
-
-    data = await state.get_data()
-    children_ids = data.get("children_ids", [])
-    children = storage.get_children_by_parent(message.from_user.id)
-    name_to_child = {c["name"]: c for c in children if c["id"] in children_ids}
-    child = name_to_child.get(message.text)
-
-    if not child:
-        await message.answer("Пожалуйста, выбери имя из списка.")
-        return
-
-    await state.clear()
-    await send_reroll_invoice(message, child)
+@router.callback_query(ChildAction.filter(F.action == "reroll"))
+async def reroll_choose_child(callback: CallbackQuery, callback_data: ChildAction):
+    child = await resolve_child(callback, callback_data, storage)
+    if child:
+        await send_reroll_invoice(callback.message, child)
 
 
 async def send_reroll_invoice(message: Message, child: dict):
@@ -121,8 +100,8 @@ async def send_reroll_invoice(message: Message, child: dict):
 
 
 @router.message(F.text == "📥 Календарь на месяц ⭐100")
-async def full_calendar_start(message: Message, state: FSMContext):
-    children = storage.get_children_by_parent(message.from_user.id)
+async def full_calendar_start(message: Message):
+    children = await storage.aio.get_children_by_parent(message.from_user.id)
     if not children:
         await message.answer(
             "Сначала добавь ребёнка через «👨‍👩‍👧‍👦 Мои дети».",
@@ -134,33 +113,17 @@ async def full_calendar_start(message: Message, state: FSMContext):
         await send_full_calendar_invoice(message, children[0])
         return
 
-    await state.set_state(ShopStates.waiting_child_for_calendar)
-    await state.update_data(children_ids=[c["id"] for c in children])
     await message.answer(
         "Для какого ребёнка открыть календарь на месяц за 100 Stars?",
-        reply_markup=children_keyboard(children)
+        reply_markup=children_inline_keyboard(children, "calendar")
     )
 
 
-@router.message(ShopStates.waiting_child_for_calendar)
-async def full_calendar_choose_child(message: Message, state: FSMContext):
-    if message.text == "⬅ В меню":
-        await state.clear()
-        await message.answer("Главное меню:", reply_markup=main_menu_keyboard())
-        return
-
-    data = await state.get_data()
-    children_ids = data.get("children_ids", [])
-    children = storage.get_children_by_parent(message.from_user.id)
-    name_to_child = {c["name"]: c for c in children if c["id"] in children_ids}
-    child = name_to_child.get(message.text)
-
-    if not child:
-        await message.answer("Пожалуйста, выбери имя из списка.")
-        return
-
-    await state.clear()
-    await send_full_calendar_invoice(message, child)
+@router.callback_query(ChildAction.filter(F.action == "calendar"))
+async def full_calendar_choose_child(callback: CallbackQuery, callback_data: ChildAction):
+    child = await resolve_child(callback, callback_data, storage)
+    if child:
+        await send_full_calendar_invoice(callback.message, child)
 
 
 async def send_full_calendar_invoice(message: Message, child: dict):
@@ -192,28 +155,44 @@ async def send_full_calendar_invoice(message: Message, child: dict):
 
 async def handle_full_calendar_free(message: Message, child_id: int, year: int):
     """Фактическая генерация календаря (платёж/бесплатно — решается выше)."""
-    child = storage.get_child(child_id)
+    child = await storage.aio.get_child(child_id)
     if not child:
         await message.answer("Ошибка: ребёнок не найден.", reply_markup=main_menu_keyboard())
         return
 
-    tasks = load_tasks()
-    calendar_text = f"🎄 ПОЛНЫЙ КАЛЕНДАРЬ {year} ДЛЯ {child['name']}:\n\n"
-
-    for day in range(1, 32):
-        date_ = datetime.date(year, 12, day)
-        rec = storage.get_task_record(child_id, year, 12, day)
-
-        if not rec:
-            task = pick_task(child, date_, storage, child_id)
-            storage.add_task_record(child_id, year, 12, day, task["id"])
-            rec = storage.get_task_record(child_id, year, 12, day)
-
-        task = next((t for t in tasks if t["id"] == rec["task_id"]), None)
-        status = "✅" if rec["status"] == "done" else "⏳"
-        calendar_text += f"{day:2d}. {status} {task['text'].format(name=child['name'])}\n"
-
-    await message.answer(calendar_text, reply_markup=main_menu_keyboard())
+    # один каталог на весь апдейт: перезагрузка tasks_ru.json посреди не смешает версии
+    catalog = get_catalog()
+    records = await plan_month_async(child, year, storage, catalog=catalog)
+    # пересборка — только если у записей поменялись задания или статусы
+    chunks = calendar_cache.get(child, year, records, catalog)
+    for i, chunk in enumerate(chunks):
+        last = i == len(chunks) - 1
+        await message.answer(text=chunk, reply_markup=main_menu_keyboard() if last else None)
+
+    await send_calendar_documents(message, child, year, records, catalog)
+
+
+async def send_calendar_documents(message: Message, child: dict, year: int, records: list,
+                                  catalog: TaskCatalog):
+    """
+    Тот же календарь файлами: .ics для приложений-календарей и HTML для печати.
+    Уже загруженный в Telegram файл с тем же содержимым отправляется по file_id.
+    """
+    documents = [
+        ("ics", iter_ics(child, year, records, catalog, hour=MORNING_PUSH_HOUR)),
+        ("html", iter_html(child, year, records, catalog)),
+    ]
+    for kind, chunks in documents:
+        data, digest = await storage.aio.run(build_document, chunks)
+        key = (child["id"], year, kind, digest)
+        file_id = calendar_files.get(key)
+        if file_id is not None:
+            await message.answer_document(file_id)
+            continue
+        sent = await message.answer_document(
+            BufferedInputFile(data, filename=f"Адвент {year} — {child['name']}.{kind}")
+        )
+        calendar_files.put(key, sent.document.file_id)
 
 # -------- ДОНАТЫ (200 / 500 / 1000) --------
 
@@ -284,7 +263,7 @@ async def successful_payment_callback(message: Message):
         date_str = "_".join(parts[3:])
         date_obj = datetime.datetime.strptime(date_str, "%Y%m%d").date()
 
-        child = storage.get_child(child_id)
+        child = await storage.aio.get_child(child_id)
         if not child:
             await message.answer(
                 "Ошибка: ребёнок не найден.",
@@ -292,8 +271,15 @@ async def successful_payment_callback(message: Message):
             )
             return
 
-        new_task = pick_task(child, date_obj, storage, child_id)
-        storage.update_task_id(
+        new_task = await storage.aio.run(pick_task, child, date_obj, storage, child_id)
+        if PICKER_MODE == "hashed" and not await storage.aio.get_task_record(
+                child_id, date_obj.year, date_obj.month, date_obj.day):
+            # reroll хранится как запись-override поверх вычисленного задания
+            planned = await storage.aio.run(planned_task, child, date_obj)
+            await storage.aio.add_task_record(
+                child_id, date_obj.year, date_obj.month, date_obj.day, planned["id"]
+            )
+        await storage.aio.update_task_id(
             child_id=child_id,
             year=date_obj.year,
             month=date_obj.month,
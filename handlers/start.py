@@ -1,6 +1,12 @@
+from typing import List, Optional
+
 from aiogram import Router, F
-from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton
+from aiogram.types import (
+    Message, CallbackQuery, ReplyKeyboardMarkup, KeyboardButton,
+    InlineKeyboardMarkup, InlineKeyboardButton
+)
 from aiogram.filters import CommandStart
+from aiogram.filters.callback_data import CallbackData
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
@@ -31,6 +37,40 @@ def today_task_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
+# -------- ВЫБОР РЕБЁНКА --------
+
+
+class ChildAction(CallbackData, prefix="child"):
+    """Нажатие на имя ребёнка: что сделать и с кем. Имя не нужно — id однозначен."""
+    action: str  # today / done / reroll / calendar / stats / family / delete
+    child_id: int
+
+
+def children_inline_keyboard(children: List[dict], action: str) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(
+                text=c["name"],
+                callback_data=ChildAction(action=action, child_id=c["id"]).pack()
+            )]
+            for c in children
+        ]
+    )
+
+
+async def resolve_child(callback: CallbackQuery, callback_data: ChildAction, storage) -> Optional[dict]:
+    """
+    Ребёнок из нажатой кнопки — одним чтением по id.
+    Чужого или уже удалённого ребёнка не отдаём: кнопка могла устареть.
+    """
+    child = await storage.aio.get_child(callback_data.child_id)
+    if not child or child["parent_id"] != callback.from_user.id:
+        await callback.answer("Этого ребёнка уже нет в списке.", show_alert=True)
+        return None
+    await callback.answer()
+    return child
+
+
 @router.message(CommandStart())
 async def cmd_start(message: Message):
     await message.answer(
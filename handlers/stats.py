@@ -1,46 +1,66 @@
 import datetime
 from aiogram import Router, F
-from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton
-from aiogram.fsm.context import FSMContext
-from aiogram.fsm.state import State, StatesGroup
+from aiogram.types import Message, CallbackQuery, InlineKeyboardButton
 
-from models.storage import Storage
-from .start import main_menu_keyboard
+from config import PICKER_MODE
+from models.storage import get_storage
+from models.task_picker import hashed_month_stats
+from utils.calendar_logic import local_today
+from .start import ChildAction, children_inline_keyboard, main_menu_keyboard, resolve_child
 
 router = Router()
-storage = Storage()
+storage = get_storage()
 
 
-class StatsStates(StatesGroup):
-    waiting_child_for_stats = State()
+def month_name(month: int) -> str:
+    return "декабрь" if month == 12 else str(month)
 
 
-def stats_children_keyboard(children):
-    return ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text=c["name"])] for c in children] + 
-                 [[KeyboardButton(text="⬅ В меню")]],
-        resize_keyboard=True
+async def get_month_stats(child, year, month):
+    if PICKER_MODE == "hashed":
+        # выдача не записывается — выданными считаются дни по сегодняшний (по времени ребёнка)
+        return await storage.aio.run(
+            hashed_month_stats, child, year, month, storage, local_today(child.get("tz_offset", 0))
+        )
+    return await storage.aio.get_month_stats(
+        child["id"], year, month, local_today(child.get("tz_offset", 0))
     )
 
 
-def build_stats_text(child, year, month):
-    records = storage.get_task_records_for_child(child["id"], year, month)
-    total = len(records)
-    done = sum(1 for r in records if r.get("status") == "done")
-    in_progress = total - done
+async def get_family_month_stats(parent_id, year, month):
+    if PICKER_MODE == "hashed":
+        children = await storage.aio.get_children_by_parent(parent_id)
+        return [(c, await get_month_stats(c, year, month)) for c in children]
+    return await storage.aio.get_family_month_stats(
+        parent_id, year, month, lambda c: local_today(c.get("tz_offset", 0))
+    )
+
 
-    month_name = "декабрь" if month == 12 else str(month)
+async def build_stats_text(child, year, month):
+    stats = await get_month_stats(child, year, month)
     return (
-        f"📊 Статистика для {child['name']} за {month_name} {year} года:\n\n"
-        f"Всего заданий выдано: {total}\n"
-        f"✅ Выполнено: {done}\n"
-        f"⏳ В процессе: {in_progress}"
+        f"📊 Статистика для {child['name']} за {month_name(month)} {year} года:\n\n"
+        f"Всего заданий выдано: {stats['issued']}\n"
+        f"✅ Выполнено: {stats['done']}\n"
+        f"⏳ В процессе: {stats['pending']}\n"
+        f"🔥 Серия: {stats['current_streak']} (лучшая: {stats['longest_streak']})"
     )
 
 
+async def build_family_stats_text(parent_id, year, month):
+    family = await get_family_month_stats(parent_id, year, month)
+    lines = [f"📊 Статистика семьи за {month_name(month)} {year} года:\n"]
+    for child, stats in family:
+        lines.append(
+            f"{child['name']}: ✅ {stats['done']} из {stats['issued']}, "
+            f"🔥 серия {stats['current_streak']} (лучшая: {stats['longest_streak']})"
+        )
+    return "\n".join(lines)
+
+
 @router.message(F.text == "📊 Статистика")
-async def stats_entry(message: Message, state: FSMContext):
-    children = storage.get_children_by_parent(message.from_user.id)
+async def stats_entry(message: Message):
+    children = await storage.aio.get_children_by_parent(message.from_user.id)
     if not children:
         await message.answer(
             "Сначала добавь ребёнка через «👨‍👩‍👧‍👦 Мои дети».",
@@ -52,41 +72,35 @@ async def stats_entry(message: Message, state: FSMContext):
     year, month = today.year, today.month
 
     if len(children) == 1:
-        text = build_stats_text(children[0], year, month)
+        text = await build_stats_text(children[0], year, month)
         await message.answer(text, reply_markup=main_menu_keyboard())
         return
 
-    await state.set_state(StatsStates.waiting_child_for_stats)
-    await state.update_data(children_ids=[c["id"] for c in children], year=year, month=month)
-    await message.answer(
-        "Для кого показать статистику?",
-        reply_markup=stats_children_keyboard(children)
-    )
+    kb = children_inline_keyboard(children, "stats")
+    kb.inline_keyboard.append([InlineKeyboardButton(
+        text="👨‍👩‍👧‍👦 Вся семья",
+        callback_data=ChildAction(action="family", child_id=0).pack()
+    )])
+    await message.answer("Для кого показать статистику?", reply_markup=kb)
 
 
-@router.message(StatsStates.waiting_child_for_stats)
-async def stats_choose_child(message: Message, state: FSMContext):
-    if message.text == "⬅ В меню":
-        await state.clear()
-        await message.answer("Главное меню:", reply_markup=main_menu_keyboard())
+@router.callback_query(ChildAction.filter(F.action == "stats"))
+async def stats_choose_child(callback: CallbackQuery, callback_data: ChildAction):
+    child = await resolve_child(callback, callback_data, storage)
+    if not child:
         return
 
-    data = await state.get_data()
-    children_ids = data.get("children_ids", [])
-    year = data.get("year")
-    month = data.get("month")
-
-    children = storage.get_children_by_parent(message.from_user.id)
-    name_to_child = {c["name"]: c for c in children if c["id"] in children_ids}
-    child = name_to_child.get(message.text)
+    today = datetime.date.today()
+    text = await build_stats_text(child, today.year, today.month)
+    await callback.message.answer(text, reply_markup=main_menu_keyboard())
 
-    if not child:
-        await message.answer("Пожалуйста, выбери имя из списка.")
-        return
 
-    text = build_stats_text(child, year, month)
-    await state.clear()
-    await message.answer(text, reply_markup=main_menu_keyboard())
+@router.callback_query(ChildAction.filter(F.action == "family"))
+async def stats_family(callback: CallbackQuery):
+    await callback.answer()
+    today = datetime.date.today()
+    text = await build_family_stats_text(callback.from_user.id, today.year, today.month)
+    await callback.message.answer(text, reply_markup=main_menu_keyboard())
 
 
 def register_handlers(dp):
@@ -1,33 +1,26 @@
 from __future__ import annotations
 
 import datetime
-import json
 import random
 from typing import Dict, Any, List
 
-from config import TASKS_FILE
+from models.task_catalog import get_catalog
 from utils.calendar_logic import get_day_type
 
 
 def load_tasks() -> List[Dict[str, Any]]:
-    with open(TASKS_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return get_catalog().tasks
 
 
 def pick_task(child: Dict[str, Any], date: datetime.date, used_task_ids: List[int]) -> Dict[str, Any]:
-    tasks = load_tasks()
+    catalog = get_catalog()
     age = child["age"]
     day_type = get_day_type(date)
-    suitable = [
-        t
-        for t in tasks
-        if t["min_age"] <= age <= t["max_age"]
-        and day_type in t["day_types"]
-        and t["id"] not in used_task_ids
-    ]
+    used = set(used_task_ids)
+    suitable = [t for t in catalog.candidates(age, day_type) if t["id"] not in used]
 
     if not suitable:
-        suitable = [t for t in tasks if t["min_age"] <= age <= t["max_age"]]
+        suitable = catalog.for_age(age)
 
     if not suitable:
         raise ValueError("No tasks available for this age and day type")
@@ -1,45 +1,33 @@
 import datetime
+from typing import Optional, Tuple
+
 from aiogram import Router, F
-from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton, LabeledPrice
-from aiogram.fsm.context import FSMContext
-from aiogram.fsm.state import State, StatesGroup
+from aiogram.types import Message, CallbackQuery, LabeledPrice
 
-from models.storage import Storage
-from models.task_picker import pick_task, load_tasks
-from utils.calendar_logic import is_december
-from .start import main_menu_keyboard, today_task_keyboard
+from models.storage import get_storage
+from models.task_catalog import get_catalog
+from config import PICKER_MODE
+from models.task_picker import pick_task, planned_task
+from utils.calendar_logic import is_december, local_today
+from .start import (
+    ChildAction, children_inline_keyboard, main_menu_keyboard, resolve_child, today_task_keyboard
+)
 
 router = Router()
-storage = Storage()
-
-
-class TaskStates(StatesGroup):
-    waiting_child_for_today_or_reroll = State()
-    waiting_child_for_done = State()
+storage = get_storage()
 
 
 def get_child_today(child) -> datetime.date:
     """Локальная дата для ребёнка с учётом tz_offset (часы)."""
-    offset = child.get("tz_offset", 0)
-    now_utc = datetime.datetime.utcnow()
-    local = now_utc + datetime.timedelta(hours=offset)
-    return local.date()
-
-
-def children_choice_keyboard(children):
-    """Клавиатура с именами детей и кнопкой назад."""
-    return ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text=c["name"])] for c in children] + 
-                 [[KeyboardButton(text="⬅ В меню")]],
-        resize_keyboard=True
-    )
+    return local_today(child.get("tz_offset", 0))
+
 
 # ---------- ЗАДАНИЕ НА СЕГОДНЯ ----------
 
 
 @router.message(F.text == "📅 Задание на сегодня")
-async def choose_child_for_today(message: Message, state: FSMContext):
-    children = storage.get_children_by_parent(message.from_user.id)
+async def choose_child_for_today(message: Message):
+    children = await storage.aio.get_children_by_parent(message.from_user.id)
     if not children:
         await message.answer(
             "Сначала добавь ребёнка через «👨‍👩‍👧‍👦 Мои дети».",
@@ -51,14 +39,52 @@ async def choose_child_for_today(message: Message, state: FSMContext):
         await send_today_task(message, children[0])
         return
 
-    await state.set_state(TaskStates.waiting_child_for_today_or_reroll)
-    await state.update_data(children_ids=[c["id"] for c in children], mode="today")
     await message.answer(
         "Для какого ребёнка дать задание на сегодня?",
-        reply_markup=children_choice_keyboard(children)
+        reply_markup=children_inline_keyboard(children, "today")
     )
 
 
+@router.callback_query(ChildAction.filter(F.action == "today"))
+async def process_child_for_today(callback: CallbackQuery, callback_data: ChildAction):
+    child = await resolve_child(callback, callback_data, storage)
+    if child:
+        await send_today_task(callback.message, child)
+
+
+async def get_or_assign_task(child: dict, day: datetime.date) -> Tuple[Optional[dict], str]:
+    """
+    Задание ребёнка на дату и статус записи.
+    Если записи ещё нет — подбирает новое задание и сохраняет его
+    (в режиме "hashed" — вычисляет, ничего не записывая).
+    """
+    # Пытаемся найти запись задания на эту дату для ребёнка
+    rec = await storage.aio.get_task_record(
+        child_id=child["id"],
+        year=day.year,
+        month=day.month,
+        day=day.day
+    )
+
+    # Если запись уже есть — находим связанное задание по task_id
+    if rec:
+        return get_catalog().get(rec["task_id"]), rec.get("status", "new")
+
+    if PICKER_MODE == "hashed":
+        return await storage.aio.run(planned_task, child, day), "new"
+
+    # Записи ещё нет — подбираем новое задание и сохраняем
+    task = await storage.aio.run(pick_task, child, day, storage, child["id"])
+    await storage.aio.add_task_record(
+        child_id=child["id"],
+        year=day.year,
+        month=day.month,
+        day=day.day,
+        task_id=task["id"]
+    )
+    return task, "new"
+
+
 async def send_today_task(message: Message, child: dict):
     # Локальная дата ребёнка по его часовому поясу
     today = get_child_today(child)
@@ -72,38 +98,16 @@ async def send_today_task(message: Message, child: dict):
         )
         return
 
-    # Пытаемся найти запись задания на сегодня для этого ребёнка
-    rec = storage.get_task_record(
-        child_id=child["id"],
-        year=today.year,
-        month=today.month,
-        day=today.day
-    )
+    task, status = await get_or_assign_task(child, today)
 
-    # Если запись уже есть
-    if rec:
-        # Если уже выполнено — просто сообщаем и НЕ показываем текст задания
-        if rec.get("status") == "done":
-            await message.answer(
-                f"✨ Задание на сегодня для {child['name']} уже выполнено.\n"
-                f"Приходите завтра за новым заданием! 🎄",
-                reply_markup=main_menu_keyboard()
-            )
-            return
-
-        # Иначе находим связанное задание по task_id
-        tasks = load_tasks()
-        task = next((t for t in tasks if t["id"] == rec["task_id"]), None)
-    else:
-        # Записи ещё нет — подбираем новое задание и сохраняем
-        task = pick_task(child, today, storage, child["id"])
-        storage.add_task_record(
-            child_id=child["id"],
-            year=today.year,
-            month=today.month,
-            day=today.day,
-            task_id=task["id"]
+    # Если уже выполнено — просто сообщаем и НЕ показываем текст задания
+    if status == "done":
+        await message.answer(
+            f"✨ Задание на сегодня для {child['name']} уже выполнено.\n"
+            f"Приходите завтра за новым заданием! 🎄",
+            reply_markup=main_menu_keyboard()
         )
+        return
 
     if not task:
         await message.answer(
@@ -122,8 +126,8 @@ async def send_today_task(message: Message, child: dict):
 
 
 @router.message(F.text == "✅ Выполнено")
-async def choose_child_for_done(message: Message, state: FSMContext):
-    children = storage.get_children_by_parent(message.from_user.id)
+async def choose_child_for_done(message: Message):
+    children = await storage.aio.get_children_by_parent(message.from_user.id)
     if not children:
         await message.answer(
             "Сначала добавь ребёнка через «👨‍👩‍👧‍👦 Мои дети».",
@@ -135,45 +139,39 @@ async def choose_child_for_done(message: Message, state: FSMContext):
         await mark_done_for_child(message, children[0])
         return
 
-    await state.set_state(TaskStates.waiting_child_for_done)
-    await state.update_data(children_ids=[c["id"] for c in children])
     await message.answer(
         "За какого ребёнка отмечаем задание выполненным?",
-        reply_markup=children_choice_keyboard(children)
+        reply_markup=children_inline_keyboard(children, "done")
     )
 
 
-@router.message(TaskStates.waiting_child_for_done)
-async def process_child_for_done(message: Message, state: FSMContext):
-    if message.text == "⬅ В меню":
-        await state.clear()
-        await message.answer("Главное меню:", reply_markup=main_menu_keyboard())
-        return
-
-    data = await state.get_data()
-    children_ids = data.get("children_ids", [])
-    children = storage.get_children_by_parent(message.from_user.id)
-    name_to_child = {c["name"]: c for c in children if c["id"] in children_ids}
-
-    child = name_to_child.get(message.text)
-    if not child:
-        await message.answer("Пожалуйста, выбери одного из детей из списка.")
-        return
-
-    await state.clear()
-    await mark_done_for_child(message, child)
+@router.callback_query(ChildAction.filter(F.action == "done"))
+async def process_child_for_done(callback: CallbackQuery, callback_data: ChildAction):
+    child = await resolve_child(callback, callback_data, storage)
+    if child:
+        await mark_done_for_child(callback.message, child)
 
 
 async def mark_done_for_child(message: Message, child: dict):
     today = get_child_today(child)
-    rec = storage.get_task_record(
+    rec = await storage.aio.get_task_record(
         child_id=child["id"],
         year=today.year,
         month=today.month,
         day=today.day
     )
 
-    if not rec:
+    if not rec and PICKER_MODE == "hashed" and is_december(today):
+        # вычисленное задание становится записью только сейчас, вместе с отметкой
+        task = await storage.aio.run(planned_task, child, today)
+        await storage.aio.add_task_record(
+            child_id=child["id"],
+            year=today.year,
+            month=today.month,
+            day=today.day,
+            task_id=task["id"]
+        )
+    elif not rec:
         await message.answer(
             f"У {child['name']} ещё нет задания на сегодня. "
             "Нажми «📅 Задание на сегодня».",
@@ -181,7 +179,7 @@ async def mark_done_for_child(message: Message, child: dict):
         )
         return
 
-    storage.set_task_status(
+    await storage.aio.set_task_status(
         child_id=child["id"],
         year=today.year,
         month=today.month,
@@ -198,8 +196,8 @@ async def mark_done_for_child(message: Message, child: dict):
 
 
 @router.message(F.text == "🔄 Перезагрузить задание ⭐")
-async def start_reroll(message: Message, state: FSMContext):
-    children = storage.get_children_by_parent(message.from_user.id)
+async def start_reroll(message: Message):
+    children = await storage.aio.get_children_by_parent(message.from_user.id)
     if not children:
         await message.answer(
             "Сначала добавь ребёнка через «👨‍👩‍👧‍👦 Мои дети».",
@@ -211,40 +209,13 @@ async def start_reroll(message: Message, state: FSMContext):
         await send_reroll_invoice(message, children[0])
         return
 
-    await state.set_state(TaskStates.waiting_child_for_today_or_reroll)
-    await state.update_data(children_ids=[c["id"] for c in children], mode="reroll")
+    # выбор ребёнка обрабатывает магазин (handlers.payments)
     await message.answer(
         "Для какого ребёнка перезагрузить задание за 50 Stars?",
-        reply_markup=children_choice_keyboard(children)
+        reply_markup=children_inline_keyboard(children, "reroll")
     )
 
 
-@router.message(TaskStates.waiting_child_for_today_or_reroll)
-async def process_child_for_today_or_reroll(message: Message, state: FSMContext):
-    if message.text == "⬅ В меню":
-        await state.clear()
-        await message.answer("Главное меню:", reply_markup=main_menu_keyboard())
-        return
-
-    data = await state.get_data()
-    mode = data.get("mode")
-    children_ids = data.get("children_ids", [])
-    children = storage.get_children_by_parent(message.from_user.id)
-    name_to_child = {c["name"]: c for c in children if c["id"] in children_ids}
-    child = name_to_child.get(message.text)
-
-    if not child:
-        await message.answer("Пожалуйста, выбери одного из детей из списка.")
-        return
-
-    await state.clear()
-
-    if mode == "reroll":
-        await send_reroll_invoice(message, child)
-    else:
-        await send_today_task(message, child)
-
-
 async def send_reroll_invoice(message: Message, child: dict):
     """Формируем платный reroll. Само обновление задания будет в payments.py."""
     today = get_child_today(child)
@@ -1,30 +1,151 @@
 import asyncio
 import logging
+import signal
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
 
-from config import BOT_TOKEN, ENV
-from handlers import start, children, tasks, stats, payments
+from config import (
+    BOT_TOKEN, ENV, BOT_MODE, WEBHOOK_BASE_URL, WEBHOOK_PATH, WEBHOOK_SECRET,
+    WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_MAX_IN_FLIGHT,
+    MORNING_PUSH_ENABLED, MORNING_PUSH_HOUR, TASKS_FILE, TASKS_RELOAD_INTERVAL,
+    OUTBOUND_GLOBAL_RATE, OUTBOUND_CHAT_RATE, OUTBOUND_CHAT_BURST,
+    FSM_STORAGE, FSM_PATH, FSM_TTL, FSM_CACHE_SIZE,
+    METRICS_HOST, METRICS_PORT, METRICS_LOG_INTERVAL,
+    PROFILE_DIR, PROFILE_UPDATES, PROFILE_SECONDS, PROFILE_INTERVAL, PROFILE_TOP
+)
+from handlers import start, children, tasks, stats, payments, admin
+from models.fsm_storage import SQLiteFSMStorage
+from models.storage import get_storage
+from models.task_catalog import CatalogWatcher
+from utils.metrics import MetricsReporter, instrument_storage, registry, setup_metrics, start_metrics_server
+from utils.outbound import OutboundSender
+from utils.profiling import Profiler, setup_profiling
+from utils.scheduler import MorningPushScheduler
+from utils.webhook import run_webhook
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def create_fsm_storage() -> BaseStorage:
+    if FSM_STORAGE == "memory":
+        return MemoryStorage()
+    return SQLiteFSMStorage(path=str(FSM_PATH), ttl=FSM_TTL, cache_size=FSM_CACHE_SIZE)
+
+
+async def on_startup(bot: Bot, dispatcher: Dispatcher):
+    if MORNING_PUSH_ENABLED:
+        scheduler = MorningPushScheduler(bot, hour=MORNING_PUSH_HOUR)
+        scheduler.start()
+        dispatcher["morning_push"] = scheduler
+        logger.info(f"Morning push enabled at {MORNING_PUSH_HOUR}:00 local time")
+
+    # правки tasks_ru.json подхватываются без перезапуска (и без потери очереди апдейтов)
+    if TASKS_RELOAD_INTERVAL > 0:
+        watcher = CatalogWatcher(TASKS_FILE, interval=TASKS_RELOAD_INTERVAL)
+        watcher.start()
+        dispatcher["catalog_watcher"] = watcher
+
+    if METRICS_PORT:
+        try:
+            dispatcher["metrics_server"] = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+        except OSError as e:
+            # занятый порт не повод не запускать бота
+            logger.error(f"Metrics endpoint on {METRICS_HOST}:{METRICS_PORT} not started: {e}")
+    if METRICS_LOG_INTERVAL > 0:
+        reporter = MetricsReporter(METRICS_LOG_INTERVAL)
+        reporter.start()
+        dispatcher["metrics_reporter"] = reporter
+
+    # kill -USR1 <pid>: включить профилирование (повторный сигнал — остановить и записать отчёт)
+    profiler = dispatcher["profiler"]
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, toggle_profiling, profiler)
+    except (NotImplementedError, AttributeError):
+        pass  # Windows: только команда /profile
+
+
+def toggle_profiling(profiler: Profiler):
+    if profiler.active:
+        asyncio.ensure_future(profiler.finish())
+    else:
+        profiler.start(updates=PROFILE_UPDATES, seconds=PROFILE_SECONDS)
+
+
+async def on_shutdown(dispatcher: Dispatcher):
+    outbound = dispatcher.get("outbound")
+    if outbound is not None:
+        logger.info(f"Outbound stats: {outbound.stats()}")
+
+    scheduler = dispatcher.get("morning_push")
+    if scheduler is not None:
+        await scheduler.stop()
+
+    profiler = dispatcher.get("profiler")
+    if profiler is not None:
+        await profiler.finish()
+
+    watcher = dispatcher.get("catalog_watcher")
+    if watcher is not None:
+        await watcher.stop()
+
+    reporter = dispatcher.get("metrics_reporter")
+    if reporter is not None:
+        await reporter.stop()
+    metrics_server = dispatcher.get("metrics_server")
+    if metrics_server is not None:
+        await metrics_server.cleanup()
+    logger.info(f"Metrics: {registry.summary()}")
+
+    # отложенные изменения хранилища не должны пропасть при остановке
+    get_storage().flush()
+    await dispatcher.storage.close()
+    logger.info("Storage flushed")
+
+
 async def main():
     bot = Bot(
         token=BOT_TOKEN,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
-    dp = Dispatcher()
+    # все исходящие запросы к чатам — через лимиты и очередь с приоритетами
+    outbound = OutboundSender(
+        global_rate=OUTBOUND_GLOBAL_RATE,
+        chat_rate=OUTBOUND_CHAT_RATE,
+        chat_burst=OUTBOUND_CHAT_BURST
+    )
+    bot.session.middleware(outbound)
+    instrument_storage(get_storage())
+    profiler = Profiler(out_dir=str(PROFILE_DIR), interval=PROFILE_INTERVAL, top=PROFILE_TOP)
+    dp = Dispatcher(storage=create_fsm_storage(), outbound=outbound, profiler=profiler)
 
     start.register_handlers(dp)
     children.register_handlers(dp)
     tasks.register_handlers(dp)
     stats.register_handlers(dp)
     payments.register_handlers(dp)
+    admin.register_handlers(dp)
+    setup_metrics(dp)
+    setup_profiling(dp, profiler)
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+
+    logger.info(f"🎄 Starting Advent Bot RU in ENV={ENV}, mode={BOT_MODE}")
+    if BOT_MODE == "webhook":
+        await run_webhook(
+            dp, bot,
+            base_url=WEBHOOK_BASE_URL,
+            path=WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            host=WEBHOOK_HOST,
+            port=WEBHOOK_PORT,
+            max_in_flight=WEBHOOK_MAX_IN_FLIGHT
+        )
+        return
 
-    logger.info(f"🎄 Starting Advent Bot RU in ENV={ENV}")
     await bot.delete_webhook(drop_pending_updates=True)
     await dp.start_polling(bot)
 
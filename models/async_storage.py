@@ -0,0 +1,109 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from models.storage_writer import StorageWriter
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Общий ограниченный пул потоков для дисковых операций хранилища."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                from config import STORAGE_WORKERS
+                _executor = ThreadPoolExecutor(
+                    max_workers=STORAGE_WORKERS, thread_name_prefix="storage"
+                )
+    return _executor
+
+
+class AsyncStorage:
+    """
+    Awaitable-обёртка над синхронным хранилищем: чтения уходят в пул потоков
+    и идут параллельно, мутации — в очередь единственного писателя
+    (StorageWriter), так что event loop aiogram не ждёт диска.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.writer = StorageWriter(storage)
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Выполнить произвольную синхронную функцию (например, pick_task) в пуле."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+    # ---------- ДЕТИ ----------
+
+    async def add_child(self, parent_id: int, name: str, age: int,
+                        tz_label: str, tz_offset: int) -> int:
+        return await self.writer.submit("add_child", parent_id, name, age, tz_label, tz_offset)
+
+    async def get_child(self, child_id: int) -> Optional[Dict[str, Any]]:
+        return await self.run(self.storage.get_child, child_id)
+
+    async def get_children_by_parent(self, parent_id: int) -> List[Dict[str, Any]]:
+        return await self.run(self.storage.get_children_by_parent, parent_id)
+
+    async def get_children_by_tz_offset(self, tz_offset: int) -> List[Dict[str, Any]]:
+        return await self.run(self.storage.get_children_by_tz_offset, tz_offset)
+
+    async def delete_child(self, child_id: int):
+        await self.writer.submit("delete_child", child_id)
+
+    # ---------- ЗАПИСИ ЗАДАНИЙ ПО ДНЯМ ----------
+
+    async def add_task_record(self, child_id: int, year: int, month: int, day: int, task_id: int):
+        await self.writer.submit("add_task_record", child_id, year, month, day, task_id)
+
+    async def add_task_records(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return await self.writer.submit("add_task_records", records)
+
+    async def get_task_record(self, child_id: int, year: int, month: int, day: int) -> Optional[Dict[str, Any]]:
+        return await self.run(self.storage.get_task_record, child_id, year, month, day)
+
+    async def set_task_status(self, child_id: int, year: int, month: int, day: int, status: str):
+        await self.writer.submit("set_task_status", child_id, year, month, day, status)
+
+    async def update_task_id(self, child_id: int, year: int, month: int, day: int, new_task_id: int) -> bool:
+        return await self.writer.submit("update_task_id", child_id, year, month, day, new_task_id)
+
+    # ---------- ВЫБОРКИ ДЛЯ СТАТИСТИКИ / PICKER ----------
+
+    async def get_task_records_for_child(self, child_id: int, year: int, month: int) -> List[Dict[str, Any]]:
+        return await self.run(self.storage.get_task_records_for_child, child_id, year, month)
+
+    async def get_child_month_records(self, child_id: int, year: int, month: int) -> List[Dict[str, Any]]:
+        return await self.run(self.storage.get_child_month_records, child_id, year, month)
+
+    async def get_month_stats(self, child_id: int, year: int, month: int,
+                              today: Optional[date]=None) -> Dict[str, int]:
+        return await self.run(self.storage.get_month_stats, child_id, year, month, today)
+
+    async def get_family_month_stats(self, parent_id: int, year: int, month: int,
+                                     today_of: Optional[Callable[[Dict[str, Any]], date]]=None
+                                     ) -> List[Tuple[Dict[str, Any], Dict[str, int]]]:
+        return await self.run(self.storage.get_family_month_stats, parent_id, year, month, today_of)
+
+    # ---------- СЛУЖЕБНЫЕ ЗНАЧЕНИЯ ----------
+
+    async def get_meta(self, key: str, default: Any=None) -> Any:
+        return await self.run(self.storage.get_meta, key, default)
+
+    async def set_meta(self, key: str, value: Any):
+        await self.writer.submit("set_meta", key, value)
+
+
+class AsyncStorageMixin:
+    """Даёт любому хранилищу свойство .aio с awaitable-версиями методов."""
+
+    @functools.cached_property
+    def aio(self) -> AsyncStorage:
+        return AsyncStorage(self)
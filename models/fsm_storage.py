@@ -0,0 +1,166 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL DEFAULT '{}',
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fsm_updated ON fsm (updated);
+"""
+
+
+class _Entry:
+    __slots__ = ("state", "data", "updated")
+
+    def __init__(self, state: Optional[str], data: Dict[str, Any], updated: float):
+        self.state = state
+        self.data = data
+        self.updated = updated
+
+    @property
+    def empty(self) -> bool:
+        return self.state is None and not self.data
+
+
+class SQLiteFSMStorage(BaseStorage):
+    """
+    FSM-хранилище aiogram на диске.
+
+    Состояния и данные диалогов лежат в SQLite и переживают перезапуск бота.
+    Спереди — LRU-кэш на cache_size ключей, так что частые чтения не ходят
+    в базу, а память не растёт за сезон. Состояние, которого не трогали
+    дольше ttl секунд, считается брошенным: оно не отдаётся и периодически
+    удаляется из базы.
+
+    Все обращения к базе идут в одном отдельном потоке — по порядку вызовов.
+    """
+
+    def __init__(self, path: str="data/fsm.db", ttl: float=2 * 24 * 3600,
+                 cache_size: int=10000, sweep_interval: float=600,
+                 key_builder: Optional[KeyBuilder]=None):
+        self.path = path
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self.sweep_interval = sweep_interval
+        self.key_builder = key_builder or DefaultKeyBuilder()
+        self._cache: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._last_sweep = time.time()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm-storage")
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    # ---------- API aiogram ----------
+
+    async def set_state(self, key: StorageKey, state: StateType=None) -> None:
+        entry = await self._entry(key)
+        entry.state = state.state if isinstance(state, State) else state
+        await self._store(key, entry)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._entry(key)).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise TypeError(f"Data must be a dict, not {type(data).__name__}")
+        entry = await self._entry(key)
+        entry.data = data.copy()
+        await self._store(key, entry)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self._entry(key)).data.copy()
+
+    async def close(self) -> None:
+        await self._run(self._conn.close)
+        self._executor.shutdown(wait=True)
+
+    # ---------- КЭШ ----------
+
+    @property
+    def cached(self) -> int:
+        return len(self._cache)
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return self.ttl > 0 and now - entry.updated > self.ttl
+
+    async def _entry(self, key: StorageKey) -> _Entry:
+        db_key = self.key_builder.build(key)
+        now = time.time()
+
+        entry = self._cache.get(db_key)
+        if entry is not None:
+            if not self._expired(entry, now):
+                self._cache.move_to_end(db_key)
+                return entry
+            del self._cache[db_key]
+
+        entry = await self._run(self._load, db_key, now - self.ttl if self.ttl > 0 else 0)
+        if entry is None:
+            entry = _Entry(None, {}, now)
+        self._remember(db_key, entry)
+        return entry
+
+    def _remember(self, db_key: str, entry: _Entry):
+        self._cache[db_key] = entry
+        self._cache.move_to_end(db_key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _store(self, key: StorageKey, entry: _Entry):
+        db_key = self.key_builder.build(key)
+        now = time.time()
+        entry.updated = now
+        self._remember(db_key, entry)
+
+        # снимок значений: пока запись ждёт потока, entry может измениться снова
+        state, data = entry.state, json.dumps(entry.data, ensure_ascii=False)
+        sweep = self.ttl > 0 and now - self._last_sweep >= self.sweep_interval
+        if sweep:
+            self._last_sweep = now
+        await self._run(self._save, db_key, state, data, now, entry.empty,
+                        now - self.ttl if sweep else None)
+
+    # ---------- БАЗА (в потоке fsm-storage) ----------
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _load(self, db_key: str, min_updated: float) -> Optional[_Entry]:
+        row = self._conn.execute(
+            "SELECT state, data, updated FROM fsm WHERE key = ? AND updated >= ?",
+            (db_key, min_updated)
+        ).fetchone()
+        if row is None:
+            return None
+        return _Entry(row[0], json.loads(row[1]), row[2])
+
+    def _save(self, db_key: str, state: Optional[str], data: str, updated: float,
+              empty: bool, expire_before: Optional[float]):
+        with self._conn:
+            if empty:
+                # диалог закончен (state.clear()) — строка больше не нужна
+                self._conn.execute("DELETE FROM fsm WHERE key = ?", (db_key,))
+            else:
+                self._conn.execute(
+                    "INSERT INTO fsm (key, state, data, updated) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET state = excluded.state, "
+                    "data = excluded.data, updated = excluded.updated",
+                    (db_key, state, data, updated)
+                )
+            if expire_before is not None:
+                self._conn.execute("DELETE FROM fsm WHERE updated < ?", (expire_before,))
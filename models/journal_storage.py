@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from models.storage import Storage, _Snapshot, fsync_dir
+from utils.calendar_logic import local_today
+
+logger = logging.getLogger(__name__)
+
+
+class JournalStorage(Storage):
+    """
+    Storage со снапшотом и журналом мутаций (write-ahead log).
+
+    Данные живут в памяти. Каждая мутация дописывается одной компактной
+    строкой в журнал, а storage.json переписывается только при компакции,
+    которая запускается в фоне каждые compact_every записей журнала.
+    При старте снапшот и журнал проигрываются обратно в память.
+    """
+
+    def __init__(self, path: str="data/storage.json", journal_path: str=None,
+                 compact_every: int=1000, fsync: bool=False):
+        self.path = path
+        self.journal_path = journal_path or os.path.splitext(path)[0] + ".journal"
+        self.compact_every = compact_every
+        self.fsync = fsync
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._compacting = False
+        self._snapshot = _Snapshot(self._read_snapshot())
+        self._seq = self._snapshot.data.get("journal_seq", 0)
+        self._journal_lines = 0
+
+        self._replay(self._rotated_path)
+        self._replay(self.journal_path)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    @property
+    def _rotated_path(self) -> str:
+        return self.journal_path + ".compacting"
+
+    # ---------- ВНУТРЕННИЕ ----------
+
+    def _fresh(self) -> _Snapshot:
+        # память — источник истины, файл снаружи не меняется
+        return self._snapshot
+
+    def _save(self, data: Dict[str, Any]):
+        # диск трогают только журнал и компакция
+        pass
+
+    def _read_snapshot(self) -> Dict[str, Any]:
+        if not os.path.exists(self.path):
+            return {"children": [], "tasks": []}
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _replay(self, path: str):
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # недописанная строка после падения — дальше журнала нет
+                    logger.warning("Journal %s: broken line %d, replay stopped", path, line_no)
+                    return
+                if entry["seq"] <= self._seq:
+                    continue
+                getattr(Storage, entry["op"])(self, **entry["args"])
+                self._seq = entry["seq"]
+                self._journal_lines += 1
+
+    def _append(self, op: str, args: Dict[str, Any]):
+        self._seq += 1
+        line = json.dumps(
+            {"seq": self._seq, "op": op, "args": args},
+            ensure_ascii=False, separators=(",", ":")
+        )
+        self._journal.write(line + "\n")
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+        self._journal_lines += 1
+        if self._journal_lines >= self.compact_every and not self._compacting:
+            self._compacting = True
+            threading.Thread(target=self.compact, daemon=True).start()
+
+    def _mutate(self, op: str, **args):
+        with self._lock:
+            result = getattr(Storage, op)(self, **args)
+            self._append(op, args)
+        return result
+
+    # ---------- МУТАЦИИ ----------
+
+    def add_child(self, parent_id: int, name: str, age: int,
+                  tz_label: str, tz_offset: int, created: Optional[str]=None) -> int:
+        # дата фиксируется до записи в журнал, иначе проигрывание подставит день рестарта
+        created = created or local_today(tz_offset).isoformat()
+        return self._mutate("add_child", parent_id=parent_id, name=name, age=age,
+                            tz_label=tz_label, tz_offset=tz_offset, created=created)
+
+    def delete_child(self, child_id: int):
+        self._mutate("delete_child", child_id=child_id)
+
+    def add_task_record(self, child_id: int, year: int, month: int, day: int, task_id: int):
+        self._mutate("add_task_record", child_id=child_id, year=year, month=month,
+                     day=day, task_id=task_id)
+
+    def add_task_records(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return self._mutate("add_task_records", records=records)
+
+    def set_task_status(self, child_id: int, year: int, month: int, day: int, status: str):
+        self._mutate("set_task_status", child_id=child_id, year=year, month=month,
+                     day=day, status=status)
+
+    def update_task_id(self, child_id: int, year: int, month: int, day: int, new_task_id: int) -> bool:
+        return self._mutate("update_task_id", child_id=child_id, year=year, month=month,
+                            day=day, new_task_id=new_task_id)
+
+    def set_meta(self, key: str, value: Any):
+        self._mutate("set_meta", key=key, value=value)
+
+    # ---------- КОМПАКЦИЯ ----------
+
+    def compact(self):
+        """Сворачивает журнал в снапшот storage.json."""
+        with self._compact_lock:
+            with self._lock:
+                self._compacting = True
+                data = self._snapshot.data
+                data["journal_seq"] = self._seq
+                payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+                # новые мутации пишутся в свежий журнал, пока снапшот уходит на диск
+                self._journal.close()
+                self._rotate_journal()
+                self._journal = open(self.journal_path, "a", encoding="utf-8")
+                self._journal_lines = 0
+
+            try:
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+                fsync_dir(self.path)
+                if os.path.exists(self._rotated_path):
+                    os.remove(self._rotated_path)
+            finally:
+                self._compacting = False
+
+    def _rotate_journal(self):
+        if not os.path.exists(self.journal_path):
+            return
+        if not os.path.exists(self._rotated_path):
+            os.replace(self.journal_path, self._rotated_path)
+            return
+        # прошлая компакция не доехала до конца — её хвост не теряем
+        with open(self.journal_path, "r", encoding="utf-8") as src, \
+                open(self._rotated_path, "a", encoding="utf-8") as dst:
+            dst.write(src.read())
+        os.remove(self.journal_path)
+
+    def flush(self):
+        """Журнал и так пишется построчно — досылаем его на диск."""
+        with self._lock:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+
+    def close(self):
+        self.compact()
+        with self._lock:
+            self._journal.close()
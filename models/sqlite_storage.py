@@ -0,0 +1,354 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from models.async_storage import AsyncStorageMixin
+from models.storage import month_day, month_summary
+from utils.calendar_logic import local_today
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS children (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    parent_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    age INTEGER NOT NULL,
+    tz_label TEXT NOT NULL,
+    tz_offset INTEGER NOT NULL,
+    created TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_children_parent ON children (parent_id);
+CREATE INDEX IF NOT EXISTS idx_children_tz_offset ON children (tz_offset);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    child_id INTEGER NOT NULL,
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    task_id INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'new',
+    rerolls INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_child_date ON tasks (child_id, year, month, day);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+CHILD_COLUMNS = "id, parent_id, name, age, tz_label, tz_offset, created"
+TASK_COLUMNS = "id, child_id, year, month, day, task_id, status"
+
+
+class SQLiteStorage(AsyncStorageMixin):
+    """
+    То же API, что у models.storage.Storage, но поверх SQLite:
+    выборки идут по индексам, а запись меняет одну строку, а не весь файл.
+    """
+
+    def __init__(self, path: str="data/storage.db"):
+        self.path = path
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        # базы, созданные до появления счётчика reroll
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+        if "rerolls" not in columns:
+            with self._conn:
+                self._conn.execute("ALTER TABLE tasks ADD COLUMN rerolls INTEGER NOT NULL DEFAULT 0")
+        # и до даты добавления ребёнка: у старых детей она остаётся NULL
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(children)")}
+        if "created" not in columns:
+            with self._conn:
+                self._conn.execute("ALTER TABLE children ADD COLUMN created TEXT")
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # своё соединение на поток: читатели из пула не мешают друг другу (WAL)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def flush(self):
+        """Каждая транзакция уже закоммичена — сбрасывать нечего."""
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    # ---------- ВНУТРЕННИЕ ----------
+
+    @contextmanager
+    def _tx(self):
+        # внутри batch() коммит делает внешний блок
+        if getattr(self._local, "batch_depth", 0):
+            yield self._conn
+            return
+        with self._conn as conn:
+            yield conn
+
+    @contextmanager
+    def batch(self):
+        """Мутации внутри блока коммитятся одной транзакцией при выходе."""
+        depth = getattr(self._local, "batch_depth", 0)
+        self._local.batch_depth = depth + 1
+        try:
+            if depth:
+                yield self
+            else:
+                with self._conn:
+                    yield self
+        finally:
+            self._local.batch_depth = depth
+
+    @staticmethod
+    def _row(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        return dict(row) if row is not None else None
+
+    # ---------- ДЕТИ ----------
+
+    def add_child(self, parent_id: int, name: str, age: int,
+                  tz_label: str, tz_offset: int, created: Optional[str]=None) -> int:
+        created = created or local_today(tz_offset).isoformat()
+        with self._tx():
+            cur = self._conn.execute(
+                "INSERT INTO children (parent_id, name, age, tz_label, tz_offset, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (parent_id, name, age, tz_label, tz_offset, created)
+            )
+        return cur.lastrowid
+
+    def get_child(self, child_id: int) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            f"SELECT {CHILD_COLUMNS} FROM children WHERE id = ?", (child_id,)
+        ).fetchone()
+        return self._row(row)
+
+    def get_children_by_parent(self, parent_id: int) -> List[Dict[str, Any]]:
+        rows = self._conn.execute(
+            f"SELECT {CHILD_COLUMNS} FROM children WHERE parent_id = ? ORDER BY id",
+            (parent_id,)
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def get_children_by_tz_offset(self, tz_offset: int) -> List[Dict[str, Any]]:
+        """Дети с заданным смещением от UTC — для утренней рассылки по поясам."""
+        rows = self._conn.execute(
+            f"SELECT {CHILD_COLUMNS} FROM children WHERE tz_offset = ? ORDER BY id",
+            (tz_offset,)
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def delete_child(self, child_id: int):
+        """Удаляет ребёнка и все его задания из хранилища."""
+        with self._tx():
+            self._conn.execute("DELETE FROM tasks WHERE child_id = ?", (child_id,))
+            self._conn.execute("DELETE FROM children WHERE id = ?", (child_id,))
+
+    # ---------- ЗАПИСИ ЗАДАНИЙ ПО ДНЯМ ----------
+
+    def add_task_record(self, child_id: int, year: int, month: int, day: int, task_id: int):
+        with self._tx():
+            self._conn.execute(
+                "INSERT INTO tasks (child_id, year, month, day, task_id, status) "
+                "VALUES (?, ?, ?, ?, ?, 'new')",
+                (child_id, year, month, day, task_id)
+            )
+
+    def add_task_records(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Пакетная вставка записей одной транзакцией. Возвращает созданные записи."""
+        created = []
+        with self._tx():
+            for r in records:
+                cur = self._conn.execute(
+                    "INSERT INTO tasks (child_id, year, month, day, task_id, status) "
+                    "VALUES (?, ?, ?, ?, ?, 'new')",
+                    (r["child_id"], r["year"], r["month"], r["day"], r["task_id"])
+                )
+                created.append({
+                    "id": cur.lastrowid,
+                    "child_id": r["child_id"],
+                    "year": r["year"],
+                    "month": r["month"],
+                    "day": r["day"],
+                    "task_id": r["task_id"],
+                    "status": "new"
+                })
+        return created
+
+    def get_task_record(self, child_id: int, year: int, month: int, day: int) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            f"SELECT {TASK_COLUMNS} FROM tasks "
+            "WHERE child_id = ? AND year = ? AND month = ? AND day = ? "
+            "ORDER BY id LIMIT 1",
+            (child_id, year, month, day)
+        ).fetchone()
+        return self._row(row)
+
+    def set_task_status(self, child_id: int, year: int, month: int, day: int, status: str):
+        """Обновить статус задания для конкретного ребёнка и даты."""
+        with self._tx():
+            self._conn.execute(
+                "UPDATE tasks SET status = ? "
+                "WHERE child_id = ? AND year = ? AND month = ? AND day = ?",
+                (status, child_id, year, month, day)
+            )
+
+    def update_task_id(self, child_id: int, year: int, month: int, day: int, new_task_id: int) -> bool:
+        """Используется для reroll: заменить task_id у уже существующей записи."""
+        with self._tx():
+            cur = self._conn.execute(
+                "UPDATE tasks SET task_id = ?, status = 'new', rerolls = rerolls + 1 "
+                "WHERE child_id = ? AND year = ? AND month = ? AND day = ?",
+                (new_task_id, child_id, year, month, day)
+            )
+        return cur.rowcount > 0
+
+    # ---------- ВЫБОРКИ ДЛЯ СТАТИСТИКИ / PICKER ----------
+
+    def get_task_records_for_child(self, child_id: int, year: int, month: int) -> List[Dict[str, Any]]:
+        """Вернёт все записи заданий для ребёнка за указанный месяц/год."""
+        rows = self._conn.execute(
+            f"SELECT {TASK_COLUMNS} FROM tasks "
+            "WHERE child_id = ? AND year = ? AND month = ? ORDER BY day, id",
+            (child_id, year, month)
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def get_child_month_records(self, child_id: int, year: int, month: int) -> List[Dict[str, Any]]:
+        """Совместимость со старым кодом task_picker.py."""
+        return self.get_task_records_for_child(child_id, year, month)
+
+    def _month_counters(self, child_id: int, year: int, month: int) -> Tuple[int, int, int, int]:
+        # не больше строки на день месяца — по индексу (child_id, year, month, day)
+        issued = done = issued_mask = done_mask = 0
+        for day, status in self._conn.execute(
+            "SELECT day, status FROM tasks WHERE child_id = ? AND year = ? AND month = ?",
+            (child_id, year, month)
+        ):
+            issued += 1
+            issued_mask |= 1 << day
+            if status == "done":
+                done += 1
+                done_mask |= 1 << day
+        return issued, done, issued_mask, done_mask
+
+    def stream_snapshot(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Все дети и записи одним согласованным срезом — потоком, для аналитики.
+        Отдельное соединение держит читающую транзакцию: в WAL она видит базу
+        на момент первого SELECT и не мешает писателям.
+        """
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("BEGIN")
+            for row in conn.execute(f"SELECT {CHILD_COLUMNS} FROM children"):
+                yield "children", dict(row)
+            for row in conn.execute(f"SELECT {TASK_COLUMNS}, rerolls FROM tasks"):
+                yield "tasks", dict(row)
+        finally:
+            conn.close()
+
+    def get_month_stats(self, child_id: int, year: int, month: int,
+                        today: Optional[date]=None) -> Dict[str, int]:
+        """Выдано / выполнено / в процессе и серии за месяц; серия — от today (местной даты ребёнка)."""
+        return month_summary(*self._month_counters(child_id, year, month),
+                             today=month_day(year, month, today) if today else None)
+
+    def get_family_month_stats(self, parent_id: int, year: int, month: int,
+                               today_of: Optional[Callable[[Dict[str, Any]], date]]=None
+                               ) -> List[Tuple[Dict[str, Any], Dict[str, int]]]:
+        """Пары (ребёнок, статистика месяца) для всех детей родителя; today_of(ребёнок) — его местная дата."""
+        return [
+            (child, self.get_month_stats(child["id"], year, month, today_of(child) if today_of else None))
+            for child in self.get_children_by_parent(parent_id)
+        ]
+
+    # ---------- СЛУЖЕБНЫЕ ЗНАЧЕНИЯ ----------
+
+    def get_meta(self, key: str, default: Any=None) -> Any:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row["value"]) if row is not None else default
+
+    def set_meta(self, key: str, value: Any):
+        with self._tx():
+            self._conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (key, json.dumps(value, ensure_ascii=False))
+            )
+
+
+# ---------- МИГРАЦИЯ ИЗ storage.json ----------
+
+def migrate_json_to_sqlite(json_path: str, db_path: str) -> Tuple[int, int]:
+    """
+    Одноразовый перенос storage.json в SQLite с сохранением id.
+    Возвращает (число детей, число записей заданий).
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    storage = SQLiteStorage(db_path)
+    try:
+        conn = storage._conn
+        has_rows = conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM children) OR EXISTS (SELECT 1 FROM tasks)"
+        ).fetchone()[0]
+        if has_rows:
+            raise ValueError(f"{db_path} уже содержит данные, миграция отменена")
+
+        children = data.get("children", [])
+        tasks = data.get("tasks", [])
+        with conn:
+            conn.executemany(
+                f"INSERT INTO children ({CHILD_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (c["id"], c["parent_id"], c["name"], c["age"],
+                     c.get("tz_label", ""), c.get("tz_offset", 0), c.get("created"))
+                    for c in children
+                ]
+            )
+            conn.executemany(
+                f"INSERT INTO tasks ({TASK_COLUMNS}, rerolls) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (t["id"], t["child_id"], t["year"], t["month"], t["day"],
+                     t["task_id"], t.get("status", "new"), t.get("rerolls", 0))
+                    for t in tasks
+                ]
+            )
+    finally:
+        storage.close()
+    return len(children), len(tasks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Перенос storage.json в SQLite")
+    parser.add_argument("json_path", nargs="?", default="data/storage.json")
+    parser.add_argument("db_path", nargs="?", default="data/storage.db")
+    args = parser.parse_args()
+
+    n_children, n_tasks = migrate_json_to_sqlite(args.json_path, args.db_path)
+    print(f"Перенесено: детей {n_children}, записей заданий {n_tasks}")
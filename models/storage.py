@@ -1,162 +1,472 @@
 import json
 import os
-from typing import Any, Dict, List, Optional
+import threading
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
+from models.async_storage import AsyncStorageMixin
+from utils.calendar_logic import local_today
 
-class Storage:
 
-    def __init__(self, path: str="data/storage.json"):
+def _longest_run(mask: int) -> int:
+    longest = 0
+    while mask:
+        mask &= mask << 1
+        longest += 1
+    return longest
+
+
+def fsync_dir(path: str):
+    """fsync каталога файла: без него os.replace может не пережить падение питания."""
+    if os.name != "posix":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def month_day(year: int, month: int, today: date) -> int:
+    """
+    Номер «сегодня» внутри месяца: день для текущего месяца, 0 — месяц ещё
+    не начался, 32 — уже закончился (такого дня нет, он не бывает выполнен).
+    """
+    if (year, month) == (today.year, today.month):
+        return today.day
+    return 0 if (year, month) > (today.year, today.month) else 32
+
+
+def month_summary(issued: int, done: int, issued_mask: int, done_mask: int,
+                  today: Optional[int]=None) -> Dict[str, int]:
+    """
+    Статистика месяца из счётчиков. Маски — биты дней (бит d — день d).
+
+    Текущая серия — выполненные подряд дни, заканчивающиеся днём today
+    (см. month_day; без него — последним выданным днём). Невыполненное
+    задание этого дня серию не обрывает: она считается от предыдущего дня.
+    Купленный календарь выдаёт весь месяц сразу, поэтому для него нужен today.
+    """
+    current = 0
+    if today is None:
+        today = issued_mask.bit_length() - 1
+    day = today
+    if day > 0 and not done_mask >> day & 1:
+        day -= 1
+    while day > 0 and done_mask >> day & 1:
+        current += 1
+        day -= 1
+    return {
+        "issued": issued,
+        "done": done,
+        "pending": issued - done,
+        "current_streak": current,
+        "longest_streak": _longest_run(done_mask),
+    }
+
+
+def iter_json_snapshot(path: str, chunk_size: int=1 << 16) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Потоково читает storage.json: отдаёт пары ("children", ребёнок) и ("tasks", запись)
+    по одной, не загружая файл целиком. Остальные ключи верхнего уровня пропускаются.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+
+        def more() -> bool:
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buf, pos = buf[pos:] + chunk, 0
+            return True
+
+        def peek() -> str:
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos].isspace():
+                    pos += 1
+                if pos < len(buf) or not more():
+                    return buf[pos:pos + 1]
+
+        def expect(chars: str) -> str:
+            nonlocal pos
+            ch = peek()
+            if not ch or ch not in chars:
+                raise ValueError(f"{path}: ожидался один из {chars!r}, получено {ch!r}")
+            pos += 1
+            return ch
+
+        def value() -> Any:
+            nonlocal pos
+            peek()
+            while True:
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if more():
+                        continue
+                    raise
+                # число на краю буфера могло оборваться — дочитываем
+                if end == len(buf) and not eof and more():
+                    continue
+                pos = end
+                return obj
+
+        expect("{")
+        if peek() == "}":
+            return
+        while True:
+            key = value()
+            expect(":")
+            if key in ("children", "tasks") and peek() == "[":
+                expect("[")
+                if peek() == "]":
+                    pos += 1
+                else:
+                    while True:
+                        yield key, value()
+                        if expect(",]") == "]":
+                            break
+            else:
+                value()
+            if expect(",}") == "}":
+                return
+
+
+class _Snapshot:
+    """
+    Содержимое storage.json в памяти и словари-индексы поверх него:
+    по id ребёнка, по родителю, по часовому поясу, по (ребёнок, дата)
+    и по (ребёнок, месяц), плюс счётчики статистики по (ребёнок, месяц).
+    """
+
+    def __init__(self, data: Dict[str, Any], version: Optional[Tuple[int, int]]=None):
+        data.setdefault("children", [])
+        data.setdefault("tasks", [])
+        # Счётчики id хранятся в самом файле. У старых файлов без "meta"
+        # они один раз вычисляются по максимальному id.
+        meta = data.setdefault("meta", {})
+        if "next_child_id" not in meta:
+            meta["next_child_id"] = max((c.get("id", 0) for c in data["children"]), default=0) + 1
+        if "next_task_id" not in meta:
+            meta["next_task_id"] = max((t.get("id", 0) for t in data["tasks"]), default=0) + 1
+        self.data = data
+        self.version = version
+        self.children: Dict[int, Dict[str, Any]] = {}
+        self.by_parent: Dict[int, List[Dict[str, Any]]] = {}
+        self.by_offset: Dict[int, List[Dict[str, Any]]] = {}
+        self.by_date: Dict[Tuple[int, int, int, int], List[Dict[str, Any]]] = {}
+        self.by_month: Dict[Tuple[int, int, int], List[Dict[str, Any]]] = {}
+        self.months: Dict[int, set] = {}
+        # (ребёнок, год, месяц) -> [выдано, выполнено, маска выданных дней, маска выполненных];
+        # списки тоже заменяются целиком
+        self.counters: Dict[Tuple[int, int, int], List[int]] = {}
+
+        for child in data["children"]:
+            self.index_child(child)
+        for rec in data["tasks"]:
+            self.index_record(rec)
+
+    # Списки в индексах не меняются на месте, а заменяются новыми —
+    # читатель без блокировки всегда видит целый список.
+
+    def allocate_ids(self, sequence: str, count: int=1) -> int:
+        """Выделить count подряд идущих id из счётчика; вернёт первый. Только под блокировкой."""
+        meta = self.data["meta"]
+        first = meta[sequence]
+        meta[sequence] = first + count
+        return first
+
+    def index_child(self, child: Dict[str, Any]):
+        self.children[child.get("id")] = child
+        parent_id = child.get("parent_id")
+        self.by_parent[parent_id] = self.by_parent.get(parent_id, []) + [child]
+        offset = child.get("tz_offset", 0)
+        self.by_offset[offset] = self.by_offset.get(offset, []) + [child]
+
+    def index_record(self, rec: Dict[str, Any]):
+        child_id = rec.get("child_id")
+        date_key = (child_id, rec.get("year"), rec.get("month"), rec.get("day"))
+        month_key = date_key[:3]
+        self.by_date[date_key] = self.by_date.get(date_key, []) + [rec]
+        self.by_month[month_key] = self.by_month.get(month_key, []) + [rec]
+        self.months.setdefault(child_id, set()).add(month_key)
+
+        counters = list(self.counters.get(month_key, (0, 0, 0, 0)))
+        counters[0] += 1
+        counters[2] |= 1 << rec.get("day", 0)
+        if rec.get("status") == "done":
+            counters[1] += 1
+            counters[3] |= 1 << rec.get("day", 0)
+        self.counters[month_key] = counters
+
+    def count_status(self, rec: Dict[str, Any], new_status: str):
+        """Поправить счётчики перед сменой статуса записи."""
+        was_done = rec.get("status") == "done"
+        if was_done == (new_status == "done"):
+            return
+        month_key = (rec.get("child_id"), rec.get("year"), rec.get("month"))
+        counters = list(self.counters[month_key])
+        bit = 1 << rec.get("day", 0)
+        if was_done:
+            counters[1] -= 1
+            counters[3] &= ~bit
+        else:
+            counters[1] += 1
+            counters[3] |= bit
+        self.counters[month_key] = counters
+
+    def unindex_child(self, child_id: int):
+        child = self.children.pop(child_id, None)
+        if child is not None:
+            parent_id = child.get("parent_id")
+            self.by_parent[parent_id] = [
+                c for c in self.by_parent.get(parent_id, []) if c.get("id") != child_id
+            ]
+            offset = child.get("tz_offset", 0)
+            self.by_offset[offset] = [
+                c for c in self.by_offset.get(offset, []) if c.get("id") != child_id
+            ]
+        for month_key in self.months.pop(child_id, ()):
+            self.counters.pop(month_key, None)
+            for rec in self.by_month.pop(month_key, ()):
+                self.by_date.pop(month_key + (rec.get("day"),), None)
+
+
+class Storage(AsyncStorageMixin):
+    """
+    Хранилище storage.json с индексами в памяти.
+
+    Файл читается один раз и перечитывается, только если изменился на диске
+    (mtime/размер). Чтения не берут блокировок и отдают копии записей,
+    мутации идут под блокировкой. Файл пишется компактно во временный файл
+    с атомарной подменой; при flush_interval > 0 запись отложенная: мутации
+    за окно (или flush_every штук) сливаются в один сброс.
+    Для хендлеров есть awaitable-версии методов: await storage.aio.<метод>(...).
+    """
+
+    _batch_depth = 0
+    _batch_dirty = False
+
+    def __init__(self, path: str="data/storage.json",
+                 flush_interval: float=0.0, flush_every: int=0):
         self.path = path
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+        self._lock = threading.RLock()
+        self._snapshot: Optional[_Snapshot] = None
+        self._dirty = False
+        self._pending_ops = 0
+        self._flush_timer: Optional[threading.Timer] = None
         os.makedirs(os.path.dirname(self.path), exist_ok=True)
         if not os.path.exists(self.path):
-            self._save({"children": [], "tasks": []})
+            self._write({"children": [], "tasks": []})
 
     # ---------- ВНУТРЕННИЕ ----------
 
+    def _file_version(self) -> Tuple[int, int]:
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
     def _load(self) -> Dict[str, Any]:
         with open(self.path, "r", encoding="utf-8") as f:
             return json.load(f)
 
+    def _write(self, data: Dict[str, Any]):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        fsync_dir(self.path)
+        if self._snapshot is not None and self._snapshot.data is data:
+            self._snapshot.version = self._file_version()
+
     def _save(self, data: Dict[str, Any]):
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        if self._batch_depth:
+            self._batch_dirty = True
+            return
+        if self.flush_interval <= 0:
+            self._write(data)
+            return
 
-    # ---------- ДЕТИ ----------
+        self._dirty = True
+        self._pending_ops += 1
+        if self.flush_every and self._pending_ops >= self.flush_every:
+            self.flush()
+        elif self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self):
+        """Сбросить отложенные изменения на диск (обязательно при остановке бота)."""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if self._dirty:
+                self._write(self._snapshot.data)
+                self._dirty = False
+                self._pending_ops = 0
+
+    @contextmanager
+    def batch(self):
+        """Мутации внутри блока сохраняются на диск одной записью при выходе."""
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth and self._batch_dirty:
+                    self._batch_dirty = False
+                    self._save(self._snapshot.data)
+
+    def _fresh(self) -> _Snapshot:
+        """Актуальный снапшот: перечитываем файл, только если его поменяли извне."""
+        snapshot = self._snapshot
+        if snapshot is not None and self._dirty:
+            # в памяти есть ещё не сброшенные изменения — они главнее файла
+            return snapshot
+        version = self._file_version()
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = _Snapshot(self._load(), version)
+            return self._snapshot
 
-    def _next_child_id(self, data: Dict[str, Any]) -> int:
-        children = data.get("children", [])
-        if not children:
-            return 1
-        return max(c.get("id", 0) for c in children) + 1
+    # ---------- ДЕТИ ----------
 
     def add_child(self, parent_id: int, name: str, age: int,
-                  tz_label: str, tz_offset: int) -> int:
-        data = self._load()
-        children = data.get("children", [])
-        child_id = self._next_child_id(data)
-        children.append({
-            "id": child_id,
-            "parent_id": parent_id,
-            "name": name,
-            "age": age,
-            "tz_label": tz_label,
-            "tz_offset": tz_offset
-        })
-        data["children"] = children
-        self._save(data)
+                  tz_label: str, tz_offset: int, created: Optional[str]=None) -> int:
+        """created — местная дата добавления (ISO), по умолчанию сегодняшняя в поясе ребёнка."""
+        created = created or local_today(tz_offset).isoformat()
+        with self._lock:
+            snapshot = self._fresh()
+            data = snapshot.data
+            child_id = snapshot.allocate_ids("next_child_id")
+            child = {
+                "id": child_id,
+                "parent_id": parent_id,
+                "name": name,
+                "age": age,
+                "tz_label": tz_label,
+                "tz_offset": tz_offset,
+                "created": created
+            }
+            data["children"].append(child)
+            snapshot.index_child(child)
+            self._save(data)
         return child_id
 
     def get_child(self, child_id: int) -> Optional[Dict[str, Any]]:
-        data = self._load()
-        for c in data.get("children", []):
-            if c.get("id") == child_id:
-                return c
-        return None
+        child = self._fresh().children.get(child_id)
+        return dict(child) if child is not None else None
 
     def get_children_by_parent(self, parent_id: int) -> List[Dict[str, Any]]:
-        data = self._load()
-        return [c for c in data.get("children", []) if c.get("parent_id") == parent_id]
+        return [dict(c) for c in self._fresh().by_parent.get(parent_id, [])]
+
+    def get_children_by_tz_offset(self, tz_offset: int) -> List[Dict[str, Any]]:
+        """Дети с заданным смещением от UTC — для утренней рассылки по поясам."""
+        return [dict(c) for c in self._fresh().by_offset.get(tz_offset, [])]
 
     def delete_child(self, child_id: int):
         """Удаляет ребёнка и все его задания из хранилища."""
-        data = self._load()
-
-        children = data.get("children", [])
-        children = [c for c in children if c.get("id") != child_id]
-        data["children"] = children
-
-        tasks = data.get("tasks", [])
-        tasks = [t for t in tasks if t.get("child_id") != child_id]
-        data["tasks"] = tasks
-
-        self._save(data)
+        with self._lock:
+            snapshot = self._fresh()
+            data = snapshot.data
+            data["children"] = [c for c in data["children"] if c.get("id") != child_id]
+            data["tasks"] = [t for t in data["tasks"] if t.get("child_id") != child_id]
+            snapshot.unindex_child(child_id)
+            self._save(data)
 
     # ---------- ЗАПИСИ ЗАДАНИЙ ПО ДНЯМ ----------
 
-    def _next_task_record_id(self, data: Dict[str, Any]) -> int:
-        tasks = data.get("tasks", [])
-        if not tasks:
-            return 1
-        return max(t.get("id", 0) for t in tasks) + 1
-
     def add_task_record(self, child_id: int, year: int, month: int, day: int, task_id: int):
-        data = self._load()
-        tasks = data.get("tasks", [])
-
-        rec_id = self._next_task_record_id(data)
-        tasks.append({
-            "id": rec_id,
-            "child_id": child_id,
-            "year": year,
-            "month": month,
-            "day": day,
-            "task_id": task_id,
-            "status": "new"
-        })
-        data["tasks"] = tasks
-        self._save(data)
+        with self._lock:
+            snapshot = self._fresh()
+            data = snapshot.data
+            rec = {
+                "id": snapshot.allocate_ids("next_task_id"),
+                "child_id": child_id,
+                "year": year,
+                "month": month,
+                "day": day,
+                "task_id": task_id,
+                "status": "new"
+            }
+            data["tasks"].append(rec)
+            snapshot.index_record(rec)
+            self._save(data)
+
+    def add_task_records(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Пакетная вставка записей (child_id, year, month, day, task_id)
+        одной записью файла. Возвращает созданные записи.
+        """
+        created = []
+        with self._lock:
+            snapshot = self._fresh()
+            data = snapshot.data
+            next_id = snapshot.allocate_ids("next_task_id", len(records))
+            for offset, r in enumerate(records):
+                rec = {
+                    "id": next_id + offset,
+                    "child_id": r["child_id"],
+                    "year": r["year"],
+                    "month": r["month"],
+                    "day": r["day"],
+                    "task_id": r["task_id"],
+                    "status": "new"
+                }
+                data["tasks"].append(rec)
+                snapshot.index_record(rec)
+                created.append(dict(rec))
+            if created:
+                self._save(data)
+        return created
 
     def get_task_record(self, child_id: int, year: int, month: int, day: int) -> Optional[Dict[str, Any]]:
-        data = self._load()
-        for rec in data.get("tasks", []):
-            if (
-                rec.get("child_id") == child_id and
-                rec.get("year") == year and
-                rec.get("month") == month and
-                rec.get("day") == day
-            ):
-                return rec
-        return None
+        records = self._fresh().by_date.get((child_id, year, month, day))
+        return dict(records[0]) if records else None
 
     def set_task_status(self, child_id: int, year: int, month: int, day: int, status: str):
         """Обновить статус задания для конкретного ребёнка и даты."""
-        data = self._load()
-        tasks = data.get("tasks", [])
-        for rec in tasks:
-            if (
-                rec.get("child_id") == child_id and
-                rec.get("year") == year and
-                rec.get("month") == month and
-                rec.get("day") == day
-            ):
+        with self._lock:
+            snapshot = self._fresh()
+            records = snapshot.by_date.get((child_id, year, month, day), [])
+            for rec in records:
+                snapshot.count_status(rec, status)
                 rec["status"] = status
-        data["tasks"] = tasks
-        self._save(data)
+            if records:
+                self._save(snapshot.data)
 
     def update_task_id(self, child_id: int, year: int, month: int, day: int, new_task_id: int) -> bool:
         """Используется для reroll: заменить task_id у уже существующей записи."""
-        data = self._load()
-        updated = False
-        tasks = data.get("tasks", [])
-        for rec in tasks:
-            if (
-                rec.get("child_id") == child_id and
-                rec.get("year") == year and
-                rec.get("month") == month and
-                rec.get("day") == day
-            ):
+        with self._lock:
+            snapshot = self._fresh()
+            records = snapshot.by_date.get((child_id, year, month, day), [])
+            for rec in records:
+                snapshot.count_status(rec, "new")
                 rec["task_id"] = new_task_id
                 rec["status"] = "new"
-                updated = True
-        data["tasks"] = tasks
-        self._save(data)
-        return updated
+                rec["rerolls"] = rec.get("rerolls", 0) + 1
+            if records:
+                self._save(snapshot.data)
+        return bool(records)
 
     # ---------- ВЫБОРКИ ДЛЯ СТАТИСТИКИ / PICKER ----------
 
     def get_task_records_for_child(self, child_id: int, year: int, month: int) -> List[Dict[str, Any]]:
         """Вернёт все записи заданий для ребёнка за указанный месяц/год."""
-        data = self._load()
-        tasks = data.get("tasks", [])
-        result = []
-        for rec in tasks:
-            if (
-                rec.get("child_id") == child_id and
-                rec.get("year") == year and
-                rec.get("month") == month
-            ):
-                result.append(rec)
-        return result
+        return [dict(r) for r in self._fresh().by_month.get((child_id, year, month), [])]
 
     def get_child_month_records(self, child_id: int, year: int, month: int) -> List[Dict[str, Any]]:
         """
@@ -164,3 +474,88 @@ class Storage:
         Возвращает те же данные, что и get_task_records_for_child.
         """
         return self.get_task_records_for_child(child_id, year, month)
+
+    def stream_snapshot(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Все дети и записи последней записанной на диск версии — потоком, для аналитики.
+        Файл подменяется атомарно, так что открытый файл не меняется под читателем
+        и живые записи не ждут. Отложенные (ещё не сброшенные) мутации сюда не попадут.
+        """
+        return iter_json_snapshot(self.path)
+
+    def get_month_stats(self, child_id: int, year: int, month: int,
+                        today: Optional[date]=None) -> Dict[str, int]:
+        """
+        Выдано / выполнено / в процессе и серии за месяц — из готовых счётчиков.
+        today — местная дата ребёнка, от неё считается текущая серия.
+        """
+        counters = self._fresh().counters.get((child_id, year, month), (0, 0, 0, 0))
+        return month_summary(*counters, today=month_day(year, month, today) if today else None)
+
+    def get_family_month_stats(self, parent_id: int, year: int, month: int,
+                               today_of: Optional[Callable[[Dict[str, Any]], date]]=None
+                               ) -> List[Tuple[Dict[str, Any], Dict[str, int]]]:
+        """
+        Пары (ребёнок, статистика месяца) для всех детей родителя.
+        today_of(ребёнок) — его местная дата (у детей семьи пояса могут различаться).
+        """
+        snapshot = self._fresh()
+        return [
+            (dict(c), month_summary(
+                *snapshot.counters.get((c["id"], year, month), (0, 0, 0, 0)),
+                today=month_day(year, month, today_of(c)) if today_of else None
+            ))
+            for c in snapshot.by_parent.get(parent_id, [])
+        ]
+
+    # ---------- СЛУЖЕБНЫЕ ЗНАЧЕНИЯ ----------
+
+    def get_meta(self, key: str, default: Any=None) -> Any:
+        """Служебное значение из раздела meta (например, отметка утренней рассылки)."""
+        return self._fresh().data["meta"].get(key, default)
+
+    def set_meta(self, key: str, value: Any):
+        with self._lock:
+            snapshot = self._fresh()
+            snapshot.data["meta"][key] = value
+            self._save(snapshot.data)
+
+
+def create_storage():
+    """Хранилище, выбранное через config.STORAGE_BACKEND."""
+    from config import (
+        STORAGE_BACKEND, DB_PATH, SQLITE_PATH, JOURNAL_PATH, JOURNAL_COMPACT_EVERY,
+        STORAGE_FLUSH_INTERVAL, STORAGE_FLUSH_EVERY
+    )
+
+    if STORAGE_BACKEND == "json":
+        return Storage(
+            path=str(DB_PATH),
+            flush_interval=STORAGE_FLUSH_INTERVAL,
+            flush_every=STORAGE_FLUSH_EVERY
+        )
+    if STORAGE_BACKEND == "journal":
+        from models.journal_storage import JournalStorage
+        return JournalStorage(
+            path=str(DB_PATH),
+            journal_path=str(JOURNAL_PATH),
+            compact_every=JOURNAL_COMPACT_EVERY
+        )
+    if STORAGE_BACKEND == "sqlite":
+        from models.sqlite_storage import SQLiteStorage
+        return SQLiteStorage(path=str(SQLITE_PATH))
+    raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+
+
+_shared_storage = None
+_shared_lock = threading.Lock()
+
+
+def get_storage():
+    """Одно хранилище на процесс — его используют все роутеры."""
+    global _shared_storage
+    if _shared_storage is None:
+        with _shared_lock:
+            if _shared_storage is None:
+                _shared_storage = create_storage()
+    return _shared_storage
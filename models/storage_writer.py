@@ -0,0 +1,102 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, List, Optional, Tuple
+
+# (имя метода, args, kwargs, future вызывающего)
+Command = Tuple[str, tuple, dict, asyncio.Future]
+
+
+class StorageWriter:
+    """
+    Единственный писатель хранилища.
+
+    Мутации встают в очередь и применяются строго по порядку в одном потоке.
+    Всё, что накопилось в очереди, применяется пачкой внутри storage.batch()
+    и сбрасывается на диск одной записью; future каждого вызывающего
+    завершается только после этого сброса.
+
+    Если у хранилища включена отложенная запись (flush_interval > 0), писатель
+    собирает пачки в течение окна (или до flush_every мутаций) и сбрасывает
+    их один раз — вызывающие ждут этого общего сброса.
+    """
+
+    def __init__(self, storage, max_batch: int=256):
+        self.storage = storage
+        self.max_batch = max_batch
+        self._queue: Deque[Command] = deque()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage-writer")
+        self._drainer: Optional[asyncio.Task] = None
+        self._arrived: Optional[asyncio.Event] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    async def submit(self, method: str, *args, **kwargs) -> Any:
+        """Поставить мутацию в очередь и дождаться, пока она окажется на диске."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((method, args, kwargs, future))
+        if self._arrived is not None:
+            self._arrived.set()
+        if self._drainer is None or self._drainer.done():
+            self._drainer = loop.create_task(self._drain())
+        return await future
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        window = getattr(self.storage, "flush_interval", 0)
+        flush_every = getattr(self.storage, "flush_every", 0)
+        while self._queue:
+            deadline = loop.time() + window
+            applied: List[Tuple[Command, Tuple[bool, Any]]] = []
+            while self._queue:
+                batch = []
+                while self._queue and len(batch) < self.max_batch:
+                    batch.append(self._queue.popleft())
+                try:
+                    outcomes = await loop.run_in_executor(self._executor, self._apply, batch)
+                except Exception as e:
+                    outcomes = [(False, e)] * len(batch)
+                applied.extend(zip(batch, outcomes))
+
+                if flush_every and len(applied) >= flush_every:
+                    break
+                delay = deadline - loop.time()
+                if delay <= 0:
+                    break
+                if not self._queue:
+                    # окно ещё открыто — ждём следующие мутации, но не дольше окна
+                    self._arrived = asyncio.Event()
+                    try:
+                        await asyncio.wait_for(self._arrived.wait(), delay)
+                    except asyncio.TimeoutError:
+                        break
+                    finally:
+                        self._arrived = None
+
+            try:
+                # вызывающие ждут долговечной записи
+                await loop.run_in_executor(self._executor, self.storage.flush)
+            except Exception as e:
+                # не удалось сбросить на диск — ошибка у всех, кто ждал этого сброса
+                applied = [(command, (False, e)) for command, _ in applied]
+
+            for (_, _, _, future), (ok, value) in applied:
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    def _apply(self, batch: List[Command]) -> List[Tuple[bool, Any]]:
+        outcomes = []
+        with self.storage.batch():
+            for method, args, kwargs, _ in batch:
+                try:
+                    outcomes.append((True, getattr(self.storage, method)(*args, **kwargs)))
+                except Exception as e:
+                    outcomes.append((False, e))
+        return outcomes
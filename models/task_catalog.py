@@ -0,0 +1,226 @@
+import asyncio
+import json
+import logging
+import os
+import random
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import TASKS_FILE
+from utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+MAX_AGE = 99
+DAY_TYPES = ("weekday", "weekend", "christmas_eve", "christmas_day", "new_year")
+
+
+class TaskCatalog:
+    """
+    Задания из tasks_ru.json, разобранные один раз:
+    словарь id → задание и готовые корзины кандидатов по (возраст, тип дня).
+
+    У каждого задания есть плотный номер 0..n-1 (порядок в файле), поэтому
+    множество заданий можно держать битовой маской int: бит i — задание tasks[i].
+    """
+
+    def __init__(self, tasks: List[Dict[str, Any]]):
+        self.tasks = tasks
+        self.by_id: Dict[int, Dict[str, Any]] = {t["id"]: t for t in tasks}
+        self.index: Dict[int, int] = {t["id"]: i for i, t in enumerate(tasks)}
+
+        by_age: Dict[int, List[Dict[str, Any]]] = {}
+        by_age_day: Dict[Tuple[int, str], List[Dict[str, Any]]] = {}
+        for t in tasks:
+            for age in range(max(t["min_age"], 0), min(t["max_age"], MAX_AGE) + 1):
+                by_age.setdefault(age, []).append(t)
+                for day_type in t["day_types"]:
+                    by_age_day.setdefault((age, day_type), []).append(t)
+
+        self._by_age = {k: tuple(v) for k, v in by_age.items()}
+        self._by_age_day = {k: tuple(v) for k, v in by_age_day.items()}
+        self._age_masks = {k: self.mask_of(t["id"] for t in v) for k, v in by_age.items()}
+        self._age_day_masks = {k: self.mask_of(t["id"] for t in v) for k, v in by_age_day.items()}
+
+    @classmethod
+    def from_file(cls, path=TASKS_FILE) -> "TaskCatalog":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def get(self, task_id: int) -> Optional[Dict[str, Any]]:
+        return self.by_id.get(task_id)
+
+    def candidates(self, age: int, day_type: str) -> Tuple[Dict[str, Any], ...]:
+        """Задания, подходящие по возрасту и типу дня."""
+        return self._by_age_day.get((age, day_type), ())
+
+    def for_age(self, age: int) -> Tuple[Dict[str, Any], ...]:
+        """Все задания, подходящие по возрасту."""
+        return self._by_age.get(age, ())
+
+    # ---------- БИТОВЫЕ МАСКИ ----------
+
+    def mask_of(self, task_ids: Iterable[int]) -> int:
+        """Маска заданий; id, которых нет в каталоге (удалены из файла), пропускаются."""
+        mask = 0
+        for task_id in task_ids:
+            i = self.index.get(task_id)
+            if i is not None:
+                mask |= 1 << i
+        return mask
+
+    def candidates_mask(self, age: int, day_type: str) -> int:
+        return self._age_day_masks.get((age, day_type), 0)
+
+    def age_mask(self, age: int) -> int:
+        return self._age_masks.get(age, 0)
+
+    def tasks_in(self, mask: int) -> List[Dict[str, Any]]:
+        result = []
+        while mask:
+            low = mask & -mask
+            result.append(self.tasks[low.bit_length() - 1])
+            mask ^= low
+        return result
+
+    def choice(self, mask: int, rnd: random.Random=random) -> Dict[str, Any]:
+        """Случайное задание из непустой маски — без построения списка кандидатов."""
+        k = rnd.randrange(mask.bit_count())
+        for _ in range(k):
+            mask &= mask - 1  # снимаем младший бит
+        return self.tasks[(mask & -mask).bit_length() - 1]
+
+
+def validate_tasks(tasks: Any, previous: Optional[TaskCatalog]=None) -> List[str]:
+    """
+    Ошибки в содержимом tasks_ru.json; пустой список — файл годится.
+    С previous проверяется ещё, что ни одно задание не пропало: на старые id
+    ссылаются уже выданные записи, без задания их не показать.
+    """
+    if not isinstance(tasks, list) or not tasks:
+        return ["ожидался непустой список заданий"]
+    errors: List[str] = []
+    seen = set()
+    for n, t in enumerate(tasks):
+        where = f"задание #{n}"
+        if not isinstance(t, dict):
+            errors.append(f"{where}: ожидался объект")
+            continue
+        task_id = t.get("id")
+        if not isinstance(task_id, int) or isinstance(task_id, bool):
+            errors.append(f"{where}: id должен быть целым числом")
+        elif task_id in seen:
+            errors.append(f"{where}: id={task_id} повторяется")
+        else:
+            seen.add(task_id)
+            where = f"задание id={task_id}"
+        min_age, max_age = t.get("min_age"), t.get("max_age")
+        if not isinstance(min_age, int) or not isinstance(max_age, int) or min_age > max_age:
+            errors.append(f"{where}: min_age и max_age должны быть целыми, min_age <= max_age")
+        day_types = t.get("day_types")
+        if not isinstance(day_types, list) or not day_types or any(d not in DAY_TYPES for d in day_types):
+            errors.append(f"{where}: day_types — непустой список из {', '.join(DAY_TYPES)}")
+        text = t.get("text")
+        if not isinstance(text, str) or not text.strip():
+            errors.append(f"{where}: нет текста")
+        else:
+            try:
+                text.format(name="")
+            except (KeyError, IndexError, ValueError):
+                errors.append(f"{where}: в тексте допустима только подстановка {{name}}")
+    if previous is not None:
+        missing = sorted(set(previous.by_id) - seen)
+        if missing:
+            errors.append(f"пропали задания с id {missing}: на них ссылаются выданные записи")
+    return errors
+
+
+def load_catalog(path=TASKS_FILE, previous: Optional[TaskCatalog]=None) -> TaskCatalog:
+    """Читает и проверяет файл заданий; при ошибках — ValueError со списком всех ошибок."""
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            tasks = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path}: некорректный JSON: {e}") from e
+    errors = validate_tasks(tasks, previous)
+    if errors:
+        raise ValueError(f"{path}: " + "; ".join(errors))
+    return TaskCatalog(tasks)
+
+
+_catalog: Optional[TaskCatalog] = None
+
+
+def get_catalog() -> TaskCatalog:
+    """
+    Каталог заданий процесса, загружается при первом обращении.
+    Перезагрузка подменяет только ссылку, старый объект остаётся целым, поэтому
+    хендлер, которому нужен каталог в нескольких местах, берёт его один раз
+    и передаёт дальше (см. handle_full_calendar_free).
+    """
+    global _catalog
+    if _catalog is None:
+        _catalog = TaskCatalog.from_file(TASKS_FILE)
+    return _catalog
+
+
+def set_catalog(catalog: TaskCatalog):
+    global _catalog
+    _catalog = catalog
+
+
+def _file_stamp(path) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class CatalogWatcher:
+    """
+    Раз в interval секунд смотрит на mtime и размер файла заданий.
+    Изменился — файл читается и проверяется в потоке, вне event loop,
+    и готовый каталог подменяет текущий одним присваиванием.
+    Файл с ошибками в лог, текущий каталог остаётся.
+    """
+
+    def __init__(self, path=TASKS_FILE, interval: float=5.0):
+        self.path = path
+        self.interval = interval
+        self.reloads = 0
+        self.failures = 0
+        self._stamp = _file_stamp(path)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check()
+
+    async def check(self) -> bool:
+        """Перезагружает каталог, если файл поменялся; True — новый каталог подменён."""
+        stamp = _file_stamp(self.path)
+        if stamp is None or stamp == self._stamp:
+            return False
+        # запоминаем сразу: битый файл не перечитываем, пока его снова не сохранят
+        self._stamp = stamp
+        try:
+            catalog = await asyncio.to_thread(load_catalog, self.path, get_catalog())
+        except (OSError, ValueError) as e:
+            self.failures += 1
+            registry.inc("advent_catalog_reloads_total", result="error")
+            logger.error("Task catalog reload failed, keeping the current one: %s", e)
+            return False
+        set_catalog(catalog)
+        self.reloads += 1
+        registry.inc("advent_catalog_reloads_total", result="ok")
+        logger.info("Task catalog reloaded: %d tasks from %s", len(catalog.tasks), self.path)
+        return True
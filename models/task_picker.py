@@ -1,49 +1,373 @@
-import json
-import random
-from typing import Dict, Any, List
+import calendar
+import hashlib
+import hmac
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Tuple
 from datetime import date
-from pathlib import Path
-from config import TASKS_FILE
+from config import PICKER_SEASONS, PICKER_FAMILY, PICKER_MODE, PICKER_KEY
+from models.storage import month_day, month_summary
+from models.task_catalog import TaskCatalog, get_catalog
 from utils.calendar_logic import get_day_type
+from utils.metrics import registry
 
 
 def load_tasks() -> List[Dict[str, Any]]:
-    with open(TASKS_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-def get_used_tasks(child_id: int, storage, year: int, month: int=12) -> set:
-    """Все использованные task_id за год для ребенка"""
-    records = storage.get_child_month_records(child_id, year, month)
-    return {r["task_id"] for r in records}
-
-
-def pick_task(child: Dict[str, Any], date_: date, storage, child_id: int) -> Dict[str, Any]:
-    tasks = load_tasks()
-    age = child["age"]
-    day_type = get_day_type(date_)
-    year = date_.year
-    
-    used_ids = get_used_tasks(child_id, storage, year)
-    
-    # 1. Точные: возраст + день + не использованные ЭТОТ год
-    suitable = [
-        t for t in tasks
-        if t["min_age"] <= age <= t["max_age"]
-        and day_type in t["day_types"]
-        and t["id"] not in used_ids
-    ]
-    
-    # 2. Fallback: возраст + день (игнор годовых повторов)
-    if not suitable:
-        suitable = [t for t in tasks 
-                   if t["min_age"] <= age <= t["max_age"] and day_type in t["day_types"]]
-    
+    return get_catalog().tasks
+
+
+def _season_years(year: int, seasons: int) -> range:
+    return range(year - seasons, year)
+
+
+class _PastSeasonsCache:
+    """
+    Маски заданий прошлых сезонов по (ребёнок, год, месяц, сезонов).
+    Прошлые декабри почти не меняются, поэтому маска пересобирается только если
+    сменился каталог или число записей в каком-то из этих сезонов (счётчик O(1)).
+    """
+
+    def __init__(self, max_size: int=10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[tuple, Tuple[TaskCatalog, tuple, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, child_id: int, storage, year: int, month: int, seasons: int, catalog: TaskCatalog) -> int:
+        years = _season_years(year, seasons)
+        if not years:
+            return 0
+        key = (child_id, year, month, seasons)
+        issued = tuple(storage.get_month_stats(child_id, y, month)["issued"] for y in years)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is catalog and entry[1] == issued:
+                self._entries.move_to_end(key)
+                return entry[2]
+
+        mask = 0
+        for y, n in zip(years, issued):
+            if n:
+                mask |= catalog.mask_of(r["task_id"] for r in storage.get_child_month_records(child_id, y, month))
+        with self._lock:
+            self._entries[key] = (catalog, issued, mask)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return mask
+
+
+_past_seasons = _PastSeasonsCache()
+
+
+def used_task_mask(child_id: int, storage, year: int, catalog: TaskCatalog,
+                   seasons: int=PICKER_SEASONS, month: int=12) -> int:
+    """Маска заданий, уже выданных ребёнку в этом и seasons прошлых декабрях."""
+    current = catalog.mask_of(r["task_id"] for r in storage.get_child_month_records(child_id, year, month))
+    return current | _past_seasons.get(child_id, storage, year, month, seasons, catalog)
+
+
+def siblings(child: Dict[str, Any], storage) -> List[Dict[str, Any]]:
+    return [c for c in storage.get_children_by_parent(child["parent_id"]) if c["id"] != child["id"]]
+
+
+def sibling_day_mask(child: Dict[str, Any], date_: date, storage, catalog: TaskCatalog) -> int:
+    """Задания братьев и сестёр на эту дату — в семейном режиме их не повторяем."""
+    task_ids = []
+    for sibling in siblings(child, storage):
+        rec = storage.get_task_record(sibling["id"], date_.year, date_.month, date_.day)
+        if rec:
+            task_ids.append(rec["task_id"])
+    return catalog.mask_of(task_ids)
+
+
+def suitable_mask(catalog: TaskCatalog, age: int, day_type: str,
+                  used_mask: int=0, avoid_mask: int=0) -> Tuple[int, str]:
+    """
+    Кандидаты с fallback по уровням и сам уровень. used_mask — уже выданные ребёнку
+    задания, avoid_mask — задания братьев и сестёр на тот же день (семейный режим).
+    Повтор своего задания допустим раньше, чем совпадение с сиблингом.
+    Метрику уровня не трогает: её считают только выдачи (choose_task, planned_task).
+    """
+    bucket = catalog.candidates_mask(age, day_type)
+
+    # 1. Точные: возраст + день + не использованные за учтённые сезоны
+    suitable = bucket & ~(used_mask | avoid_mask)
+    if suitable:
+        return suitable, "exact"
+
+    # 2. Fallback: возраст + день (игнор повторов, но не совпадений с сиблингами)
+    suitable = bucket & ~avoid_mask or bucket
+    if suitable:
+        return suitable, "repeat"
+
     # 3. Критический fallback: только возраст
-    if not suitable:
-        suitable = [t for t in tasks if t["min_age"] <= age <= t["max_age"]]
-    
+    suitable = catalog.age_mask(age)
+    return suitable, "age_only" if suitable else "none"
+
+
+def choose_task(catalog: TaskCatalog, age: int, day_type: str,
+                used_mask: int=0, avoid_mask: int=0) -> Dict[str, Any]:
+    """Случайное задание из кандидатов suitable_mask; уровень fallback идёт в метрику."""
+    suitable, tier = suitable_mask(catalog, age, day_type, used_mask, avoid_mask)
+    registry.inc("advent_picker_tier_total", tier=tier)
     if not suitable:
         raise ValueError(f"No tasks for age {age}")
-    
-    return random.choice(suitable)
+    return catalog.choice(suitable)
+
+
+def pick_task(child: Dict[str, Any], date_: date, storage, child_id: int,
+              seasons: int=PICKER_SEASONS, family: bool=PICKER_FAMILY,
+              mode: str=PICKER_MODE) -> Dict[str, Any]:
+    """
+    Новое задание на дату. В режиме "hashed" так выбирается только reroll:
+    он не повторяет ни одно вычисленное задание месяца, поэтому их план не сдвигается.
+    """
+    catalog = get_catalog()
+    used_mask = used_task_mask(child_id, storage, date_.year, catalog, seasons)
+    if mode == "hashed":
+        used_mask |= catalog.mask_of(hashed_month_plan(child, date_.year, date_.month, catalog))
+    avoid_mask = sibling_day_mask(child, date_, storage, catalog) if family else 0
+    return choose_task(catalog, child["age"], get_day_type(date_), used_mask, avoid_mask)
+
+
+def plan_day(children: List[Dict[str, Any]], date_: date, storage,
+             seasons: int=PICKER_SEASONS, family: bool=PICKER_FAMILY,
+             mode: str=PICKER_MODE, catalog: TaskCatalog=None
+             ) -> Tuple[List[Tuple[Dict[str, Any], Dict[str, Any], str]], List[Dict[str, Any]]]:
+    """
+    Только чтения: задания пачки детей на одну дату — тройки (ребёнок, задание, статус)
+    и новые записи для тех, кому задание ещё не выдано. Сохраняет их вызывающий,
+    одной пакетной записью. Сиблинги из той же пачки тоже не получают одно задание.
+    """
+    catalog = catalog or get_catalog()
+    plans = []
+    new_records = []
+    picked_by_parent: Dict[int, int] = {}
+    for child in children:
+        rec = storage.get_task_record(child["id"], date_.year, date_.month, date_.day)
+        if rec:
+            plans.append((child, catalog.get(rec["task_id"]), rec.get("status", "new")))
+            continue
+        if mode == "hashed":
+            plans.append((child, planned_task(child, date_), "new"))
+            continue
+
+        used_mask = used_task_mask(child["id"], storage, date_.year, catalog, seasons, date_.month)
+        avoid_mask = 0
+        if family:
+            avoid_mask = sibling_day_mask(child, date_, storage, catalog) | picked_by_parent.get(child["parent_id"], 0)
+        task = choose_task(catalog, child["age"], get_day_type(date_), used_mask, avoid_mask)
+        picked_by_parent[child["parent_id"]] = picked_by_parent.get(child["parent_id"], 0) | 1 << catalog.index[task["id"]]
+        plans.append((child, task, "new"))
+        new_records.append({
+            "child_id": child["id"],
+            "year": date_.year,
+            "month": date_.month,
+            "day": date_.day,
+            "task_id": task["id"]
+        })
+    return plans, new_records
+
+
+# ---------- РЕЖИМ "hashed": ЗАДАНИЕ = f(ключ, ребёнок, дата) ----------
+
+def _task_score(key: bytes, day_key: str, task_id: int) -> bytes:
+    return hmac.new(key, f"{day_key}:{task_id}".encode(), hashlib.sha256).digest()
+
+
+class _HashedPlanCache:
+    """
+    Вычисленные планы месяца по (ребёнок, возраст, год, месяц), последние max_size штук.
+    План — пары (task_id, уровень fallback) по дням.
+    """
+
+    def __init__(self, max_size: int=10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[tuple, Tuple[TaskCatalog, List[Tuple[int, str]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, catalog: TaskCatalog):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] is catalog:
+                self._entries.move_to_end(key)
+                return entry[1]
+        return None
+
+    def put(self, key: tuple, catalog: TaskCatalog, plan: List[Tuple[int, str]]):
+        with self._lock:
+            self._entries[key] = (catalog, plan)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+_hashed_plans = _HashedPlanCache()
+
+
+def _hashed_plan_tiers(child: Dict[str, Any], year: int, month: int,
+                       catalog: TaskCatalog, key: str) -> List[Tuple[int, str]]:
+    cache_key = (child["id"], child["age"], year, month, key)
+    plan = _hashed_plans.get(cache_key, catalog)
+    if plan is not None:
+        return plan
+
+    plan = []
+    used_mask = 0
+    key_bytes = key.encode()
+    for day in range(1, calendar.monthrange(year, month)[1] + 1):
+        day_key = f"{child['id']}:{year:04d}-{month:02d}-{day:02d}"
+        mask, tier = suitable_mask(catalog, child["age"], get_day_type(date(year, month, day)), used_mask)
+        if not mask:
+            raise ValueError(f"No tasks for age {child['age']}")
+        task_id = max((t["id"] for t in catalog.tasks_in(mask)),
+                      key=lambda candidate: _task_score(key_bytes, day_key, candidate))
+        used_mask |= 1 << catalog.index[task_id]
+        plan.append((task_id, tier))
+    _hashed_plans.put(cache_key, catalog, plan)
+    return plan
+
+
+def hashed_month_plan(child: Dict[str, Any], year: int, month: int=12,
+                      catalog: TaskCatalog=None, key: str=PICKER_KEY) -> List[int]:
+    """
+    task_id на каждый день месяца (индекс — день минус 1) без повторов внутри месяца.
+    Из кандидатов дня (корзина без заданий дней 1..d-1) берётся задание с наибольшим
+    HMAC(key, ребёнок, дата, id задания). Выбор зависит только от id, а не от порядка
+    в файле: новое задание в каталоге меняет лишь день, где оно выигрывает, и редкие
+    дни, куда переезжает вытесненное им задание.
+    Расчёт плана метрику уровня fallback не трогает — её считает planned_task при выдаче.
+    """
+    return [task_id for task_id, _ in _hashed_plan_tiers(child, year, month, catalog or get_catalog(), key)]
+
+
+def planned_task(child: Dict[str, Any], date_: date) -> Dict[str, Any]:
+    """Вычисленное задание на дату (без учёта сохранённых reroll — их смотрят в записях)."""
+    catalog = get_catalog()
+    task_id, tier = _hashed_plan_tiers(child, date_.year, date_.month, catalog, PICKER_KEY)[date_.day - 1]
+    registry.inc("advent_picker_tier_total", tier=tier)
+    return catalog.get(task_id)
+
+
+def hashed_month_records(child: Dict[str, Any], year: int, storage, month: int=12,
+                         catalog: TaskCatalog=None) -> List[Dict[str, Any]]:
+    """Записи месяца по дням: сохранённые (статус, reroll) поверх вычисленного плана."""
+    stored = {rec["day"]: rec for rec in storage.get_task_records_for_child(child["id"], year, month)}
+    plan = hashed_month_plan(child, year, month, catalog)
+    return [
+        stored.get(day) or {
+            "child_id": child["id"], "year": year, "month": month, "day": day,
+            "task_id": task_id, "status": "new",
+        }
+        for day, task_id in enumerate(plan, start=1)
+    ]
+
+
+def hashed_month_stats(child: Dict[str, Any], year: int, month: int, storage, today: date) -> Dict[str, int]:
+    """
+    Статистика месяца без записей о выдаче: выданными считаются дни декабря
+    со дня добавления ребёнка по сегодняшний (today — местная дата ребёнка),
+    выполненные — из сохранённых отметок.
+    """
+    first_day, last_day = 1, 0
+    if month == 12:
+        if (year, month) < (today.year, today.month):
+            last_day = calendar.monthrange(year, month)[1]
+        elif (year, month) == (today.year, today.month):
+            last_day = today.day
+        # у детей, добавленных до появления поля, даты нет — считаем с 1-го
+        if child.get("created"):
+            created = date.fromisoformat(child["created"])
+            if (created.year, created.month) > (year, month):
+                last_day = 0
+            elif (created.year, created.month) == (year, month):
+                first_day = created.day
+    if last_day < first_day:
+        return month_summary(0, 0, 0, 0)
+
+    done_mask = 0
+    for rec in storage.get_task_records_for_child(child["id"], year, month):
+        if rec["status"] == "done" and first_day <= rec["day"] <= last_day:
+            done_mask |= 1 << rec["day"]
+    issued_mask = ((1 << (last_day - first_day + 1)) - 1) << first_day
+    return month_summary(last_day - first_day + 1, done_mask.bit_count(), issued_mask, done_mask,
+                         today=month_day(year, month, today))
+
+
+def plan_missing_days(child: Dict[str, Any], year: int, storage, month: int=12,
+                      seasons: int=PICKER_SEASONS, family: bool=PICKER_FAMILY,
+                      catalog: TaskCatalog=None
+                      ) -> Tuple[Dict[int, Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Только чтения: уже выданные записи месяца по дням и новые записи
+    для недостающих дней (без повторов). Сохраняет их вызывающий.
+    """
+    catalog = catalog or get_catalog()
+    child_id = child["id"]
+
+    by_day: Dict[int, Dict[str, Any]] = {}
+    for rec in storage.get_task_records_for_child(child_id, year, month):
+        by_day.setdefault(rec["day"], rec)
+    used_mask = catalog.mask_of(rec["task_id"] for rec in by_day.values())
+    used_mask |= _past_seasons.get(child_id, storage, year, month, seasons, catalog)
+
+    # семейный режим: задания братьев и сестёр по дням месяца
+    sibling_masks: Dict[int, int] = {}
+    if family:
+        for sibling in siblings(child, storage):
+            for rec in storage.get_task_records_for_child(sibling["id"], year, month):
+                sibling_masks[rec["day"]] = sibling_masks.get(rec["day"], 0) | catalog.mask_of((rec["task_id"],))
+
+    new_records = []
+    for day in range(1, calendar.monthrange(year, month)[1] + 1):
+        if day in by_day:
+            continue
+        task = choose_task(catalog, child["age"], get_day_type(date(year, month, day)),
+                           used_mask, sibling_masks.get(day, 0))
+        used_mask |= 1 << catalog.index[task["id"]]
+        new_records.append({
+            "child_id": child_id,
+            "year": year,
+            "month": month,
+            "day": day,
+            "task_id": task["id"]
+        })
+    return by_day, new_records
+
+
+def _merge_month(by_day: Dict[int, Dict[str, Any]], created: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    for rec in created:
+        by_day.setdefault(rec["day"], rec)
+    return [by_day[day] for day in sorted(by_day)]
+
+
+def plan_month(child: Dict[str, Any], year: int, storage, month: int=12,
+               seasons: int=PICKER_SEASONS, family: bool=PICKER_FAMILY,
+               mode: str=PICKER_MODE, catalog: TaskCatalog=None) -> List[Dict[str, Any]]:
+    """
+    Задания на все дни месяца за один проход: записи ребёнка читаются один раз,
+    недостающие дни заполняются без повторов и сохраняются одной пакетной записью.
+    В режиме "hashed" недостающие дни вычисляются и ничего не пишется.
+    Возвращает записи месяца, по одной на день, в порядке дней.
+    """
+    if mode == "hashed":
+        return hashed_month_records(child, year, storage, month, catalog)
+
+    by_day, new_records = plan_missing_days(child, year, storage, month, seasons, family, catalog)
+    return _merge_month(by_day, storage.add_task_records(new_records) if new_records else [])
+
+
+async def plan_month_async(child: Dict[str, Any], year: int, storage, month: int=12,
+                           mode: str=PICKER_MODE, catalog: TaskCatalog=None) -> List[Dict[str, Any]]:
+    """
+    plan_month для хендлеров: план считается в пуле чтений,
+    а новые записи сохраняются через очередь писателя (storage.aio).
+    """
+    if mode == "hashed":
+        return await storage.aio.run(hashed_month_records, child, year, storage, month, catalog)
+
+    by_day, new_records = await storage.aio.run(
+        plan_missing_days, child, year, storage, month, catalog=catalog
+    )
+    created = await storage.aio.add_task_records(new_records) if new_records else []
+    return _merge_month(by_day, created)
@@ -0,0 +1,56 @@
+import datetime
+import os
+
+from models.sqlite_storage import SQLiteStorage
+from models.storage import Storage
+from utils.analytics import AnalyticsCache, compute_report
+
+
+def fill(s):
+    anya = s.add_child(parent_id=1, name="Аня", age=5, tz_label="Москва", tz_offset=3)
+    lev = s.add_child(parent_id=1, name="Лёва", age=8, tz_label="Москва", tz_offset=3)
+    sasha = s.add_child(parent_id=2, name="Саша", age=8, tz_label="Москва", tz_offset=3)
+    for child_id in (anya, lev, sasha):
+        for day in (1, 2):
+            s.add_task_record(child_id, 2025, 12, day, task_id=day)
+    s.set_task_status(anya, 2025, 12, 1, "done")
+    s.set_task_status(lev, 2025, 12, 1, "done")
+    s.set_task_status(sasha, 2025, 12, 1, "done")
+    s.set_task_status(sasha, 2025, 12, 2, "done")
+    s.update_task_id(lev, 2025, 12, 2, new_task_id=3)
+    s.update_task_id(lev, 2025, 12, 2, new_task_id=4)
+
+
+def check(report):
+    assert report["records"] == 6
+    assert (report["children"], report["parents"]) == (3, 2)
+    assert report["by_age"][8] == {"issued": 4, "done": 3, "rate": 0.75}
+    assert report["top_tasks"][0][0] == 1
+    assert report["rerolls_per_day"] == {datetime.date(2025, 12, 2): 2}
+    assert report["active_parents_per_day"] == {
+        datetime.date(2025, 12, 1): 2,
+        datetime.date(2025, 12, 2): 1,
+    }
+
+
+def test_report_from_json_snapshot(tmp_path):
+    s = Storage(path=os.path.join(tmp_path, "storage.json"))
+    fill(s)
+    check(compute_report(s.stream_snapshot(), min_issued=1))
+
+
+def test_report_from_sqlite_snapshot(tmp_path):
+    s = SQLiteStorage(path=os.path.join(tmp_path, "storage.db"))
+    fill(s)
+    check(compute_report(s.stream_snapshot(), min_issued=1))
+
+
+def test_cache_reuses_report_within_refresh_interval(tmp_path):
+    s = Storage(path=os.path.join(tmp_path, "storage.json"))
+    fill(s)
+    cache = AnalyticsCache(s, refresh_interval=300)
+    first = cache.get()
+
+    s.add_task_record(1, 2025, 12, 3, task_id=3)
+    assert cache.get() is first
+    assert cache.get(force=True)["records"] == 7
@@ -0,0 +1,35 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+from models.sqlite_storage import SQLiteStorage
+from models.storage import Storage
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("storage_cls, filename", [
+    (Storage, "storage.json"),
+    (SQLiteStorage, "storage.db"),
+])
+async def test_aio_methods_run_off_the_event_loop(tmp_path, storage_cls, filename):
+    storage = storage_cls(path=os.path.join(tmp_path, filename))
+    loop_thread = threading.get_ident()
+
+    child_id = await storage.aio.add_child(
+        parent_id=1, name="Никита", age=8, tz_label="Москва", tz_offset=3
+    )
+    await asyncio.gather(*[
+        storage.aio.add_task_record(child_id, 2025, 12, day, task_id=day)
+        for day in range(1, 11)
+    ])
+    await storage.aio.set_task_status(child_id, 2025, 12, 3, "done")
+
+    records = await storage.aio.get_task_records_for_child(child_id, 2025, 12)
+    assert sorted(r["day"] for r in records) == list(range(1, 11))
+    rec = await storage.aio.get_task_record(child_id, 2025, 12, 3)
+    assert rec["status"] == "done"
+
+    worker_thread = await storage.aio.run(threading.get_ident)
+    assert worker_thread != loop_thread
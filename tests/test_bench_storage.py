@@ -0,0 +1,30 @@
+import os
+
+from benchmarks.bench_storage import build_dataset, compare, summarize
+from models.storage import Storage
+
+
+def test_synthetic_dataset_loads_into_storage(tmp_path):
+    path = os.path.join(tmp_path, "storage.json")
+    info = build_dataset(path, parents=3, children_per_parent=2, days=5)
+
+    s = Storage(path=path)
+    assert info == {"parents": 3, "children": 6, "records": 30}
+    assert len(s.get_children_by_parent(3)) == 2
+    assert s.get_month_stats(6, 2025, 12)["issued"] == 5
+    assert s.add_child(1, "Новый", 7, "Москва", 3) == 7
+
+
+def test_compare_flags_only_slowdowns_beyond_tolerance():
+    baseline = {"10k": {
+        "get_child": summarize([0.001] * 10),
+        "add_child": summarize([0.100] * 10),
+    }}
+    results = {"10k": {
+        "get_child": summarize([0.0012] * 10),
+        "add_child": summarize([0.200] * 10),
+    }}
+
+    regressions = compare(results, baseline, tolerance=0.3)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("10k/add_child")
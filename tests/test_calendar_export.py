@@ -0,0 +1,85 @@
+import datetime
+import os
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from aiogram import types
+
+import handlers.payments as payments_module
+from models.storage import Storage
+from models.task_catalog import TaskCatalog
+from utils.calendar_export import FileIdCache, build_document, iter_html, iter_ics
+
+CATALOG = TaskCatalog([
+    {"id": 1, "text": "Слепить снеговика вместе с {name}, а потом — какао; " * 3,
+     "min_age": 3, "max_age": 12, "day_types": ["weekday"]},
+    {"id": 2, "text": "<b>Испечь</b> печенье & угостить соседей",
+     "min_age": 3, "max_age": 12, "day_types": ["weekday"]},
+])
+CHILD = {"id": 7, "name": "Никита", "tz_offset": 3}
+RECORDS = [{"day": d, "task_id": 1 + d % 2, "status": "done" if d == 1 else "new"} for d in range(1, 32)]
+
+
+def test_ics_has_event_per_day_at_local_time():
+    data, _ = build_document(iter_ics(CHILD, 2025, RECORDS, CATALOG, hour=9))
+    lines = data.decode("utf-8").split("\r\n")
+
+    assert lines[0] == "BEGIN:VCALENDAR"
+    assert lines.count("BEGIN:VEVENT") == 31
+    assert "DTSTART:20251201T060000Z" in lines  # 9:00 по Москве (UTC+3)
+    assert "SUMMARY:✅ 🎄 1 декабря" in lines
+    assert all(len(line.encode("utf-8")) <= 75 for line in lines)
+    # длинное описание перенесено, запятые и точки с запятой экранированы
+    unfolded = data.decode("utf-8").replace("\r\n ", "")
+    assert "DESCRIPTION:Слепить снеговика вместе с Никита\\, а потом — какао\\;" in unfolded
+
+
+def test_html_escapes_task_text():
+    page = "".join(iter_html(CHILD, 2025, RECORDS, CATALOG))
+    assert "&lt;b&gt;Испечь&lt;/b&gt; печенье &amp; угостить" in page
+    assert page.count("<tr>") == 31
+
+
+def test_build_document_hash_depends_only_on_content():
+    first = build_document(iter_ics(CHILD, 2025, RECORDS, CATALOG))
+    assert build_document(iter_ics(CHILD, 2025, RECORDS, CATALOG)) == first
+
+    changed = [dict(r) for r in RECORDS]
+    changed[5]["status"] = "done"
+    assert build_document(iter_ics(CHILD, 2025, changed, CATALOG))[1] != first[1]
+
+
+@pytest.mark.asyncio
+async def test_resend_uses_cached_file_id(tmp_path):
+    storage = Storage(path=os.path.join(tmp_path, "storage.json"))
+    payments_module.storage = storage
+    payments_module.calendar_files = FileIdCache()
+    child_id = storage.add_child(parent_id=1, name="Никита", age=8, tz_label="Москва", tz_offset=3)
+
+    msg = types.Message(
+        message_id=1,
+        date=datetime.datetime.now(),
+        chat=types.Chat(id=1, type="private"),
+        from_user=types.User(id=1, is_bot=False, first_name="Test"),
+        text="test",
+    )
+
+    def sent(document):
+        # Telegram отдаёт file_id загруженного файла; для file_id — тот же самый
+        file_id = document if isinstance(document, str) else document.filename.rsplit(".", 1)[1].upper() + "_ID"
+        return SimpleNamespace(document=SimpleNamespace(file_id=file_id))
+
+    # модели aiogram заморожены — подменяем методы на классе
+    with patch.object(types.Message, "answer", AsyncMock()), \
+            patch.object(types.Message, "answer_document", AsyncMock(side_effect=sent)) as answer_document:
+        await payments_module.handle_full_calendar_free(msg, child_id, 2025)
+        first = [c.args[0] for c in answer_document.call_args_list]
+        assert all(isinstance(d, types.BufferedInputFile) for d in first)
+        assert [d.filename for d in first] == ["Адвент 2025 — Никита.ics", "Адвент 2025 — Никита.html"]
+
+        answer_document.reset_mock()
+        await payments_module.handle_full_calendar_free(msg, child_id, 2025)
+        again = [c.args[0] for c in answer_document.call_args_list]
+        assert again == ["ICS_ID", "HTML_ID"]
+        assert all(isinstance(d, str) for d in again)
@@ -0,0 +1,46 @@
+from models.task_catalog import TaskCatalog
+from utils.calendar_render import CalendarCache, render_calendar, split_message
+
+CATALOG = TaskCatalog([
+    {"id": 1, "text": "Короткое задание для {name}", "min_age": 3, "max_age": 12, "day_types": ["weekday"]},
+    {"id": 2, "text": "Очень длинное задание " * 20, "min_age": 3, "max_age": 12, "day_types": ["weekday"]},
+])
+CHILD = {"id": 7, "name": "Никита"}
+
+
+def month(task_id=2, status="new"):
+    return [{"day": d, "task_id": task_id, "status": status} for d in range(1, 32)]
+
+
+def test_split_message_cuts_only_between_lines():
+    lines = ["a" * 40, "b" * 40, "c" * 40]
+    assert split_message(lines, limit=81) == ["a" * 40 + "\n" + "b" * 40, "c" * 40]
+    assert split_message(["x" * 25], limit=10) == ["x" * 10, "x" * 10, "x" * 5]
+
+
+def test_long_calendar_is_split_on_day_boundaries():
+    chunks = render_calendar(CHILD, 2025, month(), CATALOG)
+
+    assert len(chunks) > 1
+    assert all(len(c) <= 4096 for c in chunks)
+    assert chunks[0].startswith("🎄 ПОЛНЫЙ КАЛЕНДАРЬ 2025 ДЛЯ Никита:")
+    days = [line for c in chunks for line in c.split("\n") if line[:2].strip().isdigit()]
+    assert [int(line[:2]) for line in days] == list(range(1, 32))
+
+
+def test_cache_rebuilds_only_when_records_change():
+    cache = CalendarCache()
+    records = month(task_id=1)
+
+    first = cache.get(CHILD, 2025, records, CATALOG)
+    assert cache.get(CHILD, 2025, month(task_id=1), CATALOG) is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    records[4]["status"] = "done"
+    updated = cache.get(CHILD, 2025, records, CATALOG)
+    assert updated is not first
+    assert " 5. ✅" in updated[0]
+
+    records[5]["task_id"] = 2
+    assert cache.get(CHILD, 2025, records, CATALOG) is not updated
+    assert cache.misses == 3
@@ -0,0 +1,97 @@
+import datetime
+import json
+import os
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from aiogram import types
+
+import handlers.payments as payments_module
+import models.task_catalog as task_catalog_module
+import models.task_picker as task_picker_module
+from models.storage import Storage
+from models.task_catalog import CatalogWatcher, TaskCatalog, validate_tasks
+
+TASKS = [
+    {"id": 1, "min_age": 0, "max_age": 6, "day_types": ["weekday"], "text": "{name} 1"},
+    {"id": 2, "min_age": 0, "max_age": 6, "day_types": ["weekend"], "text": "{name} 2"},
+]
+
+
+def write_tasks(path, tasks, mtime):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(tasks, f, ensure_ascii=False)
+    os.utime(path, (mtime, mtime))
+
+
+def test_validate_tasks_reports_every_error():
+    bad = [
+        {"id": 1, "min_age": 7, "max_age": 3, "day_types": ["weekday"], "text": "{name} 1"},
+        {"id": 1, "min_age": 0, "max_age": 6, "day_types": ["holiday"], "text": "{имя}"},
+    ]
+    errors = validate_tasks(bad, previous=TaskCatalog(TASKS))
+
+    assert len(errors) == 5
+    assert "пропали задания с id [2]" in errors[-1]
+    assert validate_tasks(TASKS) == []
+    assert validate_tasks({}) == ["ожидался непустой список заданий"]
+
+
+@pytest.mark.asyncio
+async def test_watcher_swaps_catalog_and_keeps_old_one_on_error(tmp_path, monkeypatch):
+    path = os.path.join(tmp_path, "tasks_ru.json")
+    write_tasks(path, TASKS, mtime=1000)
+    old = TaskCatalog(TASKS)
+    monkeypatch.setattr(task_catalog_module, "_catalog", old)
+    watcher = CatalogWatcher(path, interval=0)
+
+    assert not await watcher.check()  # файл не менялся
+
+    edited = [dict(TASKS[0], text="{name}, новое задание"), TASKS[1]]
+    write_tasks(path, edited, mtime=2000)
+    assert await watcher.check()
+    new = task_catalog_module.get_catalog()
+    assert new is not old
+    assert new.get(1)["text"] == "{name}, новое задание"
+    assert old.get(1)["text"] == "{name} 1"  # взятый ранее каталог не меняется
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[{")
+    os.utime(path, (3000, 3000))
+    assert not await watcher.check()
+    assert task_catalog_module.get_catalog() is new
+    assert watcher.failures == 1
+    assert not await watcher.check()  # тот же битый файл повторно не читается
+
+
+@pytest.mark.asyncio
+async def test_full_calendar_uses_one_catalog_per_update(tmp_path, monkeypatch):
+    storage = Storage(path=os.path.join(tmp_path, "storage.json"))
+    monkeypatch.setattr(payments_module, "storage", storage)
+    child_id = storage.add_child(parent_id=1, name="Никита", age=8, tz_label="Москва", tz_offset=3)
+
+    catalogs = [task_catalog_module.get_catalog(), TaskCatalog(task_catalog_module.get_catalog().tasks)]
+    taken = []
+
+    def reloading_get_catalog():
+        # каждое обращение — «после перезагрузки» новый объект
+        taken.append(catalogs[len(taken) % 2])
+        return taken[-1]
+
+    monkeypatch.setattr(payments_module, "get_catalog", reloading_get_catalog)
+    monkeypatch.setattr(task_picker_module, "get_catalog", reloading_get_catalog)
+
+    msg = types.Message(
+        message_id=1,
+        date=datetime.datetime.now(),
+        chat=types.Chat(id=1, type="private"),
+        from_user=types.User(id=1, is_bot=False, first_name="Test"),
+        text="test",
+    )
+    sent = SimpleNamespace(document=SimpleNamespace(file_id="ID"))
+    with patch.object(types.Message, "answer", AsyncMock()), \
+            patch.object(types.Message, "answer_document", AsyncMock(return_value=sent)):
+        await payments_module.handle_full_calendar_free(msg, child_id, 2025)
+
+    assert len(taken) == 1
@@ -0,0 +1,59 @@
+import datetime
+import os
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from aiogram import types
+
+from handlers.start import ChildAction, children_inline_keyboard
+from models.storage import Storage
+import handlers.children as children_module
+
+
+def make_callback(user_id: int, data: str) -> types.CallbackQuery:
+    message = types.Message(
+        message_id=1,
+        date=datetime.datetime.now(),
+        chat=types.Chat(id=user_id, type="private"),
+        text="Кого удалить из списка?",
+    )
+    return types.CallbackQuery(
+        id="1",
+        from_user=types.User(id=user_id, is_bot=False, first_name="Test"),
+        chat_instance="1",
+        message=message,
+        data=data,
+    )
+
+
+def test_keyboard_carries_child_id_for_same_names():
+    children = [{"id": 3, "name": "Саша"}, {"id": 7, "name": "Саша"}]
+    kb = children_inline_keyboard(children, "today")
+
+    payloads = [ChildAction.unpack(row[0].callback_data) for row in kb.inline_keyboard]
+    assert [p.child_id for p in payloads] == [3, 7]
+    assert all(p.action == "today" for p in payloads)
+
+
+@pytest.mark.asyncio
+async def test_delete_callback_ignores_foreign_child(tmp_path):
+    storage = Storage(path=os.path.join(tmp_path, "storage.json"))
+    children_module.storage = storage
+    child_id = storage.add_child(parent_id=1, name="Никита", age=8,
+                                 tz_label="Москва", tz_offset=3)
+    data = ChildAction(action="delete", child_id=child_id)
+
+    # модели aiogram заморожены — подменяем методы на классе, а не на объекте
+    with patch.object(types.CallbackQuery, "answer", AsyncMock()) as callback_answer, \
+            patch.object(types.Message, "answer", AsyncMock()) as message_answer:
+        await children_module.process_delete_child(make_callback(user_id=2, data=data.pack()), data)
+
+        assert storage.get_child(child_id) is not None
+        assert callback_answer.call_args.kwargs["show_alert"] is True
+        message_answer.assert_not_called()
+
+        # родитель той же кнопкой удаляет
+        await children_module.process_delete_child(make_callback(user_id=1, data=data.pack()), data)
+
+        assert storage.get_child(child_id) is None
+        assert "удалён" in message_answer.call_args.args[0]
@@ -0,0 +1,65 @@
+import os
+import time
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+from handlers.children import AddChildStates
+from models.fsm_storage import SQLiteFSMStorage
+
+
+def make_key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+
+
+@pytest.mark.asyncio
+async def test_state_and_data_survive_restart(tmp_path):
+    path = os.path.join(tmp_path, "fsm.db")
+    fsm = SQLiteFSMStorage(path=path)
+    await fsm.set_state(make_key(10), AddChildStates.waiting_age)
+    await fsm.update_data(make_key(10), {"name": "Никита"})
+    await fsm.close()
+
+    restarted = SQLiteFSMStorage(path=path)
+    assert await restarted.get_state(make_key(10)) == AddChildStates.waiting_age.state
+    assert await restarted.get_data(make_key(10)) == {"name": "Никита"}
+    await restarted.close()
+
+
+@pytest.mark.asyncio
+async def test_abandoned_state_expires(tmp_path):
+    path = os.path.join(tmp_path, "fsm.db")
+    fsm = SQLiteFSMStorage(path=path, ttl=60)
+    await fsm.set_state(make_key(10), AddChildStates.waiting_tz)
+
+    # «прошло» больше ttl
+    fsm._cache.clear()
+    fsm._conn.execute("UPDATE fsm SET updated = ?", (time.time() - 120,))
+    fsm._conn.commit()
+
+    assert await fsm.get_state(make_key(10)) is None
+    await fsm.close()
+
+
+@pytest.mark.asyncio
+async def test_cache_is_bounded_and_evicted_keys_reload_from_disk(tmp_path):
+    fsm = SQLiteFSMStorage(path=os.path.join(tmp_path, "fsm.db"), cache_size=3)
+    for user_id in range(10):
+        await fsm.set_data(make_key(user_id), {"user": user_id})
+
+    assert fsm.cached == 3
+    assert await fsm.get_data(make_key(0)) == {"user": 0}
+    await fsm.close()
+
+
+@pytest.mark.asyncio
+async def test_clear_removes_row(tmp_path):
+    fsm = SQLiteFSMStorage(path=os.path.join(tmp_path, "fsm.db"))
+    await fsm.set_state(make_key(10), AddChildStates.waiting_age)
+    await fsm.set_data(make_key(10), {"name": "Никита"})
+
+    await fsm.set_state(make_key(10), None)
+    await fsm.set_data(make_key(10), {})
+
+    assert fsm._conn.execute("SELECT COUNT(*) FROM fsm").fetchone()[0] == 0
+    await fsm.close()
@@ -0,0 +1,126 @@
+import datetime
+import os
+
+import pytest
+
+import handlers.tasks as tasks_module
+import models.task_picker as task_picker_module
+from models.storage import Storage
+from models.task_catalog import TaskCatalog, get_catalog
+
+
+def make_child(storage, age=8):
+    child_id = storage.add_child(parent_id=1, name="Никита", age=age, tz_label="Москва", tz_offset=3)
+    return storage.get_child(child_id)
+
+
+def fresh_plan(child, key="k1"):
+    # без кэша: план должен получаться заново из тех же входов
+    task_picker_module._hashed_plans = task_picker_module._HashedPlanCache()
+    return task_picker_module.hashed_month_plan(child, 2025, 12, get_catalog(), key=key)
+
+
+def test_hashed_plan_is_deterministic_and_has_no_repeats(tmp_path):
+    child = make_child(Storage(path=os.path.join(tmp_path, "storage.json")))
+
+    plan = fresh_plan(child)
+    assert len(plan) == 31
+    assert len(set(plan)) == 31
+    assert fresh_plan(child) == plan
+    assert fresh_plan(child, key="k2") != plan
+
+
+def test_hashed_plan_depends_on_task_ids_not_catalog_order():
+    child = {"id": 5, "age": 8}
+    tasks = get_catalog().tasks
+    plan = task_picker_module.hashed_month_plan(child, 2025, 12, TaskCatalog(tasks), key="k1")
+
+    assert task_picker_module.hashed_month_plan(
+        child, 2025, 12, TaskCatalog(list(reversed(tasks))), key="k1") == plan
+
+    # новое задание (как после перезагрузки каталога) почти не трогает план
+    fits = next(t for t in tasks if t["min_age"] <= 8 <= t["max_age"] and "weekday" in t["day_types"])
+    extended = task_picker_module.hashed_month_plan(
+        child, 2025, 12, TaskCatalog(tasks + [dict(fits, id=10_000)]), key="k1")
+    assert sum(a != b for a, b in zip(plan, extended)) <= 3
+
+
+def test_hashed_records_take_overrides_and_reroll_avoids_plan(tmp_path):
+    storage = Storage(path=os.path.join(tmp_path, "storage.json"))
+    child = make_child(storage)
+    plan = task_picker_module.hashed_month_plan(child, 2025, 12)
+
+    records = task_picker_module.plan_month(child, 2025, storage, mode="hashed")
+    assert [r["task_id"] for r in records] == plan
+    assert storage.get_task_records_for_child(child["id"], 2025, 12) == []  # ничего не записано
+
+    day = datetime.date(2025, 12, 5)
+    new_task = task_picker_module.pick_task(child, day, storage, child["id"], mode="hashed")
+    assert new_task["id"] not in plan
+    storage.add_task_record(child["id"], 2025, 12, 5, plan[4])
+    storage.update_task_id(child["id"], 2025, 12, 5, new_task["id"])
+
+    records = task_picker_module.plan_month(child, 2025, storage, mode="hashed")
+    assert records[4]["task_id"] == new_task["id"]
+    assert [r["task_id"] for i, r in enumerate(records) if i != 4] == plan[:4] + plan[5:]
+
+
+def test_hashed_month_stats_counts_days_up_to_today(tmp_path):
+    storage = Storage(path=os.path.join(tmp_path, "storage.json"))
+    child_id = storage.add_child(parent_id=1, name="Никита", age=8, tz_label="Москва",
+                                 tz_offset=3, created="2025-11-20")
+    child = storage.get_child(child_id)
+    for day in (2, 3):
+        storage.add_task_record(child["id"], 2025, 12, day, task_id=1)
+        storage.set_task_status(child["id"], 2025, 12, day, "done")
+
+    stats = task_picker_module.hashed_month_stats(child, 2025, 12, storage, datetime.date(2025, 12, 4))
+    assert stats["issued"] == 4
+    assert stats["done"] == 2
+    assert stats["pending"] == 2
+    assert stats["current_streak"] == 2
+
+
+def test_hashed_month_stats_outside_december_is_empty(tmp_path):
+    storage = Storage(path=os.path.join(tmp_path, "storage.json"))
+    child_id = storage.add_child(parent_id=1, name="Никита", age=8, tz_label="Москва",
+                                 tz_offset=3, created="2026-10-18")
+    child = storage.get_child(child_id)
+
+    stats = task_picker_module.hashed_month_stats(child, 2026, 10, storage, datetime.date(2026, 10, 18))
+    assert (stats["issued"], stats["done"], stats["pending"]) == (0, 0, 0)
+
+
+def test_hashed_month_stats_start_from_day_child_was_added(tmp_path):
+    storage = Storage(path=os.path.join(tmp_path, "storage.json"))
+    child_id = storage.add_child(parent_id=1, name="Никита", age=8, tz_label="Москва",
+                                 tz_offset=3, created="2025-12-10")
+    child = storage.get_child(child_id)
+    storage.add_task_record(child_id, 2025, 12, 10, task_id=1)
+    storage.set_task_status(child_id, 2025, 12, 10, "done")
+
+    stats = task_picker_module.hashed_month_stats(child, 2025, 12, storage, datetime.date(2025, 12, 12))
+    assert stats["issued"] == 3
+    assert stats["done"] == 1
+    assert stats["pending"] == 2
+    # в декабре следующего года ребёнок участвует с 1-го
+    assert task_picker_module.hashed_month_stats(
+        child, 2026, 12, storage, datetime.date(2026, 12, 5))["issued"] == 5
+    # а в декабре до добавления — ещё нет
+    assert task_picker_module.hashed_month_stats(
+        child, 2024, 12, storage, datetime.date(2025, 12, 12))["issued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_today_task_in_hashed_mode_writes_nothing(tmp_path, monkeypatch):
+    storage = Storage(path=os.path.join(tmp_path, "storage.json"))
+    monkeypatch.setattr(tasks_module, "storage", storage)
+    monkeypatch.setattr(tasks_module, "PICKER_MODE", "hashed")
+    child = make_child(storage)
+    day = datetime.date(2025, 12, 10)
+
+    task, status = await tasks_module.get_or_assign_task(child, day)
+
+    assert status == "new"
+    assert task["id"] == task_picker_module.hashed_month_plan(child, 2025, 12)[9]
+    assert storage.get_task_record(child["id"], 2025, 12, 10) is None
@@ -0,0 +1,68 @@
+import json
+import os
+
+from models.journal_storage import JournalStorage
+
+
+def make_storage(tmp_path, **kwargs):
+    return JournalStorage(path=os.path.join(tmp_path, "storage.json"), **kwargs)
+
+
+def test_mutations_go_to_journal_not_snapshot(tmp_path):
+    s = make_storage(tmp_path)
+    child_id = s.add_child(parent_id=1, name="Никита", age=8,
+                           tz_label="Москва", tz_offset=3)
+    s.add_task_record(child_id, 2025, 12, 1, task_id=10)
+    s.set_task_status(child_id, 2025, 12, 1, "done")
+
+    # снапшот ещё не создан, всё лежит в журнале по строке на мутацию
+    assert not os.path.exists(s.path)
+    with open(s.journal_path, encoding="utf-8") as f:
+        ops = [json.loads(line)["op"] for line in f]
+    assert ops == ["add_child", "add_task_record", "set_task_status"]
+
+    # новый процесс восстанавливает состояние из журнала
+    s2 = make_storage(tmp_path)
+    rec = s2.get_task_record(child_id, 2025, 12, 1)
+    assert rec["task_id"] == 10
+    assert rec["status"] == "done"
+
+
+def test_compact_folds_journal_into_snapshot(tmp_path):
+    s = make_storage(tmp_path)
+    child_id = s.add_child(parent_id=1, name="Тест", age=7,
+                           tz_label="Москва", tz_offset=3)
+    s.add_task_record(child_id, 2025, 12, 3, task_id=42)
+    s.compact()
+
+    assert os.path.getsize(s.journal_path) == 0
+    s.update_task_id(child_id, 2025, 12, 3, new_task_id=43)
+
+    s2 = make_storage(tmp_path)
+    assert s2.get_child(child_id)["name"] == "Тест"
+    assert s2.get_task_record(child_id, 2025, 12, 3)["task_id"] == 43
+
+
+def test_replay_skips_entries_already_in_snapshot(tmp_path):
+    s = make_storage(tmp_path)
+    child_id = s.add_child(parent_id=1, name="Тест", age=7,
+                           tz_label="Москва", tz_offset=3)
+    s.add_task_record(child_id, 2025, 12, 3, task_id=42)
+    s.compact()
+
+    # имитируем падение между записью снапшота и удалением старого журнала
+    with open(s.journal_path + ".compacting", "w", encoding="utf-8") as f:
+        f.write(json.dumps({"seq": 2, "op": "add_task_record", "args": {
+            "child_id": child_id, "year": 2025, "month": 12, "day": 3, "task_id": 42
+        }}) + "\n")
+
+    s2 = make_storage(tmp_path)
+    assert len(s2.get_task_records_for_child(child_id, 2025, 12)) == 1
+
+
+def test_meta_survives_restart(tmp_path):
+    s = make_storage(tmp_path)
+    s.set_meta("morning_push_3", "2025-12-01")
+    s.close()
+
+    assert make_storage(tmp_path).get_meta("morning_push_3") == "2025-12-01"
@@ -0,0 +1,34 @@
+import pytest
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import TelegramRetryAfter
+
+from benchmarks.loadgen import TOKEN, FakeBotAPI, percentile
+
+
+@pytest.mark.asyncio
+async def test_fake_bot_api_answers_and_floods():
+    api = FakeBotAPI()
+    await api.start()
+    bot = Bot(token=TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(api.url)))
+    try:
+        message = await bot.send_message(42, "🎄")
+        assert message.chat.id == 42
+        assert message.text == "🎄"
+
+        api.flood_rate = 1.0
+        with pytest.raises(TelegramRetryAfter):
+            await bot.send_message(42, "🎄")
+    finally:
+        await bot.session.close()
+        await api.stop()
+
+    assert api.calls["sendmessage"] == 2
+    assert api.floods == 1
+
+
+def test_percentile():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([3.0, 1.0, 2.0], 0.5) == 2.0
+    assert percentile(list(range(100)), 0.99) == 99
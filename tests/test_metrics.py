@@ -0,0 +1,87 @@
+import datetime
+import os
+
+import pytest
+from aiogram.dispatcher.event.handler import HandlerObject
+
+from models.storage import Storage
+from models.task_catalog import get_catalog
+from models.task_picker import choose_task
+from utils.calendar_logic import get_day_type
+from utils.metrics import HandlerMetricsMiddleware, Metrics, instrument_storage, registry
+
+
+def test_render_prometheus_text():
+    m = Metrics()
+    m.inc("advent_storage_calls_total", method="get_child")
+    m.inc("advent_storage_calls_total", method="get_child")
+    m.observe("advent_handler_duration_seconds", 0.02, router="handlers.tasks", handler="today")
+    m.observe("advent_handler_duration_seconds", 3.0, router="handlers.tasks", handler="today")
+
+    text = m.render()
+    assert "# TYPE advent_storage_calls_total counter" in text
+    assert 'advent_storage_calls_total{method="get_child"} 2' in text
+    assert 'advent_handler_duration_seconds_bucket{handler="today",router="handlers.tasks",le="0.025"} 1' in text
+    assert 'advent_handler_duration_seconds_bucket{handler="today",router="handlers.tasks",le="+Inf"} 2' in text
+    assert 'advent_handler_duration_seconds_count{handler="today",router="handlers.tasks"} 2' in text
+
+
+@pytest.mark.asyncio
+async def test_handler_middleware_counts_latency_and_errors():
+    m = Metrics()
+    middleware = HandlerMetricsMiddleware(m)
+
+    async def today_task(event, data):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await middleware(today_task, object(), {"handler": HandlerObject(callback=today_task)})
+
+    labels = {"router": __name__, "handler": "today_task"}
+    assert m.counter("advent_handler_errors_total", **labels) == 1
+    assert m.histograms[m._key("advent_handler_duration_seconds", labels)].count == 1
+
+
+def test_instrument_storage_counts_calls_and_bytes(tmp_path):
+    m = Metrics()
+    storage = Storage(path=os.path.join(tmp_path, "storage.json"))
+    instrument_storage(storage, m)
+
+    child_id = storage.add_child(1, "Маша", 7, "Москва", 3)
+    storage.get_child(child_id)
+
+    assert m.counter("advent_storage_calls_total", method="add_child") == 1
+    assert m.counter("advent_storage_calls_total", method="get_child") == 1
+    assert m.counter("advent_storage_written_bytes_total") == os.path.getsize(storage.path)
+
+    # файл поменялся снаружи — следующее чтение перечитает его целиком
+    read_before = m.counter("advent_storage_read_bytes_total")
+    os.utime(storage.path, ns=(0, 0))
+    storage.get_child(child_id)
+    assert m.counter("advent_storage_read_bytes_total") - read_before == os.path.getsize(storage.path)
+
+
+def test_choose_task_reports_fallback_tier():
+    catalog = get_catalog()
+    day_type = get_day_type(datetime.date(2025, 12, 10))
+    before = registry.counter("advent_picker_tier_total", tier="repeat")
+
+    choose_task(catalog, 7, day_type, used_mask=catalog.candidates_mask(7, day_type))
+
+    assert registry.counter("advent_picker_tier_total", tier="repeat") == before + 1
+
+
+def test_hashed_plan_counts_tier_only_for_served_day():
+    from models import task_picker as task_picker_module
+
+    task_picker_module._hashed_plans = task_picker_module._HashedPlanCache()
+    child = {"id": 1, "age": 7, "parent_id": 1}
+    tiers = ("exact", "repeat", "age_only")
+    before = {tier: registry.counter("advent_picker_tier_total", tier=tier) for tier in tiers}
+
+    task_picker_module.hashed_month_plan(child, 2025, 12)
+    assert {tier: registry.counter("advent_picker_tier_total", tier=tier) for tier in tiers} == before
+
+    task_picker_module.planned_task(child, datetime.date(2025, 12, 10))
+    after = {tier: registry.counter("advent_picker_tier_total", tier=tier) for tier in tiers}
+    assert sum(after.values()) == sum(before.values()) + 1
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import GetMe, SendMessage
+
+from utils.metrics import Metrics
+from utils.outbound import OutboundSender, broadcast
+
+
+@pytest.mark.asyncio
+async def test_interactive_reply_overtakes_queued_broadcast():
+    # общий бакет пуст — запросы точно встанут в очередь
+    sender = OutboundSender(global_rate=20, chat_rate=100, chat_burst=100)
+    sender.global_bucket.tokens = 0
+    order = []
+
+    async def make_request(bot, method):
+        order.append(method.chat_id)
+        return True
+
+    async def push(chat_id):
+        with broadcast():
+            await sender(make_request, None, SendMessage(chat_id=chat_id, text="☀️"))
+
+    pushes = [asyncio.create_task(push(chat_id)) for chat_id in range(1, 4)]
+    await asyncio.sleep(0)
+    reply = asyncio.create_task(sender(make_request, None, SendMessage(chat_id=99, text="ok")))
+    await asyncio.gather(reply, *pushes)
+
+    assert order[0] == 99
+    assert sorted(order[1:]) == [1, 2, 3]
+    assert sender.stats()["sent"] == 4
+    assert sender.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_retry_after_pauses_chat_and_repeats_request():
+    sender = OutboundSender()
+    calls = []
+
+    async def make_request(bot, method):
+        calls.append(asyncio.get_running_loop().time())
+        if len(calls) == 1:
+            raise TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=0.05)
+        return True
+
+    assert await sender(make_request, None, SendMessage(chat_id=1, text="hi")) is True
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.04
+    assert sender.stats()["retries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_methods_without_chat_bypass_queue():
+    sender = OutboundSender()
+
+    async def make_request(bot, method):
+        return "me"
+
+    assert await sender(make_request, None, GetMe()) == "me"
+    assert sender.stats()["sent"] == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_depth_and_waits_are_exported_while_running():
+    metrics = Metrics()
+    sender = OutboundSender(global_rate=20, chat_rate=100, chat_burst=100, metrics=metrics)
+    sender.global_bucket.tokens = 0
+
+    async def make_request(bot, method):
+        return True
+
+    async def push(chat_id):
+        with broadcast():
+            await sender(make_request, None, SendMessage(chat_id=chat_id, text="☀️"))
+
+    pushes = [asyncio.create_task(push(chat_id)) for chat_id in range(1, 4)]
+    await asyncio.sleep(0)
+    # очередь видна в /metrics, пока запросы ждут, а не только в stats() при остановке
+    assert 'advent_outbound_queue_depth{priority="broadcast"} 3' in metrics.render()
+
+    await asyncio.gather(*pushes)
+    rendered = metrics.render()
+    assert 'advent_outbound_queue_depth{priority="broadcast"} 0' in rendered
+    assert 'advent_outbound_wait_seconds_count{priority="broadcast"} 3' in rendered
+    assert "outbound: queued=0" in metrics.summary()
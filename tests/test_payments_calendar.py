@@ -1,7 +1,7 @@
 import datetime
 import os
 import tempfile
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, patch
 
 import pytest
 from aiogram import types
@@ -38,15 +38,17 @@ async def test_handle_full_calendar_free_creates_31_days(tmp_path):
     year = 2025
 
     msg = make_message()
-    msg.answer = AsyncMock()
-
-    await payments_module.handle_full_calendar_free(msg, child_id, year)
+    # модели aiogram заморожены — подменяем методы на классе
+    with patch.object(types.Message, "answer", AsyncMock()) as answer, \
+            patch.object(types.Message, "answer_document", AsyncMock()):
+        await payments_module.handle_full_calendar_free(msg, child_id, year)
 
     # проверяем, что 31 запись для декабря
     records = storage.get_task_records_for_child(child_id, year, 12)
     assert len(records) == 31
 
-    msg.answer.assert_called()
-    text = msg.answer.call_args.kwargs["text"]
+    answer.assert_called()
+    # календарь может прийти несколькими сообщениями — заголовок в первом
+    text = answer.call_args_list[0].kwargs["text"]
     assert "ПОЛНЫЙ КАЛЕНДАРЬ" in text
     assert "Никита" in text
@@ -1,4 +1,5 @@
 import datetime
+import functools
 import os
 import tempfile
 from unittest.mock import AsyncMock, patch
@@ -50,36 +51,47 @@ async def test_successful_payment_reroll_changes_task(tmp_path):
     # подменяем pick_task, чтобы вернуть новую задачу с id=2
     fake_task = {"id": 2, "text": "Новое тестовое задание для {name}"}
 
-    async def fake_pick_task(child, d, s, cid):
-        return fake_task
-
-    with patch("handlers.payments.pick_task", side_effect=fake_pick_task):
-        msg = make_message(
-            payload=f"reload_task_{child_id}_{date_obj.strftime('%Y%m%d')}"
-        )
-        msg.answer = AsyncMock()
-        msg.answer.text = None
-        msg.answer.reply_markup = None
-        msg.answer_message = AsyncMock()
-        msg.answer_photo = AsyncMock()
-        msg.answer_document = AsyncMock()
-        msg.answer_video = AsyncMock()
-        msg.answer_animation = AsyncMock()
-        msg.answer_voice = AsyncMock()
-        msg.answer_audio = AsyncMock()
-        msg.answer_invoice = AsyncMock()
-
-        # answer мы будем смотреть через call_args
-        msg.answer = AsyncMock()
-
+    msg = make_message(
+        payload=f"reload_task_{child_id}_{date_obj.strftime('%Y%m%d')}"
+    )
+    # модели aiogram заморожены — подменяем методы на классе, а не на объекте
+    with patch("handlers.payments.pick_task", return_value=fake_task), \
+            patch.object(types.Message, "answer", AsyncMock()) as answer:
         await payments_module.successful_payment_callback(msg)
 
-        # проверяем, что в storage task_id обновился
-        rec = storage.get_task_record(child_id, date_obj.year, date_obj.month, date_obj.day)
-        assert rec["task_id"] == 2
+    # проверяем, что в storage task_id обновился
+    rec = storage.get_task_record(child_id, date_obj.year, date_obj.month, date_obj.day)
+    assert rec["task_id"] == 2
+
+    # проверяем, что в ответе есть текст задания и благодарность за 50 Stars
+    answer.assert_called()
+    text = answer.call_args.args[0]
+    assert "Новое задание для" in text
+    assert "Спасибо за 50 Stars" in text
+
+
+@pytest.mark.asyncio
+async def test_hashed_reroll_overrides_planned_task(tmp_path):
+    storage = make_storage(tmp_path)
+    payments_module.storage = storage
+
+    child_id = storage.add_child(
+        parent_id=1, name="Никита", age=8, tz_label="Москва", tz_offset=0
+    )
+    child = storage.get_child(child_id)
+    date_obj = datetime.date(2025, 12, 3)
+    planned = task_picker_module.planned_task(child, date_obj)
+
+    msg = make_message(payload=f"reload_task_{child_id}_{date_obj.strftime('%Y%m%d')}")
+    hashed_pick = functools.partial(task_picker_module.pick_task, mode="hashed")
+    with patch.object(payments_module, "PICKER_MODE", "hashed"), \
+            patch("handlers.payments.pick_task", side_effect=hashed_pick), \
+            patch.object(types.Message, "answer", AsyncMock()) as answer:
+        await payments_module.successful_payment_callback(msg)
 
-        # проверяем, что в ответе есть текст задания и благодарность за 50 Stars
-        msg.answer.assert_called()
-        text = msg.answer.call_args.kwargs["text"]
-        assert "Новое задание для" in text
-        assert "Спасибо за 50 Stars" in text
+    # записи не было — reroll сохранён как override поверх вычисленного задания
+    rec = storage.get_task_record(child_id, date_obj.year, date_obj.month, date_obj.day)
+    assert rec["task_id"] != planned["id"]
+    # новое задание не совпадает ни с одним днём вычисленного плана месяца
+    assert rec["task_id"] not in task_picker_module.hashed_month_plan(child, 2025, 12)
+    assert "Спасибо за 50 Stars" in answer.call_args.args[0]
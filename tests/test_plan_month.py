@@ -0,0 +1,100 @@
+import datetime
+import os
+
+import pytest
+
+from models.storage import Storage
+from models.task_catalog import get_catalog
+from models.task_picker import plan_month, plan_month_async
+from utils.calendar_logic import get_day_type
+
+
+def make_storage(tmp_path):
+    return Storage(path=os.path.join(tmp_path, "storage.json"))
+
+
+def test_plan_month_fills_missing_days_in_one_write(tmp_path):
+    storage = make_storage(tmp_path)
+    child_id = storage.add_child(parent_id=1, name="Никита", age=8,
+                                 tz_label="Москва", tz_offset=3)
+    child = storage.get_child(child_id)
+
+    # день, который уже выдан, должен остаться как есть
+    storage.add_task_record(child_id, 2025, 12, 5, task_id=101)
+    storage.set_task_status(child_id, 2025, 12, 5, "done")
+
+    saves = []
+    original_save = storage._save
+    storage._save = lambda data: saves.append(1) or original_save(data)
+
+    records = plan_month(child, 2025, storage)
+
+    assert len(saves) == 1
+    assert [r["day"] for r in records] == list(range(1, 32))
+    assert records[4]["task_id"] == 101
+    assert records[4]["status"] == "done"
+
+    catalog = get_catalog()
+    new_ids = [r["task_id"] for r in records if r["day"] != 5]
+    assert len(new_ids) == len(set(new_ids))
+    for r in records:
+        if r["day"] == 5:
+            continue
+        day_type = get_day_type(datetime.date(2025, 12, r["day"]))
+        assert day_type in catalog.get(r["task_id"])["day_types"]
+
+    # повторный вызов ничего не пишет и возвращает тот же план
+    assert plan_month(child, 2025, storage) == records
+    assert len(saves) == 1
+    assert len(storage.get_task_records_for_child(child_id, 2025, 12)) == 31
+
+
+@pytest.mark.asyncio
+async def test_plan_month_async_commits_through_writer(tmp_path):
+    storage = make_storage(tmp_path)
+    child_id = storage.add_child(parent_id=1, name="Никита", age=8,
+                                 tz_label="Москва", tz_offset=3)
+    child = storage.get_child(child_id)
+    storage.add_task_record(child_id, 2025, 12, 5, task_id=101)
+
+    submitted = []
+    original_submit = storage.aio.writer.submit
+
+    async def spy(method, *args, **kwargs):
+        submitted.append(method)
+        return await original_submit(method, *args, **kwargs)
+
+    storage.aio.writer.submit = spy
+    records = await plan_month_async(child, 2025, storage, mode="stored")
+
+    assert submitted == ["add_task_records"]
+    assert [r["day"] for r in records] == list(range(1, 32))
+    assert records[4]["task_id"] == 101
+    assert await plan_month_async(child, 2025, storage, mode="stored") == records
+    assert submitted == ["add_task_records"]
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_bought_calendar_streak_counts_from_local_today(tmp_path, backend):
+    from models.sqlite_storage import SQLiteStorage
+
+    if backend == "json":
+        storage = make_storage(tmp_path)
+    else:
+        storage = SQLiteStorage(os.path.join(tmp_path, "storage.db"))
+    child_id = storage.add_child(parent_id=1, name="Никита", age=8,
+                                 tz_label="Москва", tz_offset=3)
+    plan_month(storage.get_child(child_id), 2025, storage)
+    for day in range(1, 11):
+        storage.set_task_status(child_id, 2025, 12, day, "done")
+
+    # весь месяц выдан сразу — серия считается от сегодняшнего дня ребёнка
+    for today, current in ((datetime.date(2025, 12, 10), 10),
+                           (datetime.date(2025, 12, 11), 10),
+                           (datetime.date(2025, 12, 12), 0),
+                           (datetime.date(2025, 11, 30), 0)):
+        stats = storage.get_month_stats(child_id, 2025, 12, today)
+        assert (stats["current_streak"], stats["longest_streak"]) == (current, 10)
+
+    [(_, family)] = storage.get_family_month_stats(1, 2025, 12, lambda c: datetime.date(2025, 12, 11))
+    assert family["current_streak"] == 10
@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+import pytest
+
+from handlers.admin import parse_profile_args, report_preview
+from utils.profiling import Profiler, ProfilingMiddleware
+
+# функция «из handlers.*», чтобы сэмплы приписались ей
+_fake_handlers = {"__name__": "handlers.fake", "time": time}
+exec(
+    "async def busy_handler(event, data):\n"
+    "    deadline = time.perf_counter() + 0.05\n"
+    "    while time.perf_counter() < deadline:\n"
+    "        pass\n",
+    _fake_handlers
+)
+busy_handler = _fake_handlers["busy_handler"]
+
+
+@pytest.mark.asyncio
+async def test_profiler_attributes_samples_and_stops_after_n_updates(tmp_path):
+    profiler = Profiler(out_dir=str(tmp_path), interval=0.001)
+    middleware = ProfilingMiddleware(profiler)
+    reports = []
+
+    async def on_done(path):
+        reports.append(path)
+
+    assert profiler.start(updates=2, on_done=on_done)
+    assert not profiler.start(updates=2)  # второй запуск поверх первого не нужен
+
+    await middleware(busy_handler, object(), {})
+    await middleware(busy_handler, object(), {})
+    while profiler.active or not reports:
+        await asyncio.sleep(0.01)
+
+    with open(reports[0], "r", encoding="utf-8") as f:
+        report = f.read()
+    assert report.startswith("Профиль: 2 апдейтов")
+    assert "== handlers.fake.busy_handler:" in report
+
+    # выключенный профилировщик апдейты не считает
+    await middleware(busy_handler, object(), {})
+    assert profiler.updates == 2
+
+
+def test_parse_profile_args():
+    assert parse_profile_args("500")[0] == 500
+    assert parse_profile_args("30s") == (0, 30.0)
+    with pytest.raises(ValueError):
+        parse_profile_args("fast")
+
+
+def test_report_preview_escapes_frame_names_and_fits_message():
+    text = "== handlers.fake.busy_handler: 10 сэмплов\n" + "  5  <frozen importlib._bootstrap> <module>\n" * 500
+    preview = report_preview("data/profiles/p.txt", text)
+
+    assert "<frozen" not in preview and "&lt;module&gt;" in preview
+    assert preview.startswith("Отчёт: <code>data/profiles/p.txt</code>")
+    assert preview.endswith("</pre>")
+    assert len(preview) < 4096
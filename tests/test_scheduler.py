@@ -0,0 +1,94 @@
+import datetime
+import os
+from unittest.mock import AsyncMock
+
+import pytest
+
+from models.storage import Storage
+import handlers.tasks as tasks_module
+from utils.scheduler import MorningPushScheduler, due_offsets
+
+
+def make_storage(tmp_path):
+    return Storage(path=os.path.join(tmp_path, "storage.json"))
+
+
+def test_due_offsets_picks_zones_where_morning_starts():
+    now_utc = datetime.datetime(2025, 12, 1, 6, 0)
+    assert due_offsets(now_utc, hour=9) == [3]
+    assert due_offsets(datetime.datetime(2025, 12, 1, 14, 0), hour=9) == [-5]
+
+
+def test_due_offsets_catches_up_missed_hours_of_the_same_day():
+    # тик в 6:00 UTC затянулся до 9:xx — пояса, где утро было в 7, 8 и 9 UTC, не теряются
+    now_utc = datetime.datetime(2025, 12, 1, 9, 5)
+    assert due_offsets(now_utc, hour=9, window=4) == [0, 1, 2, 3]
+    # в UTC-12 сейчас 7 утра: его прошлое утро было вчера и не догоняется
+    assert -12 not in due_offsets(datetime.datetime(2025, 12, 1, 19, 0), hour=9, window=24)
+
+
+@pytest.mark.asyncio
+async def test_tick_pushes_only_children_of_due_timezone(tmp_path):
+    storage = make_storage(tmp_path)
+    tasks_module.storage = storage
+
+    moscow_id = storage.add_child(parent_id=10, name="Никита", age=8,
+                                  tz_label="Москва (UTC+3)", tz_offset=3)
+    storage.add_child(parent_id=20, name="Аня", age=6,
+                      tz_label="London (UTC+0)", tz_offset=0)
+
+    bot = AsyncMock()
+    scheduler = MorningPushScheduler(bot, hour=9)
+    now_utc = datetime.datetime(2025, 12, 1, 6, 0)
+
+    assert await scheduler.tick(now_utc) == 1
+    bot.send_message.assert_called_once()
+    assert bot.send_message.call_args.kwargs["chat_id"] == 10
+    assert "Никита" in bot.send_message.call_args.kwargs["text"]
+
+    # задание подобрано и сохранено заранее
+    assert storage.get_task_record(moscow_id, 2025, 12, 1) is not None
+
+    # повторный тик в тот же час ничего не шлёт
+    assert await scheduler.tick(now_utc) == 0
+
+
+@pytest.mark.asyncio
+async def test_restart_within_push_hour_does_not_push_again(tmp_path):
+    storage = make_storage(tmp_path)
+    tasks_module.storage = storage
+    storage.add_child(parent_id=10, name="Никита", age=8, tz_label="Москва (UTC+3)", tz_offset=3)
+    now_utc = datetime.datetime(2025, 12, 1, 6, 0)
+
+    assert await MorningPushScheduler(AsyncMock(), hour=9).tick(now_utc) == 1
+
+    # новый процесс: планировщик создаётся заново, хранилище перечитывается с диска
+    tasks_module.storage = Storage(path=storage.path)
+    bot = AsyncMock()
+    assert await MorningPushScheduler(bot, hour=9).tick(now_utc.replace(minute=40)) == 0
+    bot.send_message.assert_not_called()
+
+    # а на следующее утро рассылка снова идёт
+    assert await MorningPushScheduler(bot, hour=9).tick(now_utc + datetime.timedelta(days=1)) == 1
+
+
+@pytest.mark.asyncio
+async def test_tick_saves_whole_timezone_in_one_write(tmp_path):
+    storage = make_storage(tmp_path)
+    tasks_module.storage = storage
+    for parent_id in range(10, 15):
+        storage.add_child(parent_id=parent_id, name="Никита", age=8,
+                          tz_label="Москва (UTC+3)", tz_offset=3)
+    # у одного ребёнка задание дня уже есть — его и присылаем
+    storage.add_task_record(1, 2025, 12, 1, task_id=1)
+
+    writes = []
+    original_write = storage._write
+    storage._write = lambda data: writes.append(1) or original_write(data)
+
+    bot = AsyncMock()
+    assert await MorningPushScheduler(bot, hour=9).tick(datetime.datetime(2025, 12, 1, 6, 0)) == 5
+    # отметка рассылки и задания пояса — две записи файла, а не по одной на ребёнка
+    assert len(writes) == 2
+    assert all(storage.get_task_record(child_id, 2025, 12, 1) for child_id in range(1, 6))
+    assert storage.get_task_record(1, 2025, 12, 1)["task_id"] == 1
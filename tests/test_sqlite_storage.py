@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from models.sqlite_storage import SQLiteStorage, migrate_json_to_sqlite
+from models.storage import Storage
+
+
+def make_storage(tmp_path):
+    return SQLiteStorage(path=os.path.join(tmp_path, "storage.db"))
+
+
+def test_sqlite_child_and_task_records(tmp_path):
+    s = make_storage(tmp_path)
+    child_id = s.add_child(parent_id=1, name="Никита", age=8,
+                           tz_label="Москва", tz_offset=3)
+    assert s.get_child(child_id)["name"] == "Никита"
+    assert [c["id"] for c in s.get_children_by_parent(1)] == [child_id]
+
+    s.add_task_record(child_id, 2025, 12, 3, task_id=42)
+    rec = s.get_task_record(child_id, 2025, 12, 3)
+    assert rec["task_id"] == 42
+    assert rec["status"] == "new"
+
+    s.set_task_status(child_id, 2025, 12, 3, "done")
+    assert s.get_task_record(child_id, 2025, 12, 3)["status"] == "done"
+
+    assert s.update_task_id(child_id, 2025, 12, 3, new_task_id=7) is True
+    rec = s.get_task_record(child_id, 2025, 12, 3)
+    assert rec["task_id"] == 7
+    assert rec["status"] == "new"
+    assert s.update_task_id(child_id, 2025, 12, 4, new_task_id=7) is False
+
+    s.delete_child(child_id)
+    assert s.get_child(child_id) is None
+    assert s.get_task_records_for_child(child_id, 2025, 12) == []
+
+
+def test_sqlite_month_stats_match_json_storage(tmp_path):
+    json_storage = Storage(path=os.path.join(tmp_path, "storage.json"))
+    sqlite_storage = make_storage(tmp_path)
+    for s in (json_storage, sqlite_storage):
+        child_id = s.add_child(parent_id=1, name="Аня", age=5, tz_label="Москва", tz_offset=3)
+        for day in range(1, 8):
+            s.add_task_record(child_id, 2025, 12, day, task_id=day)
+        for day in (1, 2, 3, 5, 6):
+            s.set_task_status(child_id, 2025, 12, day, "done")
+
+    assert sqlite_storage.get_month_stats(1, 2025, 12) == json_storage.get_month_stats(1, 2025, 12)
+    [(child, stats)] = sqlite_storage.get_family_month_stats(1, 2025, 12)
+    assert child["name"] == "Аня"
+    assert (stats["current_streak"], stats["longest_streak"]) == (2, 3)
+
+
+def test_migrate_json_to_sqlite_keeps_ids(tmp_path):
+    json_path = os.path.join(tmp_path, "storage.json")
+    db_path = os.path.join(tmp_path, "storage.db")
+
+    js = Storage(path=json_path)
+    child_id = js.add_child(parent_id=5, name="Аня", age=6,
+                            tz_label="Москва", tz_offset=3)
+    js.add_task_record(child_id, 2025, 12, 1, task_id=10)
+    js.add_task_record(child_id, 2025, 12, 2, task_id=11)
+    js.set_task_status(child_id, 2025, 12, 2, "done")
+
+    assert migrate_json_to_sqlite(json_path, db_path) == (1, 2)
+
+    s = SQLiteStorage(path=db_path)
+    assert s.get_children_by_parent(5) == js.get_children_by_parent(5)
+    assert s.get_task_records_for_child(child_id, 2025, 12) == \
+        js.get_task_records_for_child(child_id, 2025, 12)
+    s.close()
+
+    # повторный запуск не должен задублировать данные
+    with pytest.raises(ValueError):
+        migrate_json_to_sqlite(json_path, db_path)
+
+
+def test_sqlite_meta_roundtrip(tmp_path):
+    s = make_storage(tmp_path)
+    assert s.get_meta("morning_push_3") is None
+    s.set_meta("morning_push_3", "2025-12-01")
+    s.set_meta("morning_push_3", "2025-12-02")
+
+    assert make_storage(tmp_path).get_meta("morning_push_3") == "2025-12-02"
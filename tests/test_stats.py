@@ -1,12 +1,14 @@
 import datetime
 import os
 import tempfile
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, patch
 
 import pytest
 from aiogram import types
 
+from handlers.start import ChildAction
 from models.storage import Storage
+from models.task_picker import plan_month
 import handlers.stats as stats_module
 
 
@@ -25,6 +27,16 @@ def make_message(user_id: int=1, text: str="📊 Статистика") -> types
     )
 
 
+def make_callback(user_id: int, data: str) -> types.CallbackQuery:
+    return types.CallbackQuery(
+        id="1",
+        from_user=types.User(id=user_id, is_bot=False, first_name="Test"),
+        chat_instance="1",
+        message=make_message(user_id, text="Для кого показать статистику?"),
+        data=data,
+    )
+
+
 @pytest.mark.asyncio
 async def test_stats_single_child_done_task(tmp_path):
     storage = make_storage(tmp_path)
@@ -40,13 +52,60 @@ async def test_stats_single_child_done_task(tmp_path):
     storage.set_task_status(child_id, today.year, today.month, today.day, "done")
 
     msg = make_message()
-    msg.answer = AsyncMock()
+    # модели aiogram заморожены — подменяем методы на классе, а не на объекте
+    with patch.object(types.Message, "answer", AsyncMock()) as answer:
+        await stats_module.stats_entry(msg)
 
-    state = AsyncMock()  # для простоты подменим FSM-контекст заглушкой
-
-    await stats_module.stats_entry(msg, state)
-
-    msg.answer.assert_called()
-    text = msg.answer.call_args.kwargs["text"]
+    answer.assert_called()
+    text = answer.call_args.args[0]
     assert "Всего заданий выдано: 1" in text
     assert "Выполнено: 1" in text
+
+
+@pytest.mark.asyncio
+async def test_stats_callbacks_for_child_and_family(tmp_path):
+    storage = make_storage(tmp_path)
+    stats_module.storage = storage
+
+    today = datetime.date.today()
+    nikita_id = storage.add_child(parent_id=1, name="Никита", age=8, tz_label="Москва", tz_offset=0)
+    storage.add_child(parent_id=1, name="Аня", age=6, tz_label="Москва", tz_offset=0)
+    storage.add_task_record(nikita_id, today.year, today.month, today.day, task_id=1)
+
+    with patch.object(types.Message, "answer", AsyncMock()) as answer, \
+            patch.object(types.CallbackQuery, "answer", AsyncMock()):
+        await stats_module.stats_entry(make_message())
+        # по кнопке на каждого ребёнка и «Вся семья»
+        assert len(answer.call_args.kwargs["reply_markup"].inline_keyboard) == 3
+
+        data = ChildAction(action="stats", child_id=nikita_id)
+        await stats_module.stats_choose_child(make_callback(1, data.pack()), data)
+        text = answer.call_args.args[0]
+        assert "Статистика для Никита" in text
+        assert "Всего заданий выдано: 1" in text
+
+        await stats_module.stats_family(make_callback(1, ChildAction(action="family", child_id=0).pack()))
+        text = answer.call_args.args[0]
+        assert "Никита: ✅ 0 из 1" in text
+        assert "Аня: ✅ 0 из 0" in text
+
+
+@pytest.mark.asyncio
+async def test_stats_text_shows_streak_of_bought_calendar(tmp_path):
+    storage = make_storage(tmp_path)
+    stats_module.storage = storage
+
+    child_id = storage.add_child(parent_id=1, name="Никита", age=8, tz_label="Москва", tz_offset=3)
+    child = storage.get_child(child_id)
+    plan_month(child, 2025, storage)
+    for day in range(1, 11):
+        storage.set_task_status(child_id, 2025, 12, day, "done")
+
+    # весь декабрь выдан сразу, а серия считается от сегодняшнего дня ребёнка
+    with patch("handlers.stats.local_today", return_value=datetime.date(2025, 12, 11)):
+        text = await stats_module.build_stats_text(child, 2025, 12)
+        family = await stats_module.build_family_stats_text(1, 2025, 12)
+
+    assert "Всего заданий выдано: 31" in text
+    assert "🔥 Серия: 10 (лучшая: 10)" in text
+    assert "🔥 серия 10 (лучшая: 10)" in family
@@ -1,3 +1,4 @@
+import json
 import os
 import tempfile
 
@@ -33,3 +34,125 @@ def test_task_record_and_status():
     s.set_task_status(child_id, 2025, 12, 3, "done")
     rec2 = s.get_task_record(child_id, 2025, 12, 3)
     assert rec2["status"] == "done"
+
+
+def test_ids_are_sequences_persisted_across_restart():
+    s = make_storage()
+    first = s.add_child(parent_id=1, name="Аня", age=5, tz_label="Москва", tz_offset=3)
+    second = s.add_child(parent_id=1, name="Саша", age=7, tz_label="Москва", tz_offset=3)
+    s.delete_child(second)
+
+    created = s.add_task_records([
+        {"child_id": first, "year": 2025, "month": 12, "day": day, "task_id": day}
+        for day in (1, 2, 3)
+    ])
+    assert [r["id"] for r in created] == [1, 2, 3]
+
+    # удалённый id не выдаётся повторно и после перезапуска
+    reopened = Storage(path=s.path)
+    assert reopened.add_child(parent_id=1, name="Лёва", age=4,
+                              tz_label="Москва", tz_offset=3) == second + 1
+    reopened.add_task_record(first, 2025, 12, 4, task_id=4)
+    assert reopened.get_task_record(first, 2025, 12, 4)["id"] == 4
+
+
+def test_legacy_file_without_meta_continues_from_max_id():
+    s = make_storage()
+    with open(s.path, "w", encoding="utf-8") as f:
+        json.dump({
+            "children": [{"id": 5, "parent_id": 1, "name": "Аня", "age": 5,
+                          "tz_label": "Москва", "tz_offset": 3}],
+            "tasks": [{"id": 9, "child_id": 5, "year": 2025, "month": 12,
+                       "day": 1, "task_id": 1, "status": "new"}]
+        }, f)
+
+    legacy = Storage(path=s.path)
+    assert legacy.add_child(parent_id=1, name="Саша", age=7,
+                            tz_label="Москва", tz_offset=3) == 6
+    legacy.add_task_record(5, 2025, 12, 2, task_id=2)
+    assert legacy.get_task_record(5, 2025, 12, 2)["id"] == 10
+
+
+def test_month_stats_follow_every_mutation():
+    s = make_storage()
+    child_id = s.add_child(parent_id=1, name="Аня", age=5, tz_label="Москва", tz_offset=3)
+    for day in range(1, 6):
+        s.add_task_record(child_id, 2025, 12, day, task_id=day)
+    for day in (1, 2, 4, 5):
+        s.set_task_status(child_id, 2025, 12, day, "done")
+
+    stats = s.get_month_stats(child_id, 2025, 12)
+    assert (stats["issued"], stats["done"], stats["pending"]) == (5, 4, 1)
+    assert (stats["current_streak"], stats["longest_streak"]) == (2, 2)
+
+    s.set_task_status(child_id, 2025, 12, 3, "done")
+    assert s.get_month_stats(child_id, 2025, 12)["longest_streak"] == 5
+
+    # reroll сбрасывает выполнение дня
+    s.update_task_id(child_id, 2025, 12, 5, new_task_id=50)
+    stats = s.get_month_stats(child_id, 2025, 12)
+    assert (stats["done"], stats["current_streak"]) == (4, 4)
+
+    # счётчики из файла совпадают с накопленными
+    assert Storage(path=s.path).get_month_stats(child_id, 2025, 12) == stats
+
+    s.delete_child(child_id)
+    assert s.get_month_stats(child_id, 2025, 12)["issued"] == 0
+
+
+def test_storage_sees_changes_made_by_another_instance():
+    s = make_storage()
+    other = Storage(path=s.path)
+
+    child_id = s.add_child(parent_id=1, name="Аня", age=5,
+                           tz_label="Москва", tz_offset=3)
+    assert [c["id"] for c in other.get_children_by_parent(1)] == [child_id]
+
+    other.add_task_record(child_id, 2025, 12, 1, task_id=7)
+    assert s.get_task_record(child_id, 2025, 12, 1)["task_id"] == 7
+
+
+def test_readers_get_copies_not_live_records():
+    s = make_storage()
+    child_id = s.add_child(parent_id=1, name="Тест", age=7,
+                           tz_label="Москва", tz_offset=3)
+    s.add_task_record(child_id, 2025, 12, 3, task_id=42)
+
+    rec = s.get_task_record(child_id, 2025, 12, 3)
+    s.set_task_status(child_id, 2025, 12, 3, "done")
+
+    assert rec["status"] == "new"
+    assert s.get_task_record(child_id, 2025, 12, 3)["status"] == "done"
+
+
+def test_write_behind_coalesces_mutations_until_flush():
+    tmpdir = tempfile.mkdtemp()
+    path = os.path.join(tmpdir, "storage.json")
+    s = Storage(path=path, flush_interval=60)
+
+    child_id = s.add_child(parent_id=1, name="Никита", age=8,
+                           tz_label="Москва", tz_offset=3)
+    for day in range(1, 6):
+        s.add_task_record(child_id, 2025, 12, day, task_id=day)
+
+    # в памяти всё есть, на диске — ещё пустое хранилище
+    assert len(s.get_task_records_for_child(child_id, 2025, 12)) == 5
+    assert Storage(path=path).get_child(child_id) is None
+
+    s.flush()
+    assert len(Storage(path=path).get_task_records_for_child(child_id, 2025, 12)) == 5
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_write_behind_flushes_after_n_operations():
+    tmpdir = tempfile.mkdtemp()
+    path = os.path.join(tmpdir, "storage.json")
+    s = Storage(path=path, flush_interval=60, flush_every=3)
+
+    child_id = s.add_child(parent_id=1, name="Аня", age=5,
+                           tz_label="Москва", tz_offset=3)
+    s.add_task_record(child_id, 2025, 12, 1, task_id=1)
+    assert Storage(path=path).get_child(child_id) is None
+
+    s.add_task_record(child_id, 2025, 12, 2, task_id=2)
+    assert len(Storage(path=path).get_task_records_for_child(child_id, 2025, 12)) == 2
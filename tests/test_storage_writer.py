@@ -0,0 +1,84 @@
+import asyncio
+import os
+
+import pytest
+
+from models.storage import Storage
+from models.storage_writer import StorageWriter
+
+
+def make_storage(tmp_path):
+    return Storage(path=os.path.join(tmp_path, "storage.json"))
+
+
+@pytest.mark.asyncio
+async def test_concurrent_mutations_are_batched_into_one_flush(tmp_path):
+    storage = make_storage(tmp_path)
+    child_id = storage.add_child(parent_id=1, name="Никита", age=8,
+                                 tz_label="Москва", tz_offset=3)
+    for day in range(1, 21):
+        storage.add_task_record(child_id, 2025, 12, day, task_id=day)
+
+    writes = []
+    original_save = storage._save
+
+    def counting_save(data):
+        if not storage._batch_depth:
+            writes.append(1)
+        original_save(data)
+
+    storage._save = counting_save
+    writer = StorageWriter(storage)
+
+    # двадцать «одновременных» нажатий «✅ Выполнено»
+    await asyncio.gather(*[
+        writer.submit("set_task_status", child_id, 2025, 12, day, "done")
+        for day in range(1, 21)
+    ])
+
+    assert len(writes) == 1
+    reread = Storage(path=storage.path)
+    records = reread.get_task_records_for_child(child_id, 2025, 12)
+    assert all(r["status"] == "done" for r in records)
+
+
+@pytest.mark.asyncio
+async def test_failed_command_only_fails_its_caller(tmp_path):
+    storage = make_storage(tmp_path)
+    writer = StorageWriter(storage)
+
+    ok, bad = await asyncio.gather(
+        writer.submit("add_child", 1, "Аня", 5, "Москва", 3),
+        writer.submit("no_such_method"),
+        return_exceptions=True
+    )
+
+    assert ok == 1
+    assert isinstance(bad, AttributeError)
+    assert storage.get_child(1)["name"] == "Аня"
+
+
+@pytest.mark.asyncio
+async def test_flush_window_groups_staggered_mutations(tmp_path):
+    storage = Storage(path=os.path.join(tmp_path, "storage.json"), flush_interval=0.1)
+    writes = []
+    original_write = storage._write
+
+    def counting_write(data):
+        writes.append(1)
+        original_write(data)
+
+    storage._write = counting_write
+    writer = StorageWriter(storage)
+
+    async def add_later(delay, name):
+        await asyncio.sleep(delay)
+        child_id = await writer.submit("add_child", 1, name, 5, "Москва", 3)
+        # future завершается только после сброса: на диске ребёнок уже есть
+        assert Storage(path=storage.path).get_child(child_id)["name"] == name
+        return child_id
+
+    ids = await asyncio.gather(add_later(0, "Аня"), add_later(0.03, "Боря"), add_later(0.06, "Вера"))
+
+    assert ids == [1, 2, 3]
+    assert len(writes) == 1
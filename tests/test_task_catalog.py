@@ -0,0 +1,76 @@
+import datetime
+import os
+
+from models.storage import Storage
+from models.task_catalog import TaskCatalog
+import models.task_picker as task_picker_module
+
+TASKS = [
+    {"id": 1, "min_age": 0, "max_age": 6, "day_types": ["weekday"], "text": "{name} 1"},
+    {"id": 2, "min_age": 0, "max_age": 6, "day_types": ["weekday", "weekend"], "text": "{name} 2"},
+    {"id": 3, "min_age": 7, "max_age": 10, "day_types": ["weekend"], "text": "{name} 3"},
+]
+
+
+def test_catalog_buckets_and_lookup():
+    catalog = TaskCatalog(TASKS)
+
+    assert catalog.get(3)["text"] == "{name} 3"
+    assert catalog.get(99) is None
+    assert [t["id"] for t in catalog.candidates(5, "weekday")] == [1, 2]
+    assert [t["id"] for t in catalog.candidates(5, "weekend")] == [2]
+    assert catalog.candidates(5, "new_year") == ()
+    assert [t["id"] for t in catalog.for_age(8)] == [3]
+
+
+def test_pick_task_skips_used_ids_from_bucket(tmp_path, monkeypatch):
+    monkeypatch.setattr(task_picker_module, "get_catalog", lambda: TaskCatalog(TASKS))
+    storage = Storage(path=os.path.join(tmp_path, "storage.json"))
+    child_id = storage.add_child(parent_id=1, name="Аня", age=5,
+                                 tz_label="Москва", tz_offset=3)
+    child = storage.get_child(child_id)
+    weekday = datetime.date(2025, 12, 1)
+
+    storage.add_task_record(child_id, 2025, 12, 2, task_id=1)
+    assert task_picker_module.pick_task(child, weekday, storage, child_id)["id"] == 2
+
+    # всё из корзины уже было — повтор лучше, чем пустота
+    storage.add_task_record(child_id, 2025, 12, 3, task_id=2)
+    assert task_picker_module.pick_task(child, weekday, storage, child_id)["id"] in (1, 2)
+
+    # для типа дня нет заданий — берём любое по возрасту
+    new_year = datetime.date(2025, 12, 31)
+    assert task_picker_module.pick_task(child, new_year, storage, child_id)["id"] in (1, 2)
+
+
+def test_catalog_masks_use_dense_indexes():
+    catalog = TaskCatalog(TASKS)
+
+    assert catalog.candidates_mask(5, "weekday") == 0b011
+    assert catalog.age_mask(8) == 0b100
+    assert catalog.mask_of([3, 1, 99]) == 0b101
+    assert [t["id"] for t in catalog.tasks_in(0b101)] == [1, 3]
+    assert {catalog.choice(0b110)["id"] for _ in range(50)} == {2, 3}
+
+
+def test_pick_task_avoids_previous_seasons_and_siblings(tmp_path, monkeypatch):
+    catalog = TaskCatalog(TASKS)
+    monkeypatch.setattr(task_picker_module, "get_catalog", lambda: catalog)
+    storage = Storage(path=os.path.join(tmp_path, "storage.json"))
+    anya = storage.add_child(parent_id=1, name="Аня", age=5, tz_label="Москва", tz_offset=3)
+    lev = storage.add_child(parent_id=1, name="Лёва", age=5, tz_label="Москва", tz_offset=3)
+    child = storage.get_child(anya)
+    weekday = datetime.date(2025, 12, 1)
+
+    # задание 1 было у Ани в прошлом декабре
+    storage.add_task_record(anya, 2024, 12, 5, task_id=1)
+    assert task_picker_module.pick_task(child, weekday, storage, anya, seasons=1)["id"] == 2
+    assert {task_picker_module.pick_task(child, weekday, storage, anya, seasons=0)["id"]
+            for _ in range(30)} == {1, 2}
+
+    # у Лёвы в этот день задание 2: в семейном режиме свой повтор лучше совпадения
+    storage.add_task_record(lev, 2025, 12, 1, task_id=2)
+    assert task_picker_module.pick_task(child, weekday, storage, anya, seasons=1, family=True)["id"] == 1
+
+    records = task_picker_module.plan_month(child, 2025, storage, seasons=1, family=True)
+    assert records[0]["task_id"] == 1
@@ -3,14 +3,18 @@ import os
 import tempfile
 
 import pytest
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, patch
 
 from aiogram import types
+from handlers.start import ChildAction
 from models.storage import Storage
 
 # Импортируем модуль, где лежат хендлеры задач
 import handlers.tasks as tasks_module
 
+# бот выдаёт задания только в декабре — «сегодня» ребёнка фиксируем
+DECEMBER_DAY = datetime.date(2025, 12, 3)
+
 
 def make_storage(tmp_path):
     path = os.path.join(tmp_path, "storage.json")
@@ -28,6 +32,22 @@ def make_message(user_id: int=1, text: str="test") -> types.Message:
     )
 
 
+def make_callback(user_id: int, data: str) -> types.CallbackQuery:
+    return types.CallbackQuery(
+        id="1",
+        from_user=types.User(id=user_id, is_bot=False, first_name="Test"),
+        chat_instance="1",
+        message=make_message(user_id, text="Для какого ребёнка?"),
+        data=data,
+    )
+
+
+@pytest.fixture(autouse=True)
+def december():
+    with patch("handlers.tasks.local_today", return_value=DECEMBER_DAY):
+        yield
+
+
 @pytest.mark.asyncio
 async def test_send_today_task_new_record(tmp_path):
     """
@@ -42,9 +62,9 @@ async def test_send_today_task_new_record(tmp_path):
     child = storage.get_child(child_id)
 
     msg = make_message(text="📅 Задание на сегодня")
-    msg.answer = AsyncMock()
-
-    await tasks_module.send_today_task(msg, child)
+    # модели aiogram заморожены — подменяем методы на классе, а не на объекте
+    with patch.object(types.Message, "answer", AsyncMock()) as answer:
+        await tasks_module.send_today_task(msg, child)
 
     # Проверяем, что запись появилась
     today = tasks_module.get_child_today(child)
@@ -53,8 +73,8 @@ async def test_send_today_task_new_record(tmp_path):
     assert rec["status"] == "new"
 
     # Проверяем, что было отправлено сообщение
-    msg.answer.assert_called()
-    sent_text = msg.answer.call_args.kwargs["text"]
+    answer.assert_called()
+    sent_text = answer.call_args.args[0]
     assert "Задание на сегодня для Никита" in sent_text
 
 
@@ -76,16 +96,38 @@ async def test_send_today_task_already_done(tmp_path):
     storage.set_task_status(child_id, today.year, today.month, today.day, "done")
 
     msg = make_message(text="📅 Задание на сегодня")
-    msg.answer = AsyncMock()
-
-    await tasks_module.send_today_task(msg, child)
+    with patch.object(types.Message, "answer", AsyncMock()) as answer:
+        await tasks_module.send_today_task(msg, child)
 
-    msg.answer.assert_called()
-    sent_text = msg.answer.call_args.kwargs["text"]
+    answer.assert_called()
+    sent_text = answer.call_args.args[0]
     assert "уже выполнено" in sent_text
     assert "Приходите завтра" in sent_text
 
 
+@pytest.mark.asyncio
+async def test_today_callback_sends_task_of_chosen_child(tmp_path):
+    """Выбор ребёнка инлайн-кнопкой: задание получает тот, чей id в кнопке."""
+    storage = make_storage(tmp_path)
+    tasks_module.storage = storage
+
+    storage.add_child(parent_id=1, name="Никита", age=8, tz_label="Москва", tz_offset=0)
+    anya_id = storage.add_child(parent_id=1, name="Аня", age=6, tz_label="Москва", tz_offset=0)
+
+    with patch.object(types.Message, "answer", AsyncMock()) as answer:
+        await tasks_module.choose_child_for_today(make_message(text="📅 Задание на сегодня"))
+        kb = answer.call_args.kwargs["reply_markup"]
+        assert len(kb.inline_keyboard) == 2
+
+        data = ChildAction(action="today", child_id=anya_id)
+        with patch.object(types.CallbackQuery, "answer", AsyncMock()):
+            await tasks_module.process_child_for_today(make_callback(1, data.pack()), data)
+
+    assert "Задание на сегодня для Аня" in answer.call_args.args[0]
+    assert storage.get_task_record(anya_id, 2025, 12, 3) is not None
+    assert storage.get_task_record(1, 2025, 12, 3) is None
+
+
 @pytest.mark.asyncio
 async def test_mark_done_for_child_sets_status(tmp_path):
     """
@@ -103,18 +145,38 @@ async def test_mark_done_for_child_sets_status(tmp_path):
     storage.add_task_record(child_id, today.year, today.month, today.day, task_id=1)
 
     msg = make_message(text="✅ Выполнено")
-    msg.answer = AsyncMock()
-
-    await tasks_module.mark_done_for_child(msg, child)
+    with patch.object(types.Message, "answer", AsyncMock()) as answer:
+        await tasks_module.mark_done_for_child(msg, child)
 
     rec = storage.get_task_record(child_id, today.year, today.month, today.day)
     assert rec["status"] == "done"
 
-    msg.answer.assert_called()
-    sent_text = msg.answer.call_args.kwargs["text"]
+    answer.assert_called()
+    sent_text = answer.call_args.args[0]
     assert "отмечено как выполненное" in sent_text
 
 
+@pytest.mark.asyncio
+async def test_mark_done_in_hashed_mode_saves_planned_task(tmp_path):
+    """В режиме hashed записи нет — отметка сохраняет вычисленное задание дня."""
+    storage = make_storage(tmp_path)
+    tasks_module.storage = storage
+
+    child_id = storage.add_child(
+        parent_id=1, name="Никита", age=8, tz_label="Москва", tz_offset=0
+    )
+    child = storage.get_child(child_id)
+
+    with patch.object(tasks_module, "PICKER_MODE", "hashed"), \
+            patch.object(types.Message, "answer", AsyncMock()) as answer:
+        await tasks_module.mark_done_for_child(make_message(text="✅ Выполнено"), child)
+
+    rec = storage.get_task_record(child_id, 2025, 12, 3)
+    assert rec["status"] == "done"
+    assert rec["task_id"] == tasks_module.planned_task(child, DECEMBER_DAY)["id"]
+    assert "отмечено как выполненное" in answer.call_args.args[0]
+
+
 @pytest.mark.asyncio
 async def test_send_reroll_invoice_payload(tmp_path):
     """
@@ -129,13 +191,12 @@ async def test_send_reroll_invoice_payload(tmp_path):
     child = storage.get_child(child_id)
 
     msg = make_message(text="🔄 Перезагрузить задание ⭐")
-    msg.answer_invoice = AsyncMock()
-
-    await tasks_module.send_reroll_invoice(msg, child)
+    with patch.object(types.Message, "answer_invoice", AsyncMock()) as answer_invoice:
+        await tasks_module.send_reroll_invoice(msg, child)
 
-    msg.answer_invoice.assert_called()
-    kwargs = msg.answer_invoice.call_args.kwargs
+    answer_invoice.assert_called()
+    kwargs = answer_invoice.call_args.kwargs
     payload = kwargs["payload"]
 
-    assert payload.startswith(f"reload_task_{child_id}_")
+    assert payload == f"reload_task_{child_id}_20251203"
     assert kwargs["prices"][0].amount == 50
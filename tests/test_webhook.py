@@ -0,0 +1,89 @@
+import asyncio
+import json
+import os
+import signal
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.filters import CommandStart
+from aiogram.types import Message
+from aiohttp.test_utils import TestClient, TestServer
+
+from utils.webhook import SECRET_HEADER, WEBHOOK_HANDLER, build_webhook_app, run_webhook
+
+UPDATE_FILE = os.path.join(os.path.dirname(__file__), "data", "update_start.json")
+
+
+def make_dispatcher(seen: list, release: asyncio.Event) -> Dispatcher:
+    router = Router()
+
+    @router.message(CommandStart())
+    async def on_start(message: Message):
+        await release.wait()
+        seen.append(message.from_user.id)
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return dp
+
+
+@pytest.mark.asyncio
+async def test_webhook_acks_before_handler_finishes():
+    seen, release = [], asyncio.Event()
+    dp = make_dispatcher(seen, release)
+    bot = Bot(token="42:TEST")
+    app = build_webhook_app(dp, bot, "/webhook", secret_token="s3cret")
+
+    with open(UPDATE_FILE, encoding="utf-8") as f:
+        update = json.load(f)
+
+    async with TestClient(TestServer(app)) as client:
+        resp = await client.post("/webhook", json=update, headers={SECRET_HEADER: "s3cret"})
+        assert resp.status == 200
+
+        # ответ уже ушёл, а хендлер всё ещё ждёт
+        handler = app[WEBHOOK_HANDLER]
+        assert handler.in_flight == 1
+        assert seen == []
+
+        release.set()
+        await handler.wait_closed()
+        assert seen == [1]
+
+    await bot.session.close()
+
+
+@pytest.mark.asyncio
+async def test_webhook_rejects_wrong_secret():
+    dp = make_dispatcher([], asyncio.Event())
+    bot = Bot(token="42:TEST")
+    app = build_webhook_app(dp, bot, "/webhook", secret_token="s3cret")
+
+    async with TestClient(TestServer(app)) as client:
+        resp = await client.post("/webhook", json={"update_id": 1}, headers={SECRET_HEADER: "nope"})
+        assert resp.status == 401
+
+    await bot.session.close()
+
+
+@pytest.mark.skipif(os.name != "posix", reason="add_signal_handler есть только на POSIX")
+@pytest.mark.asyncio
+async def test_sigterm_runs_shutdown_hooks():
+    dp = make_dispatcher([], asyncio.Event())
+    bot = Bot(token="42:TEST")
+    events = []
+    dp.startup.register(lambda: events.append("startup"))
+    dp.shutdown.register(lambda: events.append("shutdown"))
+
+    with patch.object(Bot, "set_webhook", AsyncMock()):
+        server = asyncio.create_task(run_webhook(
+            dp, bot, base_url="https://example.org", path="/webhook", secret_token="",
+            host="127.0.0.1", port=0, max_in_flight=10
+        ))
+        while "startup" not in events:
+            await asyncio.sleep(0.01)
+        os.kill(os.getpid(), signal.SIGTERM)
+        await asyncio.wait_for(server, 5)
+
+    assert events == ["startup", "shutdown"]
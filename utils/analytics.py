@@ -0,0 +1,139 @@
+import argparse
+import datetime
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Задания, выданные реже, не попадают в топы: доля выполнения по 1–2 выдачам ничего не значит
+MIN_ISSUED_FOR_TOP = 5
+
+
+def compute_report(rows: Iterable[Tuple[str, Dict[str, Any]]], top: int=5,
+                   min_issued: int=MIN_ISSUED_FOR_TOP) -> Dict[str, Any]:
+    """
+    Глобальная статистика за один проход по потоку ("children", ребёнок) / ("tasks", запись).
+
+    Память зависит от числа детей, заданий каталога и дней, но не от числа записей:
+    записи сразу сворачиваются в счётчики, а возраст и родитель подставляются в конце,
+    поэтому порядок детей и записей в потоке не важен.
+    """
+    children: Dict[int, Tuple[int, int]] = {}        # id -> (parent_id, age)
+    per_child: Dict[int, List[int]] = {}             # id -> [выдано, выполнено]
+    per_task: Dict[int, List[int]] = {}              # task_id -> [выдано, выполнено]
+    rerolls: Dict[datetime.date, int] = {}
+    done_by_day: Dict[datetime.date, set] = {}       # день -> дети с выполненным заданием
+    records = 0
+
+    for kind, row in rows:
+        if kind == "children":
+            children[row["id"]] = (row.get("parent_id"), row.get("age"))
+            continue
+
+        records += 1
+        done = row.get("status") == "done"
+        child_counts = per_child.setdefault(row["child_id"], [0, 0])
+        task_counts = per_task.setdefault(row["task_id"], [0, 0])
+        child_counts[0] += 1
+        task_counts[0] += 1
+        day = datetime.date(row["year"], row["month"], row["day"])
+        if done:
+            child_counts[1] += 1
+            task_counts[1] += 1
+            done_by_day.setdefault(day, set()).add(row["child_id"])
+        if row.get("rerolls"):
+            rerolls[day] = rerolls.get(day, 0) + row["rerolls"]
+
+    by_age: Dict[int, List[int]] = {}
+    for child_id, (issued, done) in per_child.items():
+        if child_id not in children:
+            continue
+        counts = by_age.setdefault(children[child_id][1], [0, 0])
+        counts[0] += issued
+        counts[1] += done
+
+    ranked = sorted(
+        ((done / issued, issued, task_id) for task_id, (issued, done) in per_task.items()
+         if issued >= min_issued),
+        reverse=True
+    )
+    return {
+        "generated_at": time.time(),
+        "records": records,
+        "children": len(children),
+        "parents": len({parent_id for parent_id, _ in children.values()}),
+        "by_age": {
+            age: {"issued": issued, "done": done, "rate": done / issued}
+            for age, (issued, done) in sorted(by_age.items())
+        },
+        "top_tasks": [(task_id, rate, issued) for rate, issued, task_id in ranked[:top]],
+        "bottom_tasks": [(task_id, rate, issued) for rate, issued, task_id in ranked[::-1][:top]],
+        "rerolls_per_day": dict(sorted(rerolls.items())),
+        "active_parents_per_day": {
+            day: len({children[c][0] for c in child_ids if c in children})
+            for day, child_ids in sorted(done_by_day.items())
+        },
+    }
+
+
+def format_report(report: Dict[str, Any], days: int=14) -> str:
+    generated = datetime.datetime.fromtimestamp(report["generated_at"]).strftime("%d.%m %H:%M")
+    lines = [
+        f"📈 Аналитика на {generated}",
+        f"Родителей: {report['parents']}, детей: {report['children']}, записей: {report['records']}",
+        "",
+        "Выполнение по возрасту:",
+    ]
+    for age, row in report["by_age"].items():
+        lines.append(f"  {age} лет: {row['done']}/{row['issued']} ({row['rate']:.0%})")
+
+    lines += ["", "Чаще всего выполняют:"]
+    lines += [f"  #{task_id}: {rate:.0%} из {issued}" for task_id, rate, issued in report["top_tasks"]]
+    lines += ["", "Реже всего выполняют:"]
+    lines += [f"  #{task_id}: {rate:.0%} из {issued}" for task_id, rate, issued in report["bottom_tasks"]]
+
+    lines += ["", f"Активные родители (последние {days} дн.):"]
+    for day, count in list(report["active_parents_per_day"].items())[-days:]:
+        lines.append(f"  {day:%d.%m}: {count}")
+    lines += ["", f"Reroll (последние {days} дн.):"]
+    for day, count in list(report["rerolls_per_day"].items())[-days:]:
+        lines.append(f"  {day:%d.%m}: {count}")
+    return "\n".join(lines)
+
+
+class AnalyticsCache:
+    """
+    Последний отчёт по хранилищу. Пересчёт — не чаще раза в refresh_interval
+    секунд; одновременные запросы ждут один и тот же пересчёт.
+    """
+
+    def __init__(self, storage, refresh_interval: float=300):
+        self.storage = storage
+        self.refresh_interval = refresh_interval
+        self._report: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def get(self, force: bool=False) -> Dict[str, Any]:
+        with self._lock:
+            if force or self._stale():
+                self._report = compute_report(self.storage.stream_snapshot())
+            return self._report
+
+    def _stale(self) -> bool:
+        return self._report is None or time.time() - self._report["generated_at"] >= self.refresh_interval
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Аналитика по storage.json или storage.db")
+    parser.add_argument("path", nargs="?", default="data/storage.json")
+    args = parser.parse_args()
+    if not os.path.exists(args.path):
+        parser.error(f"{args.path} не найден")
+
+    if args.path.endswith(".db"):
+        from models.sqlite_storage import SQLiteStorage
+        source = SQLiteStorage(args.path)
+    else:
+        from models.storage import Storage
+        source = Storage(args.path)
+    print(format_report(compute_report(source.stream_snapshot())))
@@ -0,0 +1,125 @@
+import datetime
+import hashlib
+import html
+import io
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models.task_catalog import TaskCatalog
+
+# RFC 5545: строки iCalendar не длиннее 75 октетов, продолжение — с пробела
+ICS_LINE_OCTETS = 75
+
+
+def _ics_escape(text: str) -> str:
+    return (text.replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\n", "\\n"))
+
+
+def _ics_fold(line: str) -> str:
+    """Разбивает длинную строку по 75 октетов, не разрезая символы UTF-8."""
+    parts: List[str] = []
+    current, size = "", 0
+    for ch in line:
+        n = len(ch.encode("utf-8"))
+        if size + n > ICS_LINE_OCTETS:
+            parts.append(current)
+            current, size = " ", 1
+        current += ch
+        size += n
+    parts.append(current)
+    return "\r\n".join(parts) + "\r\n"
+
+
+def iter_ics(child: Dict[str, Any], year: int, records: List[Dict[str, Any]],
+             catalog: TaskCatalog, hour: int=9, minutes: int=30) -> Iterator[str]:
+    """
+    Календарь iCalendar по строкам: событие на каждый день в hour:00
+    по местному времени ребёнка (tz_offset), длительностью minutes.
+    Время пишется в UTC, DTSTAMP фиксирован — одинаковые записи дают одинаковые байты.
+    """
+    tz = datetime.timezone(datetime.timedelta(hours=child.get("tz_offset", 0)))
+    stamp = f"{year}1201T000000Z"
+    yield _ics_fold("BEGIN:VCALENDAR")
+    yield _ics_fold("VERSION:2.0")
+    yield _ics_fold("PRODID:-//Advent Bot RU//Calendar//RU")
+    yield _ics_fold("CALSCALE:GREGORIAN")
+    calendar_name = _ics_escape(f"Адвент {year} — {child['name']}")
+    yield _ics_fold(f"X-WR-CALNAME:{calendar_name}")
+    for rec in records:
+        task = catalog.get(rec["task_id"])
+        start = datetime.datetime(year, rec.get("month", 12), rec["day"], hour, tzinfo=tz)
+        start = start.astimezone(datetime.timezone.utc)
+        end = start + datetime.timedelta(minutes=minutes)
+        status = "✅ " if rec["status"] == "done" else ""
+        yield _ics_fold("BEGIN:VEVENT")
+        yield _ics_fold(f"UID:advent-{child['id']}-{year}-{rec['day']:02d}@advent-bot")
+        yield _ics_fold(f"DTSTAMP:{stamp}")
+        yield _ics_fold(f"DTSTART:{start:%Y%m%dT%H%M%SZ}")
+        yield _ics_fold(f"DTEND:{end:%Y%m%dT%H%M%SZ}")
+        summary = _ics_escape(f"{status}🎄 {rec['day']} декабря")
+        yield _ics_fold(f"SUMMARY:{summary}")
+        yield _ics_fold(f"DESCRIPTION:{_ics_escape(task['text'].format(name=child['name']))}")
+        yield _ics_fold("END:VEVENT")
+    yield _ics_fold("END:VCALENDAR")
+
+
+def iter_html(child: Dict[str, Any], year: int, records: List[Dict[str, Any]],
+              catalog: TaskCatalog) -> Iterator[str]:
+    """Версия для печати: таблица «день — отметка — задание»."""
+    title = html.escape(f"Адвент-календарь {year} — {child['name']}")
+    yield (
+        "<!DOCTYPE html>\n<html lang=\"ru\"><head><meta charset=\"utf-8\">"
+        f"<title>{title}</title>\n<style>"
+        "body{font-family:sans-serif;margin:2em}"
+        "table{border-collapse:collapse;width:100%}"
+        "td{border:1px solid #999;padding:.5em;vertical-align:top}"
+        "td.day{width:3em;text-align:center;font-weight:bold}td.mark{width:2em}"
+        "</style></head><body>\n"
+        f"<h1>🎄 {title}</h1>\n<table>\n"
+    )
+    for rec in records:
+        task = catalog.get(rec["task_id"])
+        mark = "✅" if rec["status"] == "done" else "☐"
+        text = html.escape(task["text"].format(name=child["name"]))
+        yield f"<tr><td class=\"day\">{rec['day']}</td><td class=\"mark\">{mark}</td><td>{text}</td></tr>\n"
+    yield "</table>\n</body></html>\n"
+
+
+def build_document(chunks: Iterable[str]) -> Tuple[bytes, str]:
+    """Кодирует куски по мере поступления и заодно считает sha256 содержимого."""
+    buf = io.BytesIO()
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        data = chunk.encode("utf-8")
+        digest.update(data)
+        buf.write(data)
+    return buf.getvalue(), digest.hexdigest()
+
+
+class FileIdCache:
+    """
+    file_id документов, уже загруженных в Telegram, по (ребёнок, год, вид, хэш содержимого).
+    Повторная отправка того же содержимого идёт по file_id, без загрузки байтов.
+    Изменилось содержимое — поменялся хэш, старая запись просто вытесняется.
+    """
+
+    def __init__(self, max_size: int=4096):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[int, int, str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[int, int, str, str]) -> Optional[str]:
+        with self._lock:
+            file_id = self._entries.get(key)
+            if file_id is not None:
+                self._entries.move_to_end(key)
+            return file_id
+
+    def put(self, key: Tuple[int, int, str, str], file_id: str):
+        with self._lock:
+            self._entries[key] = file_id
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
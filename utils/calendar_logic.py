@@ -20,5 +20,10 @@ def get_day_type(date: datetime.date) -> str:
     return "weekday"
 
 
+def local_today(tz_offset: int) -> datetime.date:
+    """Сегодняшняя дата в поясе со смещением tz_offset часов от UTC."""
+    return (datetime.datetime.utcnow() + datetime.timedelta(hours=tz_offset)).date()
+
+
 def is_december(date: datetime.date) -> bool:
     return date.month == 12
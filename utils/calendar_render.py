@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+from models.task_catalog import TaskCatalog
+
+# Лимит Telegram на длину текста одного сообщения
+MAX_MESSAGE_LEN = 4096
+
+
+def split_message(lines: List[str], limit: int=MAX_MESSAGE_LEN) -> List[str]:
+    """
+    Собирает строки в сообщения не длиннее limit, разрезая только между строками.
+    Строка, которая сама длиннее limit, режется по символам — иначе её не отправить.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for line in lines:
+        while len(line) > limit:
+            if current:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            chunks.append(line[:limit])
+            line = line[limit:]
+        extra = len(line) + (1 if current else 0)
+        if current and size + extra > limit:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+            extra = len(line)
+        current.append(line)
+        size += extra
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def render_calendar(child: Dict[str, Any], year: int, records: List[Dict[str, Any]],
+                    catalog: TaskCatalog, limit: int=MAX_MESSAGE_LEN) -> List[str]:
+    """Календарь месяца: заголовок и строка на день, разбитые на сообщения по границам дней."""
+    lines = [f"🎄 ПОЛНЫЙ КАЛЕНДАРЬ {year} ДЛЯ {child['name']}:", ""]
+    for rec in records:
+        task = catalog.get(rec["task_id"])
+        status = "✅" if rec["status"] == "done" else "⏳"
+        lines.append(f"{rec['day']:2d}. {status} {task['text'].format(name=child['name'])}")
+    return split_message(lines, limit)
+
+
+class CalendarCache:
+    """
+    Готовые сообщения календаря по (ребёнок, год), последние max_size штук.
+
+    Вместе с сообщениями хранится отпечаток того, из чего они собраны:
+    имя ребёнка, каталог и (день, задание, статус) каждой записи. Пока записи
+    не поменяли статус или задание, повторный показ ничего не пересобирает.
+    """
+
+    def __init__(self, max_size: int=1024):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[int, int], Tuple[tuple, List[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(child: Dict[str, Any], records: List[Dict[str, Any]], catalog: TaskCatalog) -> tuple:
+        return (
+            child["name"],
+            catalog,
+            tuple((rec["day"], rec["task_id"], rec["status"]) for rec in records),
+        )
+
+    def get(self, child: Dict[str, Any], year: int, records: List[Dict[str, Any]],
+            catalog: TaskCatalog) -> List[str]:
+        key = (child["id"], year)
+        fingerprint = self.fingerprint(child, records, catalog)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        chunks = render_calendar(child, year, records, catalog)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (fingerprint, chunks)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return chunks
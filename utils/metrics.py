@@ -0,0 +1,350 @@
+import asyncio
+import bisect
+import logging
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм задержек, в секундах
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+HELP = {
+    "advent_updates_total": ("counter", "Обработано апдейтов"),
+    "advent_updates_in_flight": ("gauge", "Апдейтов в обработке прямо сейчас"),
+    "advent_update_duration_seconds": ("histogram", "Время обработки апдейта целиком"),
+    "advent_handler_duration_seconds": ("histogram", "Время работы хендлера"),
+    "advent_handler_errors_total": ("counter", "Исключений в хендлерах"),
+    "advent_storage_calls_total": ("counter", "Вызовов методов хранилища"),
+    "advent_storage_seconds_total": ("counter", "Время в методах хранилища"),
+    "advent_storage_read_bytes_total": ("counter", "Прочитано байт с диска"),
+    "advent_storage_written_bytes_total": ("counter", "Записано байт на диск"),
+    "advent_picker_tier_total": ("counter", "Выборов задания по уровню fallback"),
+    "advent_outbound_queue_depth": ("gauge", "Исходящих запросов в очереди на отправку"),
+    "advent_outbound_wait_seconds": ("histogram", "Ожидание токена исходящим запросом"),
+    "advent_outbound_retries_total": ("counter", "Повторов исходящих запросов после 429"),
+}
+
+
+class Histogram:
+
+    def __init__(self, buckets: Tuple[float, ...]=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # последняя — +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Оценка сверху: граница корзины, в которую попадает q-я доля наблюдений."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """
+    Счётчики, gauge и гистограммы с метками. Обновляются из event loop
+    и из потоков хранилища, поэтому все изменения — под одной блокировкой.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.gauges: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, Any]) -> Tuple[str, Labels]:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def add_gauge(self, name: str, delta: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.gauges[key] = self.gauges.get(key, 0) + delta
+
+    def observe(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.observe(value)
+
+    def counter(self, name: str, **labels) -> float:
+        return self.counters.get(self._key(name, labels), 0)
+
+    def render(self) -> str:
+        """Текстовый формат Prometheus (exposition format 0.0.4)."""
+        def fmt(labels: Labels, extra: Labels=()) -> str:
+            pairs = labels + extra
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+        with self._lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            histograms = {key: (h.buckets, list(h.counts), h.sum, h.count)
+                          for key, h in self.histograms.items()}
+
+        by_name: Dict[str, List[str]] = {}
+        for (name, labels), value in sorted(counters.items()) + sorted(gauges.items()):
+            by_name.setdefault(name, []).append(f"{name}{fmt(labels)} {_number(value)}")
+        for (name, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+            lines = by_name.setdefault(name, [])
+            cumulative = 0
+            for bound, n in zip(buckets, counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{fmt(labels, (('le', f'{bound:g}'),))} {cumulative}")
+            lines.append(f"{name}_bucket{fmt(labels, (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{fmt(labels)} {_number(total)}")
+            lines.append(f"{name}_count{fmt(labels)} {count}")
+
+        out = []
+        for name, lines in by_name.items():
+            kind, help_text = HELP.get(name, ("untyped", name))
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(lines)
+        return "\n".join(out) + "\n"
+
+    def summary(self, top: int=5) -> str:
+        """Короткая сводка для лога: самые медленные хендлеры, ошибки, хранилище, picker."""
+        with self._lock:
+            handlers = [
+                (dict(labels), h.count, h.sum / h.count, h.quantile(0.99))
+                for (name, labels), h in self.histograms.items()
+                if name == "advent_handler_duration_seconds" and h.count
+            ]
+            counters = dict(self.counters)
+            in_flight = self.gauges.get(self._key("advent_updates_in_flight", {}), 0)
+            queued = sum(v for (name, _), v in self.gauges.items() if name == "advent_outbound_queue_depth")
+            waits = [h for (name, _), h in self.histograms.items()
+                     if name == "advent_outbound_wait_seconds" and h.count]
+            outbound_p99 = max((h.quantile(0.99) for h in waits), default=0.0)
+
+        def total(metric: str) -> Dict[str, float]:
+            result: Dict[str, float] = {}
+            for (name, labels), value in counters.items():
+                if name == metric:
+                    label = ",".join(v for _, v in labels) or "-"
+                    result[label] = result.get(label, 0) + value
+            return result
+
+        handlers.sort(key=lambda row: row[1] * row[2], reverse=True)
+        updates = counters.get(self._key("advent_updates_total", {}), 0)
+        parts = [f"updates={updates:.0f}, in_flight={in_flight:.0f}"]
+        for labels, count, avg, p99 in handlers[:top]:
+            parts.append(f"{labels['handler']}: n={count} avg={avg * 1e3:.1f}ms p99<={p99 * 1e3:.0f}ms")
+        errors = total("advent_handler_errors_total")
+        if errors:
+            parts.append(f"errors={errors}")
+        calls, seconds = total("advent_storage_calls_total"), total("advent_storage_seconds_total")
+        if calls:
+            parts.append(f"storage: {sum(calls.values()):.0f} calls, {sum(seconds.values()) * 1e3:.0f}ms, "
+                         f"read={sum(total('advent_storage_read_bytes_total').values()):.0f}B, "
+                         f"written={sum(total('advent_storage_written_bytes_total').values()):.0f}B")
+        tiers = total("advent_picker_tier_total")
+        if tiers:
+            parts.append(f"picker tiers={tiers}")
+        if waits:
+            parts.append(f"outbound: queued={queued:.0f}, wait p99<={outbound_p99 * 1e3:.0f}ms, "
+                         f"retries={sum(total('advent_outbound_retries_total').values()):.0f}")
+        return "; ".join(parts)
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Один реестр на процесс: в него пишут middleware, хранилище и picker
+registry = Metrics()
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Внешний middleware на dp.update: апдейты в работе и полное время обработки."""
+
+    def __init__(self, metrics: Metrics):
+        self.metrics = metrics
+
+    async def __call__(self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject, data: Dict[str, Any]) -> Any:
+        self.metrics.add_gauge("advent_updates_in_flight", 1)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            self.metrics.observe("advent_update_duration_seconds", time.perf_counter() - started)
+            self.metrics.inc("advent_updates_total")
+            self.metrics.add_gauge("advent_updates_in_flight", -1)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Внутренний middleware: вызывается только для хендлера, чьи фильтры прошли,
+    и знает, какой это хендлер (data["handler"]).
+    """
+
+    def __init__(self, metrics: Metrics):
+        self.metrics = metrics
+
+    async def __call__(self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject, data: Dict[str, Any]) -> Any:
+        callback = data["handler"].callback
+        labels = {
+            "router": getattr(callback, "__module__", "?"),
+            "handler": getattr(callback, "__name__", repr(callback)),
+        }
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            self.metrics.inc("advent_handler_errors_total", **labels)
+            raise
+        finally:
+            self.metrics.observe("advent_handler_duration_seconds", time.perf_counter() - started, **labels)
+
+
+def setup_metrics(dp: Dispatcher, metrics: Metrics=registry):
+    """
+    Вешает middleware на диспетчер. Внутренние middleware корневого роутера
+    наследуются всеми вложенными, так что каждый хендлер замеряется ровно раз.
+    """
+    dp.update.outer_middleware(UpdateMetricsMiddleware(metrics))
+    inner = HandlerMetricsMiddleware(metrics)
+    for name, observer in dp.observers.items():
+        if name not in ("update", "error"):
+            observer.middleware(inner)
+
+
+# ---------- ХРАНИЛИЩЕ ----------
+
+STORAGE_METHODS = (
+    "add_child", "get_child", "get_children_by_parent", "get_children_by_tz_offset",
+    "delete_child", "add_task_record", "add_task_records", "get_task_record",
+    "set_task_status", "update_task_id", "get_task_records_for_child",
+    "get_child_month_records", "get_month_stats", "get_family_month_stats",
+    "get_meta", "set_meta", "flush",
+)
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def instrument_storage(storage, metrics: Metrics=registry):
+    """
+    Оборачивает методы хранилища на уровне экземпляра (их зовут и AsyncStorage,
+    и StorageWriter через getattr): число вызовов и время. Байты считаются по
+    файловым операциям JSON-хранилища и журнала; у SQLite их не видно.
+    """
+    for name in STORAGE_METHODS:
+        method = getattr(storage, name, None)
+        if method is not None:
+            setattr(storage, name, _timed(name, method, metrics))
+
+    # метод -> (направление, байты по размеру файла до и после вызова)
+    io_methods = {
+        "_load": ("read", lambda before, after: after),
+        "_read_snapshot": ("read", lambda before, after: after),
+        "_write": ("written", lambda before, after: after),
+    }
+    for name, (direction, count) in io_methods.items():
+        method = getattr(storage, name, None)
+        if method is not None:
+            setattr(storage, name, _counted(
+                method, direction, lambda: _file_size(storage.path), count, metrics))
+    if hasattr(storage, "_append"):
+        setattr(storage, "_append", _counted(
+            storage._append, "written", lambda: storage._journal.tell(),
+            lambda before, after: after - before, metrics))
+
+
+def _timed(name: str, method: Callable, metrics: Metrics) -> Callable:
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            metrics.inc("advent_storage_calls_total", method=name)
+            metrics.inc("advent_storage_seconds_total", time.perf_counter() - started, method=name)
+    return timed
+
+
+def _counted(method: Callable, direction: str, size: Callable[[], int],
+             count: Callable[[int, int], int], metrics: Metrics) -> Callable:
+    def counted(*args, **kwargs):
+        before = size()
+        result = method(*args, **kwargs)
+        metrics.inc(f"advent_storage_{direction}_bytes_total", count(before, size()))
+        return result
+    return counted
+
+
+# ---------- HTTP И ЛОГ ----------
+
+async def start_metrics_server(host: str, port: int, metrics: Metrics=registry) -> web.AppRunner:
+    """Локальный эндпоинт GET /metrics для Prometheus."""
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host=host, port=port).start()
+    logger.info("Metrics endpoint on http://%s:%s/metrics", host, port)
+    return runner
+
+
+class MetricsReporter:
+    """Раз в interval секунд пишет сводку метрик в лог."""
+
+    def __init__(self, interval: float, metrics: Metrics=registry):
+        self.interval = interval
+        self.metrics = metrics
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            logger.info("Metrics: %s", self.metrics.summary())
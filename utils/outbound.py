@@ -0,0 +1,210 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+
+from utils.metrics import Metrics, registry
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0  # ответы пользователю — вперёд
+BROADCAST = 1    # рассылки — когда есть свободные токены
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BROADCAST: "broadcast"}
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("outbound_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def broadcast():
+    """Все отправки внутри блока идут с приоритетом рассылки."""
+    token = _priority.set(BROADCAST)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = 0.0
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        if self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Сколько ждать до свободного токена (0 — можно сейчас)."""
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.blocked_until
+
+
+class OutboundSender(BaseRequestMiddleware):
+    """
+    Единая точка исходящих сообщений бота (middleware сессии aiogram).
+
+    Всё, что адресовано чату (sendMessage, sendInvoice, ...), проходит через
+    токен-бакеты — общий на бота и отдельный на каждый чат — и приоритетную
+    очередь: интерактивные ответы обгоняют рассылки. На 429 чат ставится
+    на паузу retry_after с нарастающей задержкой, и запрос повторяется.
+    Запросы без chat_id (getUpdates, answerPreCheckoutQuery, ...) идут мимо.
+    Глубина очереди, ожидание токена и повторы на 429 сразу пишутся в metrics.
+    """
+
+    def __init__(self, global_rate: float=30, chat_rate: float=1, chat_burst: float=3,
+                 max_retries: int=3, max_idle_buckets: int=10000, metrics: Metrics=registry):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.max_idle_buckets = max_idle_buckets
+        self.metrics = metrics
+        self._chats: Dict[Any, TokenBucket] = {}
+        self._queue: List[Tuple[int, int, Any, float, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._pump_task: Optional[asyncio.Task] = None
+
+        self.sent = 0
+        self.retries = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    # ---------- МЕТРИКИ ----------
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "queue_depth": self.queue_depth,
+            "sent": self.sent,
+            "retries": self.retries,
+            "avg_wait": self.total_wait / self.sent if self.sent else 0.0,
+            "max_wait": self.max_wait,
+        }
+
+    # ---------- MIDDLEWARE ----------
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot, method: TelegramMethod) -> Response:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            return await make_request(bot, method)
+
+        priority = _priority.get()
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(chat_id, priority)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                self.metrics.inc("advent_outbound_retries_total")
+                pause = e.retry_after * (2 ** attempt)
+                logger.warning("Flood control in chat %s: retry in %ss", chat_id, pause)
+                loop = asyncio.get_running_loop()
+                self._bucket(chat_id).blocked_until = loop.time() + pause
+
+    # ---------- ОЧЕРЕДЬ ----------
+
+    def _bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= self.max_idle_buckets:
+                self._drop_idle_buckets()
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def _drop_idle_buckets(self):
+        now = asyncio.get_running_loop().time()
+        self._chats = {k: b for k, b in self._chats.items() if not b.is_idle(now)}
+
+    async def _acquire(self, chat_id, priority: int):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), chat_id, loop.time(), future))
+        self.metrics.add_gauge("advent_outbound_queue_depth", 1, priority=PRIORITY_NAMES[priority])
+
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = loop.create_task(self._pump())
+        await future
+
+    async def _pump(self):
+        loop = asyncio.get_running_loop()
+        while self._queue:
+            self._wakeup.clear()
+            now = loop.time()
+
+            wait = self.global_bucket.delay(now)
+            if not wait:
+                wait = self._grant_next(now)
+            if wait:
+                # новый запрос (например, интерактивный в свободный чат) будит раньше
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _grant_next(self, now: float) -> float:
+        """Пропустить первый по приоритету запрос, чей чат свободен. Вернёт паузу, если таких нет."""
+        skipped = []
+        min_delay = float("inf")
+        granted = False
+        while self._queue:
+            entry = heapq.heappop(self._queue)
+            priority, _, chat_id, enqueued, future = entry
+            if future.done():
+                # вызывающего отменили, пока он ждал
+                self.metrics.add_gauge("advent_outbound_queue_depth", -1, priority=PRIORITY_NAMES[priority])
+                continue
+            bucket = self._bucket(chat_id)
+            delay = bucket.delay(now)
+            if delay:
+                skipped.append(entry)
+                min_delay = min(min_delay, delay)
+                continue
+
+            bucket.consume(now)
+            self.global_bucket.consume(now)
+            waited = now - enqueued
+            self.sent += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self.metrics.add_gauge("advent_outbound_queue_depth", -1, priority=PRIORITY_NAMES[priority])
+            self.metrics.observe("advent_outbound_wait_seconds", waited, priority=PRIORITY_NAMES[priority])
+            future.set_result(None)
+            granted = True
+            break
+
+        for entry in skipped:
+            heapq.heappush(self._queue, entry)
+        return 0.0 if granted or not self._queue else min_delay
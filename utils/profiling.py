@@ -0,0 +1,194 @@
+import asyncio
+import datetime
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject
+
+logger = logging.getLogger(__name__)
+
+# (файл, строка def, имя функции)
+FuncKey = Tuple[str, int, str]
+
+# Кто остаётся, если в стеке нет ни одной функции из handlers.*
+OUTSIDE_HANDLERS = "(вне хендлеров)"
+
+
+class Profiler:
+    """
+    Профилирование по требованию: фоновый поток раз в interval секунд снимает
+    стек потока event loop и раскладывает сэмплы по функциям из handlers.*
+    (send_today_task, handle_full_calendar_free, ...). Видна только работа
+    на event loop: корутина, ждущая сеть или пул потоков, в стеке не лежит.
+
+    Пока профилирование выключено, потока нет, а middleware лишь проверяет флаг.
+    """
+
+    def __init__(self, out_dir: str, interval: float=0.005, top: int=30):
+        self.out_dir = out_dir
+        self.interval = interval
+        self.top = top
+        self.active = False
+        self.updates_left = 0
+        self.updates = 0
+        self.last_report: Optional[str] = None
+        self._thread_id = 0
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._deadline: Optional[asyncio.TimerHandle] = None
+        self._on_done: Optional[Callable[[str], Awaitable[Any]]] = None
+        self._started = 0.0
+        self._samples = 0
+        self._cumulative: Dict[str, Counter] = {}
+        self._own: Dict[str, Counter] = {}
+
+    def start(self, updates: int=0, seconds: float=0,
+              on_done: Optional[Callable[[str], Awaitable[Any]]]=None) -> bool:
+        """
+        Включить на updates апдейтов и/или seconds секунд — что наступит раньше.
+        Вызывать из event loop. False — профилирование уже идёт.
+        """
+        if self.active:
+            return False
+        self.active = True
+        self.updates_left = updates
+        self.updates = 0
+        self._on_done = on_done
+        self._samples = 0
+        self._cumulative = {}
+        self._own = {}
+        self._started = time.perf_counter()
+        self._thread_id = threading.get_ident()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self._sampler.start()
+        if seconds:
+            loop = asyncio.get_running_loop()
+            self._deadline = loop.call_later(seconds, lambda: asyncio.ensure_future(self.finish()))
+        logger.info("Profiling started: updates=%s, seconds=%s", updates or "-", seconds or "-")
+        return True
+
+    async def finish(self) -> Optional[str]:
+        """Остановить, записать отчёт в файл и вернуть его путь."""
+        if not self.active:
+            return None
+        self.active = False
+        if self._deadline is not None:
+            self._deadline.cancel()
+            self._deadline = None
+        self._stop.set()
+        path = await asyncio.to_thread(self._write_report)
+        self.last_report = path
+        logger.info("Profiling finished: %s updates, %s samples, report %s", self.updates, self._samples, path)
+        if self._on_done is not None:
+            try:
+                await self._on_done(path)
+            except Exception:
+                logger.exception("Profiling: on_done callback failed")
+        return path
+
+    def update_done(self):
+        """Middleware отмечает обработанный апдейт; после N-го профилирование останавливается."""
+        self.updates += 1
+        if self.updates_left and self.updates >= self.updates_left:
+            asyncio.ensure_future(self.finish())
+
+    # ---------- СЭМПЛЫ ----------
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self._record(frame)
+
+    def _record(self, frame):
+        stack: List[FuncKey] = []
+        owner = OUTSIDE_HANDLERS
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            module = frame.f_globals.get("__name__", "")
+            if module.startswith("handlers."):
+                # всё, что снаружи хендлера (loop, диспетчер, middleware), у всех одинаково
+                owner = f"{module}.{code.co_name}"
+                break
+            frame = frame.f_back
+        if stack[0][0].endswith("selectors.py"):
+            # loop просто ждёт событий — это не нагрузка
+            return
+
+        self._samples += 1
+        self._cumulative.setdefault(owner, Counter()).update(set(stack))
+        self._own.setdefault(owner, Counter())[stack[0]] += 1
+
+    # ---------- ОТЧЁТ ----------
+
+    def report(self) -> str:
+        elapsed = time.perf_counter() - self._started
+        lines = [
+            f"Профиль: {self.updates} апдейтов за {elapsed:.1f} с, "
+            f"{self._samples} сэмплов по {self.interval * 1e3:g} мс",
+        ]
+        owners = sorted(self._cumulative, key=lambda o: -sum(self._own[o].values()))
+        for owner in owners:
+            total = sum(self._own[owner].values())
+            lines += [
+                "",
+                f"== {owner}: {total} сэмплов (~{total * self.interval * 1e3:.0f} мс на event loop)",
+                f"{'cumul':>6} {'own':>6}  функция",
+            ]
+            for key, cumul in self._cumulative[owner].most_common(self.top):
+                filename, lineno, name = key
+                lines.append(f"{cumul:>6} {self._own[owner][key]:>6}  {name} ({_short(filename)}:{lineno})")
+        return "\n".join(lines)
+
+    def _write_report(self) -> str:
+        if self._sampler is not None:
+            self._sampler.join()
+        os.makedirs(self.out_dir, exist_ok=True)
+        name = datetime.datetime.now().strftime("profile-%Y%m%d-%H%M%S.txt")
+        path = os.path.join(self.out_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.report() + "\n")
+        return path
+
+
+def _short(filename: str) -> str:
+    """Путь относительно проекта или site-packages — чтобы отчёт читался."""
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    try:
+        return os.path.relpath(filename)
+    except ValueError:
+        return filename
+
+
+class ProfilingMiddleware(BaseMiddleware):
+    """Считает апдейты, дошедшие до хендлера, пока профилирование включено."""
+
+    def __init__(self, profiler: Profiler):
+        self.profiler = profiler
+
+    async def __call__(self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject, data: Dict[str, Any]) -> Any:
+        if not self.profiler.active:
+            return await handler(event, data)
+        try:
+            return await handler(event, data)
+        finally:
+            self.profiler.update_done()
+
+
+def setup_profiling(dp: Dispatcher, profiler: Profiler):
+    """Внутренний middleware на все события диспетчера (наследуется роутерами)."""
+    middleware = ProfilingMiddleware(profiler)
+    for name, observer in dp.observers.items():
+        if name not in ("update", "error"):
+            observer.middleware(middleware)
@@ -0,0 +1,119 @@
+import asyncio
+import datetime
+import logging
+from typing import List, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+
+from handlers import tasks as tasks_handlers
+from handlers.start import today_task_keyboard
+from models.task_picker import plan_day
+from utils.calendar_logic import is_december
+from utils.outbound import broadcast
+
+logger = logging.getLogger(__name__)
+
+# Все смещения от UTC, которые встречаются в мире
+TZ_OFFSETS = range(-12, 15)
+
+
+def due_offsets(now_utc: datetime.datetime, hour: int, window: int=1) -> List[int]:
+    """
+    Смещения, в которых локальный час hour наступил за последние window часов
+    и там всё ещё тот же день (window > 1 — догоняем пропущенные часы).
+    """
+    return [offset for offset in TZ_OFFSETS if hour <= (now_utc.hour + offset) % 24 < hour + window]
+
+
+class MorningPushScheduler:
+    """
+    Утренняя рассылка задания дня.
+
+    Раз в час берёт только те часовые пояса, где сейчас наступил MORNING_PUSH_HOUR,
+    достаёт детей этих поясов по индексу tz_offset, заранее подбирает им задание
+    и присылает его родителю. Нагрузка декабрьского утра так размазывается по
+    суткам поясами, а не падает на один вечерний пик.
+
+    Задания всего пояса подбираются за один проход и сохраняются одной пакетной
+    записью, а не записью на ребёнка. Если тик затянулся дольше часа, следующий
+    догоняет пояса, чьё утро пришлось на пропущенные часы.
+
+    Дата последней рассылки пояса хранится в meta хранилища, поэтому перезапуск
+    бота в час рассылки не присылает утреннее сообщение второй раз.
+    """
+
+    def __init__(self, bot: Bot, hour: int=9):
+        self.bot = bot
+        self.hour = hour
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def run(self):
+        last_hour = None
+        while True:
+            now = datetime.datetime.utcnow()
+            hour = now.replace(minute=0, second=0, microsecond=0)
+            # часы с прошлого тика: больше одного, если тот длился дольше часа
+            window = 1 if last_hour is None else max(1, int((hour - last_hour).total_seconds() // 3600))
+            last_hour = hour
+            try:
+                await self.tick(now, window)
+            except Exception:
+                logger.exception("Morning push tick failed")
+            now = datetime.datetime.utcnow()
+            next_hour = now.replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)
+            await asyncio.sleep((next_hour - now).total_seconds() + 1)
+
+    async def tick(self, now_utc: datetime.datetime, window: int=1) -> int:
+        """
+        Разослать задания поясам, где за последние window часов наступило утро.
+        Вернёт число отправок.
+        """
+        storage = tasks_handlers.storage
+        sent = 0
+        for offset in due_offsets(now_utc, self.hour, window):
+            local_date = (now_utc + datetime.timedelta(hours=offset)).date()
+            if not is_december(local_date):
+                continue
+            # отметка ставится до отправки: лучше недослать после падения, чем прислать дважды
+            key = f"morning_push_{offset}"
+            if await storage.aio.get_meta(key) == local_date.isoformat():
+                continue
+            await storage.aio.set_meta(key, local_date.isoformat())
+
+            children = await storage.aio.get_children_by_tz_offset(offset)
+            plans, new_records = await storage.aio.run(plan_day, children, local_date, storage)
+            if new_records:
+                await storage.aio.add_task_records(new_records)
+            for child, task, status in plans:
+                if await self._push(child, task, status):
+                    sent += 1
+        if sent:
+            logger.info("Morning push: %d tasks sent at %s UTC", sent, now_utc.strftime("%H:%M"))
+        return sent
+
+    async def _push(self, child: dict, task: Optional[dict], status: str) -> bool:
+        if not task or status == "done":
+            return False
+
+        text = task["text"].format(name=child["name"])
+        try:
+            with broadcast():
+                await self.bot.send_message(
+                    chat_id=child["parent_id"],
+                    text=f"☀️ Доброе утро! Задание на сегодня для {child['name']}:\n\n{text}",
+                    reply_markup=today_task_keyboard()
+                )
+        except TelegramAPIError as e:
+            # родитель заблокировал бота и т. п. — остальным это не мешает
+            logger.warning("Morning push to parent %s failed: %s", child["parent_id"], e)
+            return False
+        return True
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import signal
+from typing import Set
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookHandler:
+    """
+    Приём апдейтов от Telegram по вебхуку.
+
+    Апдейт подтверждается ответом 200 сразу после разбора, обработка
+    хендлерами идёт в фоне. Одновременно в работе не больше max_in_flight
+    апдейтов: при переполнении ответ задерживается, пока не освободится слот,
+    и Telegram сам притормаживает отправку.
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, secret_token: str="", max_in_flight: int=100):
+        self.dp = dp
+        self.bot = bot
+        self.secret_token = secret_token
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if self.secret_token and request.headers.get(SECRET_HEADER) != self.secret_token:
+            return web.Response(status=401)
+
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.bot})
+        except Exception:
+            logger.warning("Webhook: malformed update body")
+            return web.Response(status=400)
+
+        await self._slots.acquire()
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response(status=200)
+
+    async def _process(self, update: Update):
+        try:
+            await self.dp.feed_update(self.bot, update)
+        except Exception:
+            logger.exception("Webhook: update id=%s failed", update.update_id)
+        finally:
+            self._slots.release()
+
+    async def wait_closed(self):
+        """Дождаться апдейтов, которые уже в работе."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+WEBHOOK_HANDLER = web.AppKey("webhook_handler", WebhookHandler)
+
+
+def build_webhook_app(dp: Dispatcher, bot: Bot, path: str, secret_token: str="",
+                      max_in_flight: int=100) -> web.Application:
+    handler = WebhookHandler(dp, bot, secret_token=secret_token, max_in_flight=max_in_flight)
+    app = web.Application()
+    app[WEBHOOK_HANDLER] = handler
+    app.router.add_post(path, handler.handle)
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, base_url: str, path: str, secret_token: str,
+                      host: str, port: int, max_in_flight: int):
+    """
+    Поднимает aiohttp-сервер, регистрирует вебхук и работает до SIGTERM/SIGINT
+    (или отмены). При остановке дожидается апдейтов в работе и вызывает
+    хуки shutdown — как aiogram в режиме polling.
+    """
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    signals = []
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+            signals.append(sig)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows или не главный поток: остаётся только отмена
+
+    app = build_webhook_app(dp, bot, path, secret_token=secret_token, max_in_flight=max_in_flight)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    started = False
+    try:
+        site = web.TCPSite(runner, host=host, port=port)
+        await site.start()
+
+        await dp.emit_startup(bot=bot, dispatcher=dp)
+        started = True
+        await bot.set_webhook(
+            url=base_url.rstrip("/") + path,
+            secret_token=secret_token or None,
+            allowed_updates=dp.resolve_used_update_types(),
+            drop_pending_updates=True
+        )
+        logger.info("Webhook server listening on %s:%s%s", host, port, path)
+        await stop.wait()
+        logger.info("Webhook server stopping")
+    finally:
+        for sig in signals:
+            loop.remove_signal_handler(sig)
+        await runner.cleanup()
+        await app[WEBHOOK_HANDLER].wait_closed()
+        # flush хранилища, fsync журнала, закрытие FSM — в хуках shutdown
+        if started:
+            await dp.emit_shutdown(bot=bot, dispatcher=dp)
+        await bot.session.close()